@@ -0,0 +1,315 @@
+# app/backend/scripts/groq_stub.py
+"""
+Local stand-in for the Groq (OpenAI-compatible) chat completions endpoint.
+
+  python scripts/groq_stub.py --port 8001 --delay 1.5
+  python scripts/groq_stub.py --latency lognormal:1.2,0.5 --ttft uniform:0.2,0.6 \\
+      --rate-limit-rate 0.02 --error-rate 0.01 --rpm 600 --seed 7
+  GROQ_URL=http://127.0.0.1:8001/openai/v1/chat/completions GROQ_API_KEY=stub uvicorn src.main:app
+
+Each completion waits a latency drawn from --latency (asyncio, so it holds no
+thread). Latency specs, in seconds:
+  fixed:S | uniform:LO,HI | normal:MEAN,SD | lognormal:MEDIAN,SIGMA | exp:MEAN
+
+Answers are canned but shaped like the real ones:
+  - chat prompts get --sentences sentences, each citing a [SOURCE n] id found in the
+    context ([[cite:n]] markers), so citation handling is exercised end to end
+  - interview prompts get a JSON question list / a plain-text grading
+With "stream": true the answer is sent as SSE chunks of --chunk-chars characters
+(a random 1..N each with --chunk-chars rand:N), so [[cite:n]] markers regularly
+straddle chunk boundaries: the first after --ttft (default: an even share of the
+latency), the rest spread over what remains.
+
+Fault injection, decided per request before any waiting:
+  --rate-limit-rate P   429 rate_limit_exceeded with a retry-after header
+  --rpm N               429 once more than N requests arrived in the last 60 s
+  --error-rate P        500 server_error, after the drawn latency
+
+GET /stats returns request / outcome counters and peak concurrency (?reset=1 clears them).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SOURCE_RE = re.compile(r"\[SOURCE (\d+)\]")
+QUESTIONS_RE = re.compile(r"Create (\d+) interview questions")
+ANCHOR_RE = re.compile(r"^\[[^\]\n]+\|\s*p\.[^\]\n]+\|[^\]\n]+\]", re.MULTILINE)
+
+SENTENCES = [
+    "This is a stub answer grounded in the provided sources.",
+    "The documents describe the relevant experience in some detail.",
+    "Further points are supported by another part of the context.",
+    "Not every detail is stated, so the answer stays with what is present.",
+]
+
+
+class Latency:
+    """A latency distribution parsed from "kind:a[,b]" (seconds); sample() is never negative."""
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, spec: str):
+        kind, _, args = spec.partition(":")
+        kind = kind.strip().lower()
+        try:
+            params = [float(x) for x in args.split(",")] if args.strip() else []
+        except ValueError:
+            params = []
+        if kind not in self.KINDS or len(params) != self.KINDS[kind]:
+            raise ValueError(f"bad latency spec {spec!r}; e.g. fixed:1, uniform:0.5,2, lognormal:1.2,0.5")
+        self.spec = spec
+        self.kind = kind
+        self.params = params
+
+    def sample(self, rng: random.Random) -> float:
+        p = self.params
+        if self.kind == "fixed":
+            v = p[0]
+        elif self.kind == "uniform":
+            v = rng.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            v = rng.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            v = rng.lognormvariate(math.log(max(p[0], 1e-9)), p[1])
+        else:
+            v = rng.expovariate(1.0 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, v)
+
+
+class Settings:
+    def __init__(self):
+        self.latency = Latency("fixed:1.0")
+        self.ttft: Optional[Latency] = None
+        self.error_rate = 0.0
+        self.rate_limit_rate = 0.0
+        self.rpm = 0
+        self.sentences = 2
+        self.chunk_chars = 4
+        self.chunk_random = False
+        self.rng = random.Random()
+
+
+CFG = Settings()
+STATS: Dict[str, Any] = {}
+_arrivals: Deque[float] = deque()
+_in_flight = 0
+
+
+def _reset_stats() -> None:
+    STATS.clear()
+    STATS.update({
+        "requests": 0, "streamed": 0, "ok": 0, "rate_limited": 0, "errors": 0,
+        "peak_in_flight": 0, "since": time.time(),
+    })
+
+
+_reset_stats()
+
+app = FastAPI()
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    return "\n".join(str(m.get("content", "")) for m in body.get("messages", []) if isinstance(m, dict))
+
+
+def _answer(prompt: str) -> str:
+    n_questions = QUESTIONS_RE.search(prompt)
+    if n_questions:
+        anchors = ANCHOR_RE.findall(prompt)[:2]
+        return json.dumps({"questions": [
+            {
+                "q": f"Stub interview question {i + 1}: describe a project from the documents.",
+                "expected_points": ["Names the project", "Names the tools used", "States the outcome"],
+                "anchors": anchors,
+            }
+            for i in range(int(n_questions.group(1)))
+        ]})
+    if "interview grader" in prompt:
+        return (
+            "- Score: 7/10\n- Did well: named the project and the stack.\n"
+            "- Missed: the measurable outcome.\n- Ideal answer: the project, the tools and the result, briefly."
+        )
+    ids = sorted({int(x) for x in SOURCE_RE.findall(prompt)}) or [1]
+    return " ".join(
+        f"{SENTENCES[i % len(SENTENCES)]} [[cite:{ids[i % len(ids)]}]]" for i in range(max(1, CFG.sentences))
+    )
+
+
+def _error(status: int, message: str, type_: str, code: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": type_, "code": code}},
+        headers=headers,
+    )
+
+
+def _rate_limited(now: float) -> Optional[JSONResponse]:
+    """429 by injection (--rate-limit-rate) or by the --rpm window; None = admitted."""
+    retry_after = None
+    if CFG.rpm > 0:
+        while _arrivals and now - _arrivals[0] >= 60.0:
+            _arrivals.popleft()
+        if len(_arrivals) >= CFG.rpm:
+            retry_after = max(1, math.ceil(60.0 - (now - _arrivals[0])))
+        else:
+            _arrivals.append(now)
+    if retry_after is None and CFG.rng.random() < CFG.rate_limit_rate:
+        retry_after = 1
+    if retry_after is None:
+        return None
+    STATS["rate_limited"] += 1
+    return _error(
+        429, f"Rate limit reached (stub). Please try again in {retry_after}s.", "tokens", "rate_limit_exceeded",
+        headers={"retry-after": str(retry_after)},
+    )
+
+
+def _usage(prompt: str, answer: str) -> Dict[str, int]:
+    p, c = len(prompt.split()), len(answer.split())
+    return {"prompt_tokens": p, "completion_tokens": c, "total_tokens": p + c}
+
+
+@app.post("/openai/v1/chat/completions")
+async def chat_completions(request: Request):
+    global _in_flight
+    body = await request.json()
+    STATS["requests"] += 1
+    limited = _rate_limited(time.monotonic())
+    if limited is not None:
+        return limited
+
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+    model = body.get("model", "stub")
+    prompt = _prompt_text(body)
+    answer = _answer(prompt)
+    latency = CFG.latency.sample(CFG.rng)
+    fail = CFG.rng.random() < CFG.error_rate
+    ttft = CFG.ttft.sample(CFG.rng) if CFG.ttft is not None else None
+
+    if body.get("stream") and not fail:
+        STATS["streamed"] += 1
+        return StreamingResponse(_stream(completion_id, model, answer, latency, ttft), media_type="text/event-stream")
+
+    _in_flight += 1
+    STATS["peak_in_flight"] = max(STATS["peak_in_flight"], _in_flight)
+    try:
+        await asyncio.sleep(latency)
+    finally:
+        _in_flight -= 1
+    if fail:
+        STATS["errors"] += 1
+        return _error(500, "Internal server error (stub injected).", "server_error", "internal_error")
+
+    STATS["ok"] += 1
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}
+        ],
+        "usage": _usage(prompt, answer),
+    }
+
+
+def _schedule(n_pieces: int, latency: float, ttft: Optional[float]) -> List[float]:
+    """Sleep before each piece: the first after ttft, the rest evenly over the remainder."""
+    if ttft is None:
+        return [latency / n_pieces] * n_pieces
+    rest = max(0.0, latency - ttft) / max(1, n_pieces - 1)
+    return [ttft] + [rest] * (n_pieces - 1)
+
+
+def _pieces(answer: str) -> List[str]:
+    """Fixed-size character slices (random sizes with rand:N), ignoring word and marker boundaries."""
+    pieces: List[str] = []
+    i = 0
+    while i < len(answer):
+        n = CFG.rng.randint(1, CFG.chunk_chars) if CFG.chunk_random else CFG.chunk_chars
+        pieces.append(answer[i:i + n])
+        i += n
+    return pieces or [""]
+
+
+async def _stream(completion_id: str, model: str, answer: str, latency: float, ttft: Optional[float]):
+    global _in_flight
+    pieces = _pieces(answer)
+    _in_flight += 1
+    STATS["peak_in_flight"] = max(STATS["peak_in_flight"], _in_flight)
+    try:
+        for piece, wait in zip(pieces, _schedule(len(pieces), latency, ttft)):
+            await asyncio.sleep(wait)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        STATS["ok"] += 1
+        yield "data: [DONE]\n\n"
+    finally:
+        _in_flight -= 1
+
+
+@app.get("/stats")
+async def stats(reset: bool = False):
+    out = {**STATS, "in_flight": _in_flight, "uptime_s": round(time.time() - STATS["since"], 1)}
+    if reset:
+        _reset_stats()
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8001)
+    ap.add_argument("--delay", type=float, default=None, help="shorthand for --latency fixed:DELAY")
+    ap.add_argument("--latency", default="fixed:1.0", help="completion latency distribution (seconds)")
+    ap.add_argument("--ttft", default="", help="time-to-first-token distribution for streams (seconds)")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    ap.add_argument("--rpm", type=int, default=0, help="requests per minute before 429s (0 = unlimited)")
+    ap.add_argument("--sentences", type=int, default=2, help="cited sentences per chat answer")
+    ap.add_argument("--chunk-chars", default="4", help="characters per streamed delta: N, or rand:N for 1..N")
+    ap.add_argument("--seed", type=int, default=None, help="seed latency / fault draws for repeatable runs")
+    args = ap.parse_args()
+
+    try:
+        CFG.latency = Latency(f"fixed:{args.delay}" if args.delay is not None else args.latency)
+        CFG.ttft = Latency(args.ttft) if args.ttft else None
+    except ValueError as e:
+        ap.error(str(e))
+    CFG.error_rate = args.error_rate
+    CFG.rate_limit_rate = args.rate_limit_rate
+    CFG.rpm = args.rpm
+    CFG.sentences = args.sentences
+    chunk = args.chunk_chars.strip().lower()
+    CFG.chunk_random = chunk.startswith("rand:")
+    try:
+        CFG.chunk_chars = int(chunk[len("rand:"):] if CFG.chunk_random else chunk)
+    except ValueError:
+        ap.error(f"bad --chunk-chars {args.chunk_chars!r}; e.g. 4 or rand:12")
+    if CFG.chunk_chars < 1:
+        ap.error("--chunk-chars must be >= 1")
+    CFG.rng = random.Random(args.seed)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
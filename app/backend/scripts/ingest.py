@@ -1,6 +1,7 @@
 # app/backend/scripts/ingest.py
 from __future__ import annotations
 
+import argparse
 import os
 from pathlib import Path
 from typing import List
@@ -32,6 +33,11 @@ def _collect_paths() -> List[str]:
 
 
 def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--full", action="store_true", help="ignore the manifest and re-embed every file")
+    ap.add_argument("--no-embed-cache", action="store_true", help="encode every chunk, bypassing storage/embed_cache")
+    args = ap.parse_args()
+
     print("🚀 Running ingest:", __file__)
     print("🧭 CWD:", os.getcwd())
 
@@ -43,10 +49,23 @@ def main() -> None:
     embedder = get_embedder()
     store = HybridStore(embed_dim=embedder.dim)
 
-    ingest_paths(paths, store)
+    stats = ingest_paths(paths, store, incremental=not args.full, use_embed_cache=not args.no_embed_cache)
 
     # store.save() happens inside ingest_paths() in your pipeline
     print("✅ Ingest complete.")
+    print(
+        f"   files: {stats['files_embedded']} embedded, {stats['files_reused']} unchanged, {stats['files_dropped']} dropped"
+    )
+    print(
+        f"   chunks: {stats['chunks_embedded']} embedded, {stats['chunks_reused']} reused, "
+        f"{stats['chunks_total']} total in {stats['seconds']}s"
+    )
+    if stats["chunks_embedded"]:
+        print(f"   encoder: {stats['chunks_encoded']} encoded, {stats['embed_cache_hits']} from the embedding cache")
+    if stats["pages_extracted"]:
+        print(f"   pages: {stats['pages_extracted']} extracted ({stats['pages_per_second']} pages/s)")
+    if stats["generation"]:
+        print(f"   published generation {stats['generation']} (servers swap to it on their next poll)")
     print("   Output written to: ./storage (relative to app/backend)")
 
 
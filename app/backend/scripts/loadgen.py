@@ -0,0 +1,250 @@
+# app/backend/scripts/loadgen.py
+"""
+Open-loop load generator for the API.
+
+  python scripts/groq_stub.py --port 8001 --latency lognormal:1.0,0.4 &
+  GROQ_URL=http://127.0.0.1:8001/openai/v1/chat/completions GROQ_API_KEY=stub uvicorn src.main:app --port 8000 &
+  python -m scripts.loadgen --rps 20 --duration 30 --scenario chat --no-cache
+  python -m scripts.loadgen --rps 5 --scenario interview --json run.json
+
+Requests start on a fixed schedule (--arrival uniform) or as a Poisson process at
+--rps, whether or not earlier ones have finished, and latency is measured from
+the scheduled start. A slow server therefore shows up as latency instead of as a
+lower send rate (no coordinated omission). At most --max-in-flight requests are
+outstanding; arrivals beyond that are counted as "dropped".
+
+Scenarios:
+  chat         POST /chat
+  chat_stream  POST /chat/stream (also reports time to the first token event)
+  interview    POST /interview/start, then --answers POST /interview/answer in one session
+  mixed        chat / chat_stream / interview, picked per arrival
+
+Per endpoint the report has throughput, outcomes (ok, llm_error = 200 with an
+in-band LLM failure, app_error, http_<status>, exception) and p50/p95/p99/max latency.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+# /chat and the interview grader report LLM failures in-band, with these prefixes
+from src.rag.llm_groq import LLM_ERROR_PREFIXES
+
+INTERVIEW_QUESTIONS = 3
+
+QUESTIONS = [
+    "Summarize the main experience described in the documents.",
+    "Which projects are mentioned and what tools do they use?",
+    "What education is listed?",
+    "List the technical skills with evidence.",
+    "What roles would fit this profile best?",
+    "Describe the most recent position.",
+    "Which publications or talks are mentioned?",
+    "What measurable outcomes are reported?",
+]
+
+
+class Recorder:
+    def __init__(self):
+        self.latency_ms: Dict[str, List[float]] = {}
+        self.ttft_ms: Dict[str, List[float]] = {}
+        self.outcomes: Dict[str, Dict[str, int]] = {}
+
+    def add(self, endpoint: str, outcome: str, ms: float, ttft_ms: Optional[float] = None) -> None:
+        self.latency_ms.setdefault(endpoint, []).append(ms)
+        counts = self.outcomes.setdefault(endpoint, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+        if ttft_ms is not None:
+            self.ttft_ms.setdefault(endpoint, []).append(ttft_ms)
+
+
+def _pcts(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    a = np.asarray(values, dtype=np.float64)
+    return {
+        "count": len(a),
+        "p50_ms": round(float(np.percentile(a, 50)), 1),
+        "p95_ms": round(float(np.percentile(a, 95)), 1),
+        "p99_ms": round(float(np.percentile(a, 99)), 1),
+        "max_ms": round(float(a.max()), 1),
+    }
+
+
+def _outcome(r: httpx.Response, answer: Optional[str] = None) -> str:
+    if r.status_code != 200:
+        return f"http_{r.status_code}"
+    # a stream that fails part-way appends the error after the partial text
+    if answer is not None and any(p in answer for p in LLM_ERROR_PREFIXES):
+        return "llm_error"
+    return "ok"
+
+
+async def _chat(client: httpx.AsyncClient, rec: Recorder, t_sched: float, question: str, no_cache: bool) -> None:
+    try:
+        r = await client.post("/chat", json={"question": question, "no_cache": no_cache})
+        answer = r.json().get("answer", "") if r.status_code == 200 else None
+        rec.add("/chat", _outcome(r, answer), (time.perf_counter() - t_sched) * 1000)
+    except Exception:
+        rec.add("/chat", "exception", (time.perf_counter() - t_sched) * 1000)
+
+
+async def _chat_stream(client: httpx.AsyncClient, rec: Recorder, t_sched: float, question: str, no_cache: bool) -> None:
+    ttft = None
+    try:
+        async with client.stream("POST", "/chat/stream", json={"question": question, "no_cache": no_cache}) as r:
+            answer = None
+            event = ""
+            async for line in r.aiter_lines():
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                    if event == "token" and ttft is None:
+                        ttft = (time.perf_counter() - t_sched) * 1000
+                elif line.startswith("data:") and event == "done":
+                    answer = json.loads(line[len("data:"):]).get("answer", "")
+            outcome = _outcome(r, answer if answer is not None else "")
+        rec.add("/chat/stream", outcome, (time.perf_counter() - t_sched) * 1000, ttft)
+    except Exception:
+        rec.add("/chat/stream", "exception", (time.perf_counter() - t_sched) * 1000, ttft)
+
+
+async def _interview(client: httpx.AsyncClient, rec: Recorder, t_sched: float, answers: int) -> None:
+    t0 = t_sched
+    try:
+        r = await client.post("/interview/start", json={"n_questions": INTERVIEW_QUESTIONS})
+        body = r.json() if r.status_code == 200 else {}
+        outcome = _outcome(r)
+        if outcome == "ok" and body.get("total") != INTERVIEW_QUESTIONS:
+            outcome = "llm_error"  # start_interview fell back to one canned question
+        rec.add("/interview/start", outcome, (time.perf_counter() - t0) * 1000)
+        if "session_id" not in body:
+            return
+        for i in range(answers):
+            t0 = time.perf_counter()
+            r = await client.post("/interview/answer", json={"session_id": body["session_id"], "answer": f"Stub answer {i}."})
+            step = r.json() if r.status_code == 200 else {}
+            outcome = "app_error" if "error" in step else _outcome(r, step.get("grading", ""))
+            rec.add("/interview/answer", outcome, (time.perf_counter() - t0) * 1000)
+            if outcome != "ok" or step.get("done"):
+                return
+    except Exception:
+        rec.add("/interview", "exception", (time.perf_counter() - t0) * 1000)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    rng = random.Random(args.seed)
+    rec = Recorder()
+    scenarios = ["chat", "chat_stream", "interview"] if args.scenario == "mixed" else [args.scenario]
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    timeout = httpx.Timeout(args.timeout)
+    tasks: List[asyncio.Task] = []
+    in_flight = 0
+    dropped = 0
+    sent = 0
+
+    async def _one(kind: str, t_sched: float, i: int) -> None:
+        nonlocal in_flight
+        question = QUESTIONS[i % len(QUESTIONS)]
+        try:
+            if kind == "chat":
+                await _chat(client, rec, t_sched, question, args.no_cache)
+            elif kind == "chat_stream":
+                await _chat_stream(client, rec, t_sched, question, args.no_cache)
+            else:
+                await _interview(client, rec, t_sched, args.answers)
+        finally:
+            in_flight -= 1
+
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+        t_start = time.perf_counter()
+        t_next = t_start
+        i = 0
+        while t_next - t_start < args.duration:
+            delay = t_next - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if in_flight >= args.max_in_flight:
+                dropped += 1
+            else:
+                in_flight += 1
+                sent += 1
+                tasks.append(asyncio.create_task(_one(rng.choice(scenarios), t_next, i)))
+            i += 1
+            gap = rng.expovariate(args.rps) if args.arrival == "poisson" else 1.0 / args.rps
+            t_next += gap
+        send_s = time.perf_counter() - t_start
+        await asyncio.gather(*tasks)
+        wall_s = time.perf_counter() - t_start
+
+    endpoints = {}
+    for ep, lat in rec.latency_ms.items():
+        ok = rec.outcomes[ep].get("ok", 0)
+        endpoints[ep] = {
+            "outcomes": rec.outcomes[ep],
+            "ok_per_s": round(ok / wall_s, 2),
+            "latency": _pcts(lat),
+            **({"ttft": _pcts(rec.ttft_ms[ep])} if ep in rec.ttft_ms else {}),
+        }
+    return {
+        "url": args.url,
+        "scenario": args.scenario,
+        "target_rps": args.rps,
+        "arrival": args.arrival,
+        "sent": sent,
+        "dropped": dropped,
+        "achieved_rps": round(sent / send_s, 2) if send_s > 0 else None,
+        "wall_s": round(wall_s, 2),
+        "endpoints": endpoints,
+    }
+
+
+def _print(report: Dict[str, Any]) -> None:
+    print(
+        f"{report['scenario']}: target {report['target_rps']} rps ({report['arrival']}), "
+        f"sent {report['sent']} at {report['achieved_rps']} rps, dropped {report['dropped']}, wall {report['wall_s']}s"
+    )
+    print(f"{'endpoint':<20} {'ok/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  outcomes")
+    for ep, e in report["endpoints"].items():
+        lat = e["latency"]
+        print(
+            f"{ep:<20} {e['ok_per_s']:>7.2f} {lat['p50_ms']:>9.1f} {lat['p95_ms']:>9.1f} {lat['p99_ms']:>9.1f} "
+            f"{lat['max_ms']:>9.1f}  {e['outcomes']}"
+        )
+        if "ttft" in e:
+            t = e["ttft"]
+            print(f"{'  first token':<20} {'':>7} {t['p50_ms']:>9.1f} {t['p95_ms']:>9.1f} {t['p99_ms']:>9.1f} {t['max_ms']:>9.1f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--scenario", choices=["chat", "chat_stream", "interview", "mixed"], default="chat")
+    ap.add_argument("--rps", type=float, default=10.0, help="target arrival rate")
+    ap.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals (in-flight requests are awaited)")
+    ap.add_argument("--arrival", choices=["uniform", "poisson"], default="poisson")
+    ap.add_argument("--max-in-flight", type=int, default=256)
+    ap.add_argument("--timeout", type=float, default=60.0, help="per-request timeout (seconds)")
+    ap.add_argument("--answers", type=int, default=2, help="answers per interview session")
+    ap.add_argument("--no-cache", action="store_true", help="send no_cache=true (every /chat reaches the LLM)")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default="", help="write the report to this path")
+    args = ap.parse_args()
+    if args.rps <= 0:
+        ap.error("--rps must be > 0")
+
+    report = asyncio.run(run(args))
+    _print(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
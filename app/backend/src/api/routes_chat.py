@@ -1,12 +1,55 @@
-from fastapi import APIRouter
+import json
+from typing import List, Optional, Union
+
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from src.rag.rag import run_rag
+from src.rag.filters import MetadataFilter
+from src.rag.rag import run_rag, stream_rag
 
 router = APIRouter()
 
+class ChatFilters(BaseModel):
+    files: List[str] = []  # file names, e.g. "cv.pdf" or "report*.pdf"
+    sections: List[str] = []  # section text or glob, case-insensitive
+    pages: List[Union[int, str, List[int]]] = []  # 3, "3-7" or [3, 7]; inclusive
+
 class ChatRequest(BaseModel):
     question: str
+    no_cache: bool = False  # bypass the semantic answer cache for this request
+    timings: bool = False  # add a per-stage "timings_ms" breakdown to the response
+    filters: Optional[ChatFilters] = None  # restrict retrieval to matching chunks
+
+def _filters(req: ChatRequest) -> Optional[MetadataFilter]:
+    if req.filters is None:
+        return None
+    try:
+        return MetadataFilter.parse(req.filters.files, req.filters.sections, req.filters.pages)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @router.post("/chat")
-def chat(req: ChatRequest):
-    return run_rag(req.question, top_k=8, mode="chat")
+async def chat(req: ChatRequest):
+    return await run_rag(
+        req.question, top_k=8, mode="chat", use_cache=not req.no_cache, timings=req.timings, filters=_filters(req)
+    )
+
+@router.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Server-sent events: `sources` first (right after retrieval), then `token` /
+    `citation` events as the LLM generates, then `done` with the /chat payload.
+    """
+    filters = _filters(req)  # a bad filter fails the request before the stream starts
+
+    async def events():
+        async for event, data in stream_rag(
+            req.question, top_k=8, mode="chat", use_cache=not req.no_cache, timings=req.timings, filters=filters
+        ):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
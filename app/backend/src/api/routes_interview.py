@@ -17,9 +17,9 @@ class AnswerReq(BaseModel):
     answer: str = Field(..., min_length=1)
 
 @router.post("/interview/start")
-def interview_start(req: StartReq):
-    return start_interview(req.n_questions)
+async def interview_start(req: StartReq):
+    return await start_interview(req.n_questions)
 
 @router.post("/interview/answer")
-def interview_answer(req: AnswerReq):
-    return answer_interview(req.session_id, req.answer)
+async def interview_answer(req: AnswerReq):
+    return await answer_interview(req.session_id, req.answer)
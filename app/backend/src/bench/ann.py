@@ -0,0 +1,107 @@
+# src/bench/ann.py
+"""
+IVF recall/latency sweep against exact search on a synthetic corpus.
+
+  python -m src.bench.ann --n 200000 --nprobe 1,2,4,8,16,32
+
+Exact search (HybridStore.search_vector(..., exact=True)) is the ground truth.
+"""
+from __future__ import annotations
+import argparse
+import json
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.bench.synthetic import make_vectors, make_queries
+from src.rag.store import HybridStore, StoredChunk
+
+
+def _timed_ids(st: HybridStore, Q: np.ndarray, k: int, **kw) -> tuple[List[List[int]], List[float]]:
+    ids, lat = [], []
+    for q in Q:
+        t = time.perf_counter()
+        hits = st.search_vector(q, top_k=k, **kw)
+        lat.append(time.perf_counter() - t)
+        ids.append([i for i, _ in hits])
+    return ids, lat
+
+
+def run(n: int, dim: int, n_queries: int, k: int, nprobes: List[int], n_lists: int, vector_dtype: str) -> Dict[str, Any]:
+    X = make_vectors(n, dim)
+    Q = make_queries(X, n_queries)
+
+    with tempfile.TemporaryDirectory() as d:
+        st = HybridStore(embed_dim=dim, storage_dir=d, vector_dtype=vector_dtype, vector_index="ivf", ivf_nlist=n_lists)
+        t0 = time.perf_counter()
+        st.build(X, [StoredChunk(text=f"chunk {i}", metadata={}) for i in range(n)])
+        build_s = time.perf_counter() - t0
+        st.save()
+        del X
+
+        st = HybridStore(embed_dim=dim, storage_dir=d, vector_dtype=vector_dtype, vector_index="ivf")
+        st.load_vectors()
+
+        truth, exact_lat = _timed_ids(st, Q, k, exact=True)
+        results = [{
+            "nprobe": "exact",
+            "recall_at_k": 1.0,
+            "p50_ms": float(np.percentile(exact_lat, 50) * 1000),
+            "p95_ms": float(np.percentile(exact_lat, 95) * 1000),
+        }]
+        for nprobe in nprobes:
+            ids, lat = _timed_ids(st, Q, k, nprobe=nprobe)
+            recall = np.mean([len(set(t) & set(r)) / k for t, r in zip(truth, ids)])
+            results.append({
+                "nprobe": nprobe,
+                "recall_at_k": float(recall),
+                "p50_ms": float(np.percentile(lat, 50) * 1000),
+                "p95_ms": float(np.percentile(lat, 95) * 1000),
+            })
+
+    return {
+        "n": n,
+        "dim": dim,
+        "queries": n_queries,
+        "k": k,
+        "n_lists": st.ann.n_lists if st.ann else None,
+        "vector_dtype": vector_dtype,
+        "build_s": build_s,
+        "results": results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--nprobe", default="1,2,4,8,16,32")
+    ap.add_argument("--nlist", type=int, default=0, help="0 = 4 * sqrt(n)")
+    ap.add_argument("--dtype", default="float32")
+    ap.add_argument("--json", default="", help="write the report to this path")
+    args = ap.parse_args()
+
+    report = run(
+        args.n, args.dim, args.queries, args.k,
+        [int(x) for x in args.nprobe.split(",") if x.strip()],
+        args.nlist, args.dtype,
+    )
+
+    print(f"n={report['n']} lists={report['n_lists']} dtype={report['vector_dtype']} build={report['build_s']:.1f}s k={report['k']}")
+    print(f"{'nprobe':>7} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8}")
+    for r in report["results"]:
+        print(f"{r['nprobe']:>7} {r['recall_at_k']:>7.3f} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
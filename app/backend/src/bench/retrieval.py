@@ -0,0 +1,261 @@
+# src/bench/retrieval.py
+"""
+Retrieval micro-benchmarks over synthetic corpora.
+
+  python -m src.bench.retrieval --sizes 1000,10000,100000 --json bench.json
+  python -m src.bench.retrieval --sizes 1000000 --queries 100
+  python -m src.bench.retrieval --compare bench.json     # p50 ratios vs a previous run
+
+Every corpus size runs in a fresh spawned process (so peak memory is per size) and
+measures, with latency percentiles and throughput:
+
+  build, save, load                HybridStore on the synthetic corpus
+  embed_query                      query encoder (hashing embedder, offline)
+  search_bm25, search_vector       one query at a time, cand_k candidates
+  rrf_fuse                         retrieve_custom._rrf_fuse_arrays on those candidates
+  assemble_dedupe                  (file, page) dedupe + top_k + Hit materialization
+  retrieve                         end to end, BM25 + vector + fusion
+  make_chunks                      section-aware chunking of synthetic pages
+  make_context_pack                context pack of the retrieved hits
+
+peak_rss_mb is the high-water mark of the process after each step (VmHWM, reset
+before every step where the kernel allows it). Corpus vectors come from the hashing
+embedder up to --hash-max chunks and from clustered random vectors above that,
+which keeps 1M-chunk runs to minutes.
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import queue
+import resource
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.bench.synthetic import make_pages, make_text_queries, make_texts, make_vectors
+
+STEPS = [
+    "build", "save", "load", "embed_query", "search_bm25", "search_vector",
+    "rrf_fuse", "assemble_dedupe", "retrieve", "make_chunks", "make_context_pack",
+]
+
+
+def _status_mb(field: str) -> Optional[float]:
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_peak() -> None:
+    # "5" resets VmHWM to the current RSS (Linux >= 4.0); elsewhere the peak is cumulative
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def _peak_mb() -> float:
+    hwm = _status_mb("VmHWM")
+    if hwm is not None:
+        return hwm
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _summary(lat: List[float], items: int = 1) -> Dict[str, float]:
+    a = np.asarray(lat, dtype=np.float64) * 1000
+    total_s = float(a.sum()) / 1000
+    return {
+        "count": len(lat),
+        "p50_ms": round(float(np.percentile(a, 50)), 4),
+        "p95_ms": round(float(np.percentile(a, 95)), 4),
+        "p99_ms": round(float(np.percentile(a, 99)), 4),
+        "mean_ms": round(float(a.mean()), 4),
+        "per_s": round(len(lat) * items / total_s, 1) if total_s > 0 else None,
+    }
+
+
+def _step(results: Dict[str, Any], name: str, calls: List[Callable[[], Any]], items: int = 1) -> List[Any]:
+    """Runs each call once, timed; records percentiles, throughput and peak RSS."""
+    _reset_peak()
+    lat, outs = [], []
+    for fn in calls:
+        t = time.perf_counter()
+        outs.append(fn())
+        lat.append(time.perf_counter() - t)
+    results[name] = {**_summary(lat, items), "peak_rss_mb": round(_peak_mb(), 1)}
+    return outs
+
+
+def _run_size(n: int, args: Dict[str, Any], out: "mp.Queue") -> None:
+    from src.rag import retrieve_custom
+    from src.rag.chunking import make_chunks
+    from src.rag.embedder import HashingEmbedder
+    from src.rag.store import HybridStore, StoredChunk
+
+    dim, n_queries, top_k = args["dim"], args["queries"], args["top_k"]
+    cand_k = max(top_k * 4, 12)  # what retrieve() asks each channel for
+    embedder = HashingEmbedder(dim_override=dim)
+    res: Dict[str, Any] = {}
+
+    t0 = time.perf_counter()
+    texts = make_texts(n, words=args["words"])
+    chunks = [
+        StoredChunk(text=t, metadata={"file_name": f"doc{i % 500}.pdf", "page_label": str(i % 40 + 1), "section": "Document"})
+        for i, t in enumerate(texts)
+    ]
+    vector_source = "hash" if n <= args["hash_max"] else "clustered"
+    if vector_source == "hash":
+        X = np.concatenate([embedder.encode(texts[s:s + 4096]) for s in range(0, n, 4096)])
+    else:
+        X = make_vectors(n, dim)
+    queries = make_text_queries(texts, n_queries)
+    del texts
+    corpus_s = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as d:
+        st = HybridStore(embed_dim=dim, storage_dir=d)
+        st.meta = embedder.describe()
+        _step(res, "build", [lambda: st.build(X, chunks)], items=n)
+        _step(res, "save", [lambda: st.save()], items=n)
+        del st, X, chunks
+
+        def _load() -> HybridStore:
+            s = HybridStore(embed_dim=dim, storage_dir=d)
+            s.load()
+            return s
+        store = _step(res, "load", [_load] * args["load_repeats"])[-1]
+
+        q_vecs = _step(res, "embed_query", [lambda q=q: embedder.encode([q])[0] for q in queries])
+        bm25 = _step(res, "search_bm25", [lambda q=q: store.search_bm25(q, top_k=cand_k) for q in queries])
+        vec = _step(res, "search_vector", [lambda v=v: store.search_vector(v, top_k=cand_k) for v in q_vecs])
+
+        bm25_ids = [retrieve_custom._ranked_arrays(h)[0] for h in bm25]
+        vec_arrays = [retrieve_custom._ranked_arrays(h) for h in vec]
+        fused = _step(
+            res, "rrf_fuse",
+            [lambda a=a, b=b: retrieve_custom._rrf_fuse_arrays(a[0], b, k=60) for a, b in zip(vec_arrays, bm25_ids)],
+        )
+        store.page_groups()  # computed once per store (on warm-up in the API)
+
+        def _assemble(qi: int) -> List[Any]:
+            ids, scores = fused[qi]
+            vec_ids, vec_sims = vec_arrays[qi]
+            return retrieve_custom._select_hits(store, ids, scores, vec_ids, vec_sims, bm25_ids[qi], top_k)
+        _step(res, "assemble_dedupe", [lambda qi=qi: _assemble(qi) for qi in range(n_queries)])
+
+        # fresh query strings so the query-embedding LRU does not hide the encoder
+        e2e_queries = [q + " w1" for q in queries]
+        hits = _step(res, "retrieve", [lambda q=q: retrieve_custom.retrieve(q, top_k=top_k, store=store) for q in e2e_queries])
+
+        pages = make_pages(args["pages"])
+        _step(
+            res, "make_chunks",
+            [lambda p=p, i=i: make_chunks(p, file_name="bench.pdf", page_label=str(i + 1)) for i, p in enumerate(pages)],
+        )
+        _step(res, "make_context_pack", [lambda h=h: retrieve_custom.make_context_pack(h) for h in hits])
+
+    out.put({
+        "n": n,
+        "vectors": vector_source,
+        "corpus_s": round(corpus_s, 2),
+        "peak_rss_mb": max(s["peak_rss_mb"] for s in res.values()),
+        "steps": res,
+    })
+
+
+def run(sizes: List[int], args: Dict[str, Any]) -> Dict[str, Any]:
+    env = {"EMBED_BACKEND": "hash", "EMBED_DIM": str(args["dim"]), "RAG_VECTOR_ENABLED": "true"}
+    ctx = mp.get_context("spawn")
+    results = []
+    for n in sizes:
+        saved = {k: os.environ.get(k) for k in env}
+        os.environ.update(env)  # read at import time by the spawned child
+        try:
+            out = ctx.Queue()
+            proc = ctx.Process(target=_run_size, args=(n, args, out))
+            proc.start()
+        finally:
+            for k, v in saved.items():
+                if v is None:
+                    os.environ.pop(k, None)
+                else:
+                    os.environ[k] = v
+        while True:
+            try:
+                results.append(out.get(timeout=1.0))
+                break
+            except queue.Empty:
+                if proc.exitcode is not None:
+                    raise RuntimeError(f"benchmark for n={n} exited with {proc.exitcode}")
+        proc.join()
+        print(f"[bench] n={n} done", flush=True)
+
+    return {
+        "config": args,
+        "env": {"python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine(), "cpus": os.cpu_count()},
+        "sizes": results,
+    }
+
+
+def _print(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    base = {r["n"]: r["steps"] for r in (baseline or {}).get("sizes", [])}
+    for r in report["sizes"]:
+        print(f"\nn={r['n']} vectors={r['vectors']} peak_rss_mb={r['peak_rss_mb']}")
+        print(f"{'step':<18} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'per s':>12} {'peak MB':>9}" + ("  p50 vs base" if base else ""))
+        for name in STEPS:
+            s = r["steps"].get(name)
+            if s is None:
+                continue
+            line = f"{name:<18} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} {s['p99_ms']:>10.3f} {s['per_s'] or 0:>12.1f} {s['peak_rss_mb']:>9.1f}"
+            old = base.get(r["n"], {}).get(name)
+            if old and old["p50_ms"] > 0:
+                line += f"  {s['p50_ms'] / old['p50_ms']:>6.2f}x"
+            print(line)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000,10000,100000", help="comma-separated chunk counts (up to 1000000)")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top-k", type=int, default=8)
+    ap.add_argument("--words", type=int, default=100, help="words per synthetic chunk")
+    ap.add_argument("--pages", type=int, default=200, help="pages for make_chunks")
+    ap.add_argument("--load-repeats", type=int, default=3)
+    ap.add_argument("--hash-max", type=int, default=100_000, help="largest corpus embedded with the hashing embedder")
+    ap.add_argument("--json", default="", help="write the report to this path")
+    ap.add_argument("--compare", default="", help="previous JSON report to compare p50 against")
+    a = ap.parse_args()
+
+    args = {
+        "dim": a.dim, "queries": a.queries, "top_k": a.top_k, "words": a.words,
+        "pages": a.pages, "load_repeats": a.load_repeats, "hash_max": a.hash_max,
+    }
+    report = run([int(s) for s in a.sizes.split(",") if s.strip()], args)
+
+    baseline = None
+    if a.compare:
+        with open(a.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print(report, baseline)
+
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
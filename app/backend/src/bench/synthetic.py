@@ -0,0 +1,71 @@
+# src/bench/synthetic.py
+from __future__ import annotations
+from typing import List
+
+import numpy as np
+
+
+def make_vectors(n: int, dim: int = 384, n_clusters: int = 64, noise: float = 0.35, seed: int = 0) -> np.ndarray:
+    """
+    Clustered unit vectors (gaussian blobs around random centers), which behaves more
+    like real sentence embeddings than uniform noise: neighbours exist and are close.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    X = np.empty((n, dim), dtype=np.float32)
+    block = 65536
+    for s in range(0, n, block):
+        e = min(s + block, n)
+        assign = rng.integers(0, n_clusters, size=e - s)
+        X[s:e] = centers[assign] + noise * rng.standard_normal((e - s, dim)).astype(np.float32) / np.sqrt(dim) * 4
+    X /= np.linalg.norm(X, axis=1, keepdims=True) + 1e-12
+    return X
+
+
+def make_queries(X: np.ndarray, n_queries: int, noise: float = 0.1, seed: int = 1) -> np.ndarray:
+    """Queries are perturbed corpus vectors, so every query has a meaningful neighbourhood."""
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, X.shape[0], size=n_queries)
+    Q = X[picks] + noise * rng.standard_normal((n_queries, X.shape[1])).astype(np.float32) / np.sqrt(X.shape[1]) * 4
+    Q /= np.linalg.norm(Q, axis=1, keepdims=True) + 1e-12
+    return Q.astype(np.float32)
+
+
+def _vocab(size: int) -> np.ndarray:
+    return np.array([f"w{i}" for i in range(size)], dtype=object)
+
+
+def make_texts(n: int, words: int = 100, vocab_size: int = 20000, seed: int = 0) -> List[str]:
+    """Chunk-sized texts with a Zipf word distribution, so BM25 postings are skewed like real text."""
+    rng = np.random.default_rng(seed)
+    vocab = _vocab(vocab_size)
+    out: List[str] = []
+    block = 10000
+    for s in range(0, n, block):
+        e = min(s + block, n)
+        ids = np.minimum(rng.zipf(1.3, size=(e - s) * words), vocab_size) - 1
+        toks = vocab[ids].reshape(e - s, words)
+        out.extend(" ".join(row) for row in toks)
+    return out
+
+
+def make_text_queries(texts: List[str], n_queries: int, words: int = 5, seed: int = 1) -> List[str]:
+    """Queries are a few words sampled from random corpus texts, so BM25 always has matches."""
+    rng = np.random.default_rng(seed)
+    out = []
+    for i in rng.integers(0, len(texts), size=n_queries):
+        toks = texts[int(i)].split()
+        out.append(" ".join(toks[j] for j in rng.integers(0, len(toks), size=words)))
+    return out
+
+
+def make_pages(n_pages: int, words: int = 450, seed: int = 2) -> List[str]:
+    """Page texts with a few headings (ALL CAPS / trailing colon) for make_chunks."""
+    texts = make_texts(n_pages * 3, words=words // 3, seed=seed)
+    headings = ["EXPERIENCE", "Projects:", "## Publications"]
+    return [
+        "\n\n".join(f"{h}\n{texts[p * 3 + j]}" for j, h in enumerate(headings))
+        for p in range(n_pages)
+    ]
@@ -0,0 +1,136 @@
+# src/bench/vectors.py
+"""
+Vector storage benchmark: RSS cost and recall@k of each HybridStore vector mode
+against exact float32 search.
+
+  python -m src.bench.vectors --n 100000 --queries 200 --k 10
+
+Each mode is measured in a fresh spawned process so RSS deltas don't bleed into
+each other. Prints a table and a JSON blob (use --json to write it to a file).
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing as mp
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.bench.synthetic import make_vectors, make_queries
+from src.rag import quantize
+from src.rag.store import HybridStore, _top_k
+
+# mode -> (vector_dtype, mmap)
+MODES = {
+    "float32-copy": ("float32", False),  # previous behaviour: np.load(...).astype("float32")
+    "float32-mmap": ("float32", True),
+    "float16-mmap": ("float16", True),
+    "int8-mmap": ("int8", True),
+}
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _measure(mode: str, storage_dir: str, dim: int, queries: np.ndarray, k: int, out: "mp.Queue") -> None:
+    dtype, mmap = MODES[mode]
+    st = HybridStore(embed_dim=dim, storage_dir=storage_dir, vector_dtype=dtype, mmap=mmap)
+
+    rss0 = rss_mb()
+    t0 = time.perf_counter()
+    st.load_vectors()
+    load_s = time.perf_counter() - t0
+
+    lat: List[float] = []
+    ids: List[List[int]] = []
+    for q in queries:
+        t = time.perf_counter()
+        hits = st.search_vector(q, top_k=k)
+        lat.append(time.perf_counter() - t)
+        ids.append([i for i, _ in hits])
+
+    out.put({
+        "mode": mode,
+        "load_s": load_s,
+        "rss_delta_mb": rss_mb() - rss0,
+        "p50_ms": float(np.percentile(lat, 50) * 1000),
+        "p95_ms": float(np.percentile(lat, 95) * 1000),
+        "ids": ids,
+    })
+
+
+def _write_store(storage_dir: str, X: np.ndarray, modes: List[str]) -> None:
+    np.save(os.path.join(storage_dir, "vectors.npy"), X)
+    for dtype in {MODES[m][0] for m in modes} - {"float32"}:
+        Q, scales = quantize.quantize(X, dtype)
+        np.save(os.path.join(storage_dir, f"vectors.{dtype}.npy"), Q)
+        if scales is not None:
+            np.save(os.path.join(storage_dir, f"vectors.{dtype}.scale.npy"), scales)
+
+
+def run(n: int, dim: int, n_queries: int, k: int, modes: List[str]) -> Dict[str, Any]:
+    X = make_vectors(n, dim)
+    Q = make_queries(X, n_queries)
+    truth = [set(_top_k(X @ q, k).tolist()) for q in Q]
+
+    ctx = mp.get_context("spawn")
+    results = []
+    with tempfile.TemporaryDirectory() as d:
+        _write_store(d, X, modes)
+        del X
+        for mode in modes:
+            out = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(mode, d, dim, Q, k, out))
+            proc.start()
+            res = out.get()
+            proc.join()
+            ids = res.pop("ids")
+            res["recall_at_k"] = float(np.mean([len(truth[i] & set(r)) / k for i, r in enumerate(ids)]))
+            results.append(res)
+
+    base = next((r["rss_delta_mb"] for r in results if r["mode"] == "float32-copy"), None)
+    for r in results:
+        r["rss_vs_float32_copy"] = (base / r["rss_delta_mb"]) if base and r["rss_delta_mb"] > 0 else None
+
+    return {"n": n, "dim": dim, "queries": n_queries, "k": k, "results": results}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=100_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--json", default="", help="write the report to this path")
+    args = ap.parse_args()
+
+    report = run(args.n, args.dim, args.queries, args.k, [m.strip() for m in args.modes.split(",") if m.strip()])
+
+    print(f"n={report['n']} dim={report['dim']} queries={report['queries']} k={report['k']}")
+    print(f"{'mode':<14} {'rss MB':>8} {'x less':>7} {'recall':>7} {'p50 ms':>7} {'p95 ms':>7}")
+    for r in report["results"]:
+        ratio = f"{r['rss_vs_float32_copy']:.1f}" if r["rss_vs_float32_copy"] else "-"
+        print(f"{r['mode']:<14} {r['rss_delta_mb']:>8.1f} {ratio:>7} {r['recall_at_k']:>7.3f} {r['p50_ms']:>7.2f} {r['p95_ms']:>7.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
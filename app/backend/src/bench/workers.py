@@ -0,0 +1,182 @@
+# src/bench/workers.py
+"""
+Per-worker memory of the loaded store with several API workers on one node.
+
+  python -m src.bench.workers --n 200000 --workers 4
+
+Builds a synthetic store (clustered vectors + random-word chunks), then for each
+mode starts --workers spawned processes that load it through retrieve_custom and
+run a few hybrid queries, and reads /proc/<pid>/smaps_rollup while all are alive:
+
+  copy - RAG_VECTOR_MMAP=false: vectors copied into each worker
+  mmap - RAG_VECTOR_MMAP=true: store files mapped from the page cache
+  shm  - RAG_SHM_DIR: store staged once in /dev/shm and mapped by every worker
+
+"uss" (private pages) is what each extra worker adds; "pss" splits shared pages
+between the workers mapping them. Both are reported relative to the same worker
+before it loaded the store. Uses the hash embedder, so it runs offline (the encoder
+model, which is per worker in every mode, is not part of the numbers).
+"""
+from __future__ import annotations
+import argparse
+import json
+import multiprocessing as mp
+import os
+import queue
+import shutil
+import tempfile
+from typing import Any, Dict, List
+
+import numpy as np
+
+from src.bench.synthetic import make_texts, make_vectors
+from src.rag.chunk_store import StoredChunk
+from src.rag.embedder import HashingEmbedder
+from src.rag.store import HybridStore
+
+MODES = {
+    "copy": {"RAG_VECTOR_MMAP": "false"},
+    "mmap": {"RAG_VECTOR_MMAP": "true"},
+    "shm": {"RAG_VECTOR_MMAP": "true", "RAG_SHM_DIR": "<shm>"},
+}
+
+
+def smaps_mb(pid: int) -> Dict[str, float]:
+    """rss / pss / uss of a process in MB (Linux)."""
+    fields = {"Rss": 0, "Pss": 0, "Private_Clean": 0, "Private_Dirty": 0}
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        path = f"/proc/{pid}/smaps"
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in fields:
+                fields[key] += int(rest.split()[0])
+    return {
+        "rss": fields["Rss"] / 1024,
+        "pss": fields["Pss"] / 1024,
+        "uss": (fields["Private_Clean"] + fields["Private_Dirty"]) / 1024,
+    }
+
+
+def build_store(storage_dir: str, n: int, dim: int, seed: int = 0) -> None:
+    texts = make_texts(n, words=120, seed=seed)
+    store = HybridStore(embed_dim=dim, storage_dir=storage_dir)
+    store.meta = HashingEmbedder(dim_override=dim).describe()
+    writer = store.writer()
+    X = make_vectors(n, dim, seed=seed)
+    batch = 4096
+    for s in range(0, n, batch):
+        e = min(s + batch, n)
+        chunks = [
+            StoredChunk(
+                text=texts[i],
+                metadata={"file_name": f"doc{i % 200}.pdf", "page_label": str(i % 400 + 1), "section": "Document"},
+            )
+            for i in range(s, e)
+        ]
+        writer.add(chunks, X[s:e])
+    writer.finish()
+
+
+def _worker(n_queries: int, ready: "mp.Queue", stop: "mp.Event") -> None:
+    from src.rag import retrieve_custom
+
+    before = smaps_mb(os.getpid())
+    store = retrieve_custom.get_store()
+    for i in range(n_queries):
+        retrieve_custom.retrieve(f"w{i} w{i * 7 % 997} w3", top_k=8)
+    ready.put({"pid": os.getpid(), "before": before, "chunks": len(store.chunks)})
+    stop.wait()
+
+
+def run_mode(mode: str, storage_dir: str, dim: int, n_workers: int, n_queries: int, shm_root: str) -> Dict[str, Any]:
+    env = {
+        "RAG_STORAGE_DIR": storage_dir,
+        "EMBED_BACKEND": "hash",
+        "EMBED_DIM": str(dim),
+        "RAG_SHM_DIR": "",
+        "RAG_STORE_WATCH_S": "0",
+        "RAG_WARMUP": "off",
+    }
+    env.update({k: (shm_root if v == "<shm>" else v) for k, v in MODES[mode].items()})
+
+    ctx = mp.get_context("spawn")
+    ready, stop = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(n_queries, ready, stop)) for _ in range(n_workers)]
+    # config is read at import time, which in a spawned child happens before the
+    # target runs: the environment has to be in place when the process starts
+    saved = {k: os.environ.get(k) for k in env}
+    os.environ.update(env)
+    try:
+        for p in procs:
+            p.start()
+    finally:
+        for k, v in saved.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+
+    infos = []
+    while len(infos) < n_workers:
+        try:
+            infos.append(ready.get(timeout=1.0))
+        except queue.Empty:
+            if any(p.exitcode not in (None, 0) for p in procs):
+                stop.set()
+                raise RuntimeError(f"{mode}: a worker exited with {[p.exitcode for p in procs]}")
+    # measured while every worker is alive, so shared pages are split n ways in pss
+    workers: List[Dict[str, float]] = []
+    for info in infos:
+        now = smaps_mb(info["pid"])
+        workers.append({k: round(now[k] - info["before"][k], 1) for k in ("rss", "pss", "uss")})
+    stop.set()
+    for p in procs:
+        p.join()
+
+    return {
+        "mode": mode,
+        "workers": n_workers,
+        "per_worker": workers,
+        "incremental_uss_mb": round(float(np.mean([w["uss"] for w in workers])), 1),
+        "incremental_rss_mb": round(float(np.mean([w["rss"] for w in workers])), 1),
+        "node_total_pss_mb": round(sum(w["pss"] for w in workers), 1),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--queries", type=int, default=20)
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--json", default="", help="write the report to this path")
+    args = ap.parse_args()
+
+    shm_root = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), f"pq-bench-{os.getpid()}")
+    results = []
+    with tempfile.TemporaryDirectory() as d:
+        build_store(d, args.n, args.dim)
+        try:
+            for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+                results.append(run_mode(mode, d, args.dim, args.workers, args.queries, shm_root))
+        finally:
+            shutil.rmtree(shm_root, ignore_errors=True)
+    report = {"n": args.n, "dim": args.dim, "results": results}
+
+    print(f"n={args.n} dim={args.dim} workers={args.workers}")
+    print(f"{'mode':<6} {'rss/worker':>11} {'uss/worker':>11} {'pss total':>10}")
+    for r in results:
+        print(f"{r['mode']:<6} {r['incremental_rss_mb']:>11.1f} {r['incremental_uss_mb']:>11.1f} {r['node_total_pss_mb']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,11 +13,21 @@ if ENV_PATH.exists():
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile") 
+# Point at a local stub (scripts/groq_stub.py) for tests / load tests
+GROQ_URL = os.getenv("GROQ_URL", "https://api.groq.com/openai/v1/chat/completions")
+GROQ_CONNECT_TIMEOUT = float(os.getenv("GROQ_CONNECT_TIMEOUT", "5"))
+GROQ_READ_TIMEOUT = float(os.getenv("GROQ_READ_TIMEOUT", "45"))
+GROQ_MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "200"))
+GROQ_MAX_KEEPALIVE = int(os.getenv("GROQ_MAX_KEEPALIVE", "50"))
 
 # Data
 PRIVATE_DATA_DIR = os.getenv("PRIVATE_DATA_DIR", "../../data/private")
 RAG_STORAGE_DIR = os.getenv("RAG_STORAGE_DIR", "storage")
 EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+# st | st-int8 | hash (see src/rag/embedder.py). EMBED_DIM sizes the hash backend and
+# is the fallback store dimension when a store predates store_meta.json.
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "st").lower()
+EMBED_DIM = int(os.getenv("EMBED_DIM", "384"))
 
 TOP_K = int(os.getenv("TOP_K", "8"))
 
@@ -25,5 +35,55 @@ TOP_K = int(os.getenv("TOP_K", "8"))
 RAG_VECTOR_ENABLED = os.getenv("RAG_VECTOR_ENABLED", "true").lower() in {"1", "true", "yes"}
 RAG_HYBRID_ENABLED = os.getenv("RAG_HYBRID_ENABLED", "true").lower() in {"1", "true", "yes"}
 
+# Vector storage
+# float32 | float16 | int8. Quantized modes score the short list again in float32.
+RAG_VECTOR_DTYPE = os.getenv("RAG_VECTOR_DTYPE", "float32").lower()
+RAG_VECTOR_MMAP = os.getenv("RAG_VECTOR_MMAP", "true").lower() in {"1", "true", "yes"}
+RAG_RESCORE_FACTOR = int(os.getenv("RAG_RESCORE_FACTOR", "4"))
+# exact | ivf. IVF is built at ingest; nprobe trades recall for latency (0 lists = auto).
+RAG_VECTOR_INDEX = os.getenv("RAG_VECTOR_INDEX", "exact").lower()
+RAG_IVF_NLIST = int(os.getenv("RAG_IVF_NLIST", "0"))
+RAG_IVF_NPROBE = int(os.getenv("RAG_IVF_NPROBE", "16"))
+
+# Query-embedding LRU (entries); 0 disables
+RAG_QUERY_CACHE_SIZE = int(os.getenv("RAG_QUERY_CACHE_SIZE", "1024"))
+
+# Query-encoder micro-batching: concurrent queries arriving within the window are
+# encoded in one forward pass (window 0 disables)
+RAG_EMBED_BATCH_WINDOW_MS = float(os.getenv("RAG_EMBED_BATCH_WINDOW_MS", "2"))
+RAG_EMBED_MAX_BATCH = int(os.getenv("RAG_EMBED_MAX_BATCH", "32"))
+
+# Semantic answer cache in front of run_rag; size 0 disables
+RAG_ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "512"))
+RAG_ANSWER_CACHE_TTL_S = float(os.getenv("RAG_ANSWER_CACHE_TTL_S", "3600"))
+RAG_ANSWER_CACHE_THRESHOLD = float(os.getenv("RAG_ANSWER_CACHE_THRESHOLD", "0.95"))
+
+# Chunking: word windows per section. The ingest manifest records these, and an
+# incremental ingest with different values re-chunks every file.
+CHUNK_MAX_WORDS = int(os.getenv("CHUNK_MAX_WORDS", "220"))
+CHUNK_OVERLAP_WORDS = int(os.getenv("CHUNK_OVERLAP_WORDS", "40"))
+
+# Ingest: PDF pages are extracted across a process pool (0 workers = one per core)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "0"))
+INGEST_PAGES_PER_TASK = int(os.getenv("INGEST_PAGES_PER_TASK", "8"))
+INGEST_PAGE_TIMEOUT_S = float(os.getenv("INGEST_PAGE_TIMEOUT_S", "30"))
+# Chunks embedded and appended to the on-disk store per batch (bounds ingest memory)
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "256"))
+# Persistent chunk-embedding cache (storage/embed_cache); only unseen texts are encoded
+INGEST_EMBED_CACHE = os.getenv("INGEST_EMBED_CACHE", "true").lower() in {"1", "true", "yes"}
+
+# Store generations: ingest publishes storage/generations/<id> via storage/CURRENT and
+# servers poll CURRENT every RAG_STORE_WATCH_S seconds (0 disables) to hot-swap the store
+RAG_STORE_GENERATIONS = os.getenv("RAG_STORE_GENERATIONS", "true").lower() in {"1", "true", "yes"}
+RAG_STORE_KEEP_GENERATIONS = int(os.getenv("RAG_STORE_KEEP_GENERATIONS", "2"))
+RAG_STORE_WATCH_S = float(os.getenv("RAG_STORE_WATCH_S", "5"))
+
+# Optional tmpfs directory (e.g. /dev/shm/personaquery). The live store is copied there
+# once per node and memory-mapped, so all uvicorn workers share one physical copy.
+RAG_SHM_DIR = os.getenv("RAG_SHM_DIR", "")
+
+# Startup warm-up of store + encoder: background | blocking | off (lazy, first request pays)
+RAG_WARMUP = os.getenv("RAG_WARMUP", "background").lower()
+
 # Safety
 INJECTION_GUARD_ENABLED = os.getenv("INJECTION_GUARD_ENABLED", "true").lower() in {"1", "true", "yes"}
@@ -0,0 +1,196 @@
+# src/core/metrics.py
+"""
+Minimal in-process metrics with Prometheus text exposition (no client library).
+
+  REQUESTS = REGISTRY.counter("x_total", "help", ("kind",));  REQUESTS.labels(kind="a").inc()
+  with span("bm25"): ...        # rag_stage_seconds{stage="bm25"} + per-request timings
+
+Metrics are per process: with several uvicorn workers each one exports its own.
+"""
+from __future__ import annotations
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# seconds; request stages range from ~0.1 ms (fusion) to tens of seconds (LLM)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Counter:
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram (Prometheus semantics: a value v lands in every bucket with
+    upper bound le >= v, plus +Inf). Thread-safe; observe() is O(log buckets).
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets: List[float] = sorted(float(b) for b in buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # last slot = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """{"buckets": {le: cumulative count}, "count", "sum"}; le "+Inf" holds everything."""
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for le, c in zip([*(_fmt(b) for b in self.buckets), "+Inf"], counts):
+            running += c
+            cumulative[le] = running
+        return {"buckets": cumulative, "count": count, "sum": round(total, 6)}
+
+
+Metric = Union[Counter, Histogram]
+
+
+class Family:
+    """A named metric with label dimensions; labels(...) returns the child for one label set."""
+
+    def __init__(self, name: str, help: str, kind: str, labelnames: Sequence[str], buckets: Sequence[float] = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Metric] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames and kind == "counter":
+            self.labels()  # export 0 before the first increment
+
+    def labels(self, **labels: Any) -> Any:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = Counter() if self.kind == "counter" else Histogram(self.buckets)
+                    self._children[key] = child
+        return child
+
+    def attach(self, metric: Metric, **labels: Any) -> None:
+        """Exports an existing Counter / Histogram (e.g. owned by another component)."""
+        with self._lock:
+            self._children[tuple(str(labels[n]) for n in self.labelnames)] = metric
+
+    # unlabeled families
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            children = sorted(self._children.items())
+        for key, child in children:
+            pairs = [f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key)]
+            if isinstance(child, Counter):
+                lines.append(f"{self.name}{_labels(pairs)} {_fmt(child.value)}")
+                continue
+            snap = child.snapshot()
+            for le, count in snap["buckets"].items():
+                bucket_labels = _labels(pairs + ['le="%s"' % le])
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            lines.append(f"{self.name}_sum{_labels(pairs)} {_fmt(snap['sum'])}")
+            lines.append(f"{self.name}_count{_labels(pairs)} {snap['count']}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._families: Dict[str, Family] = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name: str, help: str, kind: str, labelnames: Sequence[str], buckets: Sequence[float] = ()) -> Family:
+        with self._lock:
+            fam = self._families.get(name)
+            if fam is None:
+                fam = self._families[name] = Family(name, help, kind, labelnames, buckets)
+            elif fam.kind != kind or fam.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as {fam.kind}{fam.labelnames}")
+            return fam
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Family:
+        return self._family(name, help, "counter", labelnames)
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float] = LATENCY_BUCKETS, labelnames: Sequence[str] = ()) -> Family:
+        return self._family(name, help, "histogram", labelnames, buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._families.values())
+        return "\n".join(line for fam in families for line in fam.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "rag_stage_seconds", "Time spent per request stage.", LATENCY_BUCKETS, ("stage",)
+)
+
+CACHE_REQUESTS = REGISTRY.counter(
+    "rag_cache_requests_total", "Cache lookups by cache and result (hit / miss).", ("cache", "result")
+)
+
+# per-request stage timings (ms); asyncio.to_thread copies the context, so the same
+# dict is filled from the event loop and from the worker thread
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_timings", default=None)
+
+
+def start_timings() -> Dict[str, float]:
+    """Starts collecting span durations for the current request and returns the dict."""
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        dt = time.perf_counter() - t0
+        STAGE_SECONDS.labels(stage=stage).observe(dt)
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = round(timings.get(stage, 0.0) + dt * 1000, 3)
+
+
+def _labels(pairs: List[str]) -> str:
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(x: float) -> str:
+    return str(int(x)) if float(x).is_integer() else repr(x)
@@ -0,0 +1,89 @@
+# src/eval/metrics.py
+"""
+Retrieval metrics over labeled relevant units, plus latency percentiles.
+
+A label is "file", "file:page" or "file:page:chunk_id" (chunk_id = the chunk's index
+within its section on that page, as written by chunking, so several chunks of a page
+can share one), so labels survive re-ingests. Each label counts once: a hit is
+relevant if it matches a label no earlier hit has matched; list a label twice to
+expect two matching chunks.
+"""
+from __future__ import annotations
+import math
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+Label = Tuple[str, Optional[str], Optional[str]]
+
+
+def parse_label(label: str) -> Label:
+    parts = [p.strip() for p in str(label).split(":")]
+    if not parts[0] or len(parts) > 3:
+        raise ValueError(f"bad relevance label {label!r}; expected file[:page[:chunk_id]]")
+    parts += [None] * (3 - len(parts))
+    return parts[0].casefold(), parts[1], parts[2]
+
+
+def _matches(label: Label, metadata: Mapping[str, Any]) -> bool:
+    file_name, page, chunk = label
+    if str(metadata.get("file_name", "")).casefold() != file_name:
+        return False
+    if page is not None and str(metadata.get("page_label", "")) != page:
+        return False
+    return chunk is None or str(metadata.get("chunk_id", "")) == chunk
+
+
+def relevance(hits_metadata: Iterable[Mapping[str, Any]], labels: Sequence[Label]) -> List[int]:
+    """0/1 per ranked hit; every label can make at most one hit relevant."""
+    open_labels = list(labels)
+    rel: List[int] = []
+    for meta in hits_metadata:
+        j = next((j for j, lab in enumerate(open_labels) if _matches(lab, meta)), None)
+        if j is None:
+            rel.append(0)
+        else:
+            open_labels.pop(j)
+            rel.append(1)
+    return rel
+
+
+def recall_at_k(rel: Sequence[int], n_relevant: int, k: int) -> float:
+    return sum(rel[:k]) / n_relevant if n_relevant else 0.0
+
+
+def reciprocal_rank(rel: Sequence[int]) -> float:
+    return next((1.0 / (i + 1) for i, r in enumerate(rel) if r), 0.0)
+
+
+def ndcg_at_k(rel: Sequence[int], n_relevant: int, k: int) -> float:
+    dcg = sum(r / math.log2(i + 2) for i, r in enumerate(rel[:k]))
+    ideal = sum(1.0 / math.log2(i + 2) for i in range(min(n_relevant, k)))
+    return dcg / ideal if ideal > 0 else 0.0
+
+
+def case_metrics(rel: Sequence[int], n_relevant: int, ks: Sequence[int]) -> Dict[str, float]:
+    out: Dict[str, float] = {"mrr": reciprocal_rank(rel)}
+    for k in ks:
+        out[f"recall@{k}"] = recall_at_k(rel, n_relevant, k)
+        out[f"ndcg@{k}"] = ndcg_at_k(rel, n_relevant, k)
+    return out
+
+
+def mean_metrics(per_case: Sequence[Mapping[str, float]]) -> Dict[str, float]:
+    if not per_case:
+        return {}
+    return {name: round(float(np.mean([c[name] for c in per_case])), 4) for name in per_case[0]}
+
+
+def percentiles(values_ms: Sequence[float]) -> Dict[str, float]:
+    if not values_ms:
+        return {"count": 0}
+    a = np.asarray(values_ms, dtype=np.float64)
+    return {
+        "count": len(a),
+        "p50_ms": round(float(np.percentile(a, 50)), 3),
+        "p95_ms": round(float(np.percentile(a, 95)), 3),
+        "p99_ms": round(float(np.percentile(a, 99)), 3),
+        "mean_ms": round(float(a.mean()), 3),
+    }
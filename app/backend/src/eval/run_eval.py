@@ -1,44 +1,258 @@
 # src/eval/run_eval.py
+"""
+Evaluation over src/eval/qa.jsonl.
+
+  python -m src.eval.run_eval                          # end to end via run_rag (LLM calls)
+  python -m src.eval.run_eval --workers 8              # ... 8 cases in flight at a time
+  python -m src.eval.run_eval --retrieval              # labeled retrieval only, no LLM calls
+  python -m src.eval.run_eval --retrieval --json a.json
+  RAG_VECTOR_DTYPE=int8 python -m src.eval.run_eval --retrieval --compare a.json
+
+qa.jsonl holds one case per line ("#" lines are skipped):
+  id, question
+  must_include, must_cite   end-to-end checks on the answer
+  relevant                  labels for --retrieval: "file", "file:page" or "file:page:chunk_id"
+  filters                   optional {"files", "sections", "pages"}, as on /chat
+
+--retrieval runs the labeled cases through retrieve_many in batches and reports
+recall@k, nDCG@k, MRR and per-stage latency percentiles (per batch, plus the
+amortized per-query total). Retrieval settings are read from the environment at
+import time, so a configuration comparison is one run per configuration.
+"""
 from __future__ import annotations
+import argparse
+import asyncio
 import json
 import re
-from src.rag.rag import run_rag
+import time
+from typing import Any, Dict, List, Optional
 
+from src.core import config
+from src.core.metrics import start_timings
+from src.eval.metrics import case_metrics, mean_metrics, parse_label, percentiles, relevance
+from src.rag.filters import MetadataFilter
+
+QA_PATH = "src/eval/qa.jsonl"
 CITE_RE = re.compile(r"\[[^\]]+\|\s*p\.[^\]]+\|\s*[^\]]+\]")
 
-def run():
-    passed = 0
-    total = 0
-    with open("src/eval/qa.jsonl", "r", encoding="utf-8") as f:
+
+def load_cases(path: str = QA_PATH) -> List[Dict[str, Any]]:
+    cases = []
+    with open(path, "r", encoding="utf-8") as f:
         for line in f:
             if not line.strip():
                 continue
             if line.strip().startswith("#") or line.strip().startswith("..."):
                 continue
             try:
-                item = json.loads(line)
+                cases.append(json.loads(line))
             except Exception:
                 continue
-            total += 1
-            res = run_rag(item["question"], top_k=12, mode="chat")
-            ans = res["answer"]
+    return cases
+
+
+def _case_filter(item: Dict[str, Any]) -> Optional[MetadataFilter]:
+    flt = item.get("filters") or {}
+    return MetadataFilter.parse(flt.get("files"), flt.get("sections"), flt.get("pages"))
+
+
+def _config() -> Dict[str, Any]:
+    names = (
+        "EMBED_BACKEND", "EMBED_MODEL", "RAG_VECTOR_ENABLED", "RAG_VECTOR_DTYPE", "RAG_RESCORE_FACTOR",
+        "RAG_VECTOR_INDEX", "RAG_IVF_NLIST", "RAG_IVF_NPROBE", "RAG_STORAGE_DIR",
+    )
+    return {n: getattr(config, n) for n in names}
+
+
+# ---------------- retrieval only ----------------
+
+def run_retrieval(cases: List[Dict[str, Any]], ks: List[int], batch: int = 16, repeat: int = 3) -> Dict[str, Any]:
+    from src.rag import retrieve_custom
+
+    labeled = [c for c in cases if c.get("relevant")]
+    top_k = max(ks)
+    store = retrieve_custom.get_store()
+    retrieve_custom.retrieve_many(["warm up"], top_k=top_k)  # encoder + lazy store indexes
+
+    # cases sharing a filter go through retrieve_many together
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    filters: Dict[str, Optional[MetadataFilter]] = {}
+    for c in labeled:
+        flt = _case_filter(c)
+        key = flt.key() if flt is not None else ""
+        groups.setdefault(key, []).append(c)
+        filters[key] = flt
+
+    hits_by_id: Dict[str, List[Any]] = {}
+    batch_ms: Dict[str, List[float]] = {}
+    per_query_ms: List[float] = []
+    for rep in range(repeat):
+        retrieve_custom.clear_query_cache()  # every pass pays for query encoding
+        for key, group in groups.items():
+            for s in range(0, len(group), batch):
+                chunk = group[s:s + batch]
+                stage_ms = start_timings()
+                t0 = time.perf_counter()
+                out = retrieve_custom.retrieve_many([c["question"] for c in chunk], top_k=top_k, filters=filters[key])
+                total = (time.perf_counter() - t0) * 1000
+                for stage, ms in {**stage_ms, "total": total}.items():
+                    batch_ms.setdefault(stage, []).append(ms)
+                per_query_ms.append(total / len(chunk))
+                if rep == 0:
+                    hits_by_id.update({c["id"]: hits for c, hits in zip(chunk, out)})
+
+    per_case = []
+    for c in labeled:
+        labels = [parse_label(x) for x in c["relevant"]]
+        hits = hits_by_id[c["id"]]
+        rel = relevance([h["metadata"] for h in hits], labels)
+        per_case.append({
+            "id": c["id"],
+            "n_relevant": len(labels),
+            "relevance": rel,
+            "retrieved": [f'{h["metadata"].get("file_name")}:{h["metadata"].get("page_label")}' for h in hits],
+            **case_metrics(rel, len(labels), ks),
+        })
+
+    return {
+        "mode": "retrieval",
+        "config": _config(),
+        "store": {"chunks": len(store.chunks), "generation": store.generation},
+        "cases": len(labeled),
+        "skipped_unlabeled": len(cases) - len(labeled),
+        "top_k": top_k,
+        "batch": batch,
+        "repeat": repeat,
+        "metrics": mean_metrics([{k: v for k, v in c.items() if k.startswith(("recall", "ndcg", "mrr"))} for c in per_case]),
+        "latency": {
+            "per_query_ms": percentiles(per_query_ms),
+            "per_batch_ms": {stage: percentiles(v) for stage, v in batch_ms.items()},
+        },
+        "per_case": per_case,
+    }
 
-            ok = True
-            for s in item.get("must_include", []):
-                if s.lower() not in ans.lower():
-                    ok = False
 
-            if item.get("must_cite", True) and not CITE_RE.search(ans):
+def _print_retrieval(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None, verbose: bool = False) -> None:
+    if verbose:
+        for c in report["per_case"]:
+            print(f"{c['id']:<12} mrr={c['mrr']:.2f} rel={''.join(map(str, c['relevance']))} {c['retrieved'][:5]}")
+    print(
+        f"\n{report['cases']} labeled cases ({report['skipped_unlabeled']} unlabeled skipped), "
+        f"top_k={report['top_k']}, {report['store']['chunks']} chunks"
+    )
+    base_m = (baseline or {}).get("metrics", {})
+    for name, v in report["metrics"].items():
+        delta = f"  ({v - base_m[name]:+.4f})" if name in base_m else ""
+        print(f"  {name:<12} {v:.4f}{delta}")
+
+    base_l = (baseline or {}).get("latency", {}).get("per_batch_ms", {})
+    print(f"\n  {'stage (per batch)':<18} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}" + ("  p50 vs base" if base_l else ""))
+    rows = [("per query", report["latency"]["per_query_ms"], (baseline or {}).get("latency", {}).get("per_query_ms"))]
+    rows += [(stage, s, base_l.get(stage)) for stage, s in report["latency"]["per_batch_ms"].items()]
+    for name, s, old in rows:
+        line = f"  {name:<18} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} {s['p99_ms']:>9.3f}"
+        if old and old.get("p50_ms"):
+            line += f"  {s['p50_ms'] / old['p50_ms']:>6.2f}x"
+        print(line)
+
+
+# ---------------- end to end ----------------
+
+async def run_e2e(cases: List[Dict[str, Any]], workers: int = 4, top_k: int = 12, use_cache: bool = True) -> Dict[str, Any]:
+    from src.rag.rag import SOURCE_ID_RE, run_rag
+
+    sem = asyncio.Semaphore(max(1, workers))
+
+    async def _one(item: Dict[str, Any]) -> Dict[str, Any]:
+        async with sem:
+            t0 = time.perf_counter()
+            res = await run_rag(
+                item["question"], top_k=top_k, mode="chat", use_cache=use_cache, timings=True, filters=_case_filter(item)
+            )
+            return {"item": item, "res": res, "ms": (time.perf_counter() - t0) * 1000}
+
+    t0 = time.perf_counter()
+    done = await asyncio.gather(*(_one(c) for c in cases))
+    wall_s = time.perf_counter() - t0
+
+    passed = 0
+    stage_ms: Dict[str, List[float]] = {}
+    results = []
+    for d in done:
+        item, ans = d["item"], d["res"]["answer"]
+        ok = True
+        for s in item.get("must_include", []):
+            if s.lower() not in ans.lower():
                 ok = False
 
-            print(f"{item['id']} -> {'PASS' if ok else 'FAIL'}")
-            if not ok:
-                print("Question:", item["question"])
-                print("Answer:", ans[:500], "\n")
+        if item.get("must_cite", True) and not (CITE_RE.search(ans) or SOURCE_ID_RE.search(ans)):
+            ok = False
+
+        print(f"{item['id']} -> {'PASS' if ok else 'FAIL'}")
+        if not ok:
+            print("Question:", item["question"])
+            print("Answer:", ans[:500], "\n")
+
+        passed += 1 if ok else 0
+        for stage, ms in d["res"].get("timings_ms", {}).items():
+            stage_ms.setdefault(stage, []).append(ms)
+        results.append({"id": item["id"], "pass": ok, "ms": round(d["ms"], 3), "cached": d["res"].get("cached", False)})
+
+    return {
+        "mode": "e2e",
+        "config": _config(),
+        "cases": len(cases),
+        "passed": passed,
+        "workers": workers,
+        "wall_s": round(wall_s, 3),
+        "cases_per_s": round(len(cases) / wall_s, 2) if wall_s > 0 else None,
+        "latency": {"case_ms": percentiles([d["ms"] for d in done]), "stage_ms": {k: percentiles(v) for k, v in stage_ms.items()}},
+        "per_case": results,
+    }
+
+
+def _print_e2e(report: Dict[str, Any]) -> None:
+    print(f"\nScore: {report['passed']}/{report['cases']}")
+    print(f"{report['workers']} workers, {report['wall_s']}s wall, {report['cases_per_s']} cases/s")
+    lat = report["latency"]
+    print(f"  {'stage':<12} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10}")
+    for name, s in [("case", lat["case_ms"]), *lat["stage_ms"].items()]:
+        if s.get("count"):
+            print(f"  {name:<12} {s['p50_ms']:>10.3f} {s['p95_ms']:>10.3f} {s['p99_ms']:>10.3f}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--qa", default=QA_PATH)
+    ap.add_argument("--retrieval", action="store_true", help="labeled retrieval metrics only (no LLM calls)")
+    ap.add_argument("--k", default="1,3,5,10", help="cutoffs for recall@k / nDCG@k (retrieval mode)")
+    ap.add_argument("--batch", type=int, default=16, help="questions per retrieve_many call (retrieval mode)")
+    ap.add_argument("--repeat", type=int, default=3, help="timed passes over the cases (retrieval mode)")
+    ap.add_argument("--workers", type=int, default=4, help="cases in flight at once (end-to-end mode)")
+    ap.add_argument("--top-k", type=int, default=12, help="sources per answer (end-to-end mode)")
+    ap.add_argument("--no-cache", action="store_true", help="bypass the answer cache (end-to-end mode)")
+    ap.add_argument("--json", default="", help="write the report to this path")
+    ap.add_argument("--compare", default="", help="previous --retrieval JSON report to diff against")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    cases = load_cases(args.qa)
+    if args.retrieval:
+        ks = sorted({int(k) for k in args.k.split(",") if k.strip()})
+        report = run_retrieval(cases, ks, batch=max(1, args.batch), repeat=max(1, args.repeat))
+        baseline = None
+        if args.compare:
+            with open(args.compare, "r", encoding="utf-8") as f:
+                baseline = json.load(f)
+        _print_retrieval(report, baseline, verbose=args.verbose)
+    else:
+        report = asyncio.run(run_e2e(cases, workers=args.workers, top_k=args.top_k, use_cache=not args.no_cache))
+        _print_e2e(report)
 
-            passed += 1 if ok else 0
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
 
-    print(f"\nScore: {passed}/{total}")
 
 if __name__ == "__main__":
-    run()
+    main()
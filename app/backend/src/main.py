@@ -1,12 +1,20 @@
 # src/main.py
 from __future__ import annotations
+import asyncio
 import os
+import time
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from src.api.routes_chat import router as chat_router
-from src.core.config import RAG_VECTOR_ENABLED
+from src.api.routes_interview import router as interview_router
+from src.core.config import RAG_VECTOR_ENABLED, RAG_WARMUP, RAG_STORE_WATCH_S
+from src.core.metrics import REGISTRY
+from src.rag.llm_groq import aclose_clients
+from src.rag import warmup
+from src.rag.generations import resolve as resolve_generation
+from src.rag.retrieve_custom import start_store_watcher
 from pathlib import Path
 
 app = FastAPI()
@@ -29,6 +37,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_seconds", "HTTP request latency by route template and status.", labelnames=("method", "route", "status")
+)
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    t0 = time.perf_counter()
+    response = await call_next(request)
+    # route template (/chat), not the raw path, to keep label cardinality bounded;
+    # for SSE this is time to the response headers, the llm stage covers the stream
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    HTTP_SECONDS.labels(method=request.method, route=route, status=response.status_code).observe(
+        time.perf_counter() - t0
+    )
+    return response
+
 @app.exception_handler(Exception)
 async def unhandled_exception_handler(request: Request, exc: Exception):
     # Ensures frontend always gets JSON (and CORS headers still apply)
@@ -41,21 +66,48 @@ async def unhandled_exception_handler(request: Request, exc: Exception):
 def health():
     return {"status": "ok", "vector_enabled": RAG_VECTOR_ENABLED}
 
+@app.get("/ready")
+def ready():
+    # load balancers should only route here once the store and encoder are warm
+    info = warmup.readiness()
+    if RAG_WARMUP == "off":
+        info["ready"] = True  # lazy mode: nothing to wait for
+    return JSONResponse(status_code=200 if info["ready"] else 503, content=info)
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text format; per process, so scrape each worker (or run one per pod)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 app.include_router(chat_router)
+app.include_router(interview_router)
 
 
 @app.on_event("startup")
 async def startup_log():
     # Lightweight diagnostics for Render
-    try:
-        import psutil  # optional
-        mem_mb = psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
-    except Exception:
-        mem_mb = None
-
-    storage_dir = Path(os.getenv("RAG_STORAGE_DIR", "storage"))
-    storage_ok = all((storage_dir / f).exists() for f in ["chunks.jsonl", "vectors.npy", "bm25.json"])
+    mem_mb = warmup.rss_mb()
+
+    storage_dir = Path(resolve_generation(os.getenv("RAG_STORAGE_DIR", "storage"))[0])
+    storage_ok = (
+        (storage_dir / "vectors.npy").exists()
+        and any((storage_dir / f).exists() for f in ["chunks.bin", "chunks.jsonl"])
+        and any((storage_dir / f).exists() for f in ["bm25.idx", "bm25.json"])
+    )
     print(
-        f"[startup] vector_enabled={RAG_VECTOR_ENABLED} load_vectors={RAG_VECTOR_ENABLED} storage_ok={storage_ok} mem_mb={mem_mb}",
+        f"[startup] vector_enabled={RAG_VECTOR_ENABLED} load_vectors={RAG_VECTOR_ENABLED} storage_ok={storage_ok} mem_mb={mem_mb} warmup={RAG_WARMUP}",
         flush=True,
     )
+
+    if RAG_WARMUP == "blocking":
+        await asyncio.to_thread(warmup.warm_up)
+    elif RAG_WARMUP == "background":
+        warmup.start_background_warmup()
+
+    # pick up newly published store generations without a restart
+    start_store_watcher(RAG_STORE_WATCH_S)
+
+
+@app.on_event("shutdown")
+async def shutdown_llm_clients():
+    await aclose_clients()
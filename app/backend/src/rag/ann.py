@@ -0,0 +1,140 @@
+from __future__ import annotations
+import os
+import struct
+import zipfile
+from typing import Optional
+
+import numpy as np
+
+# k-means is trained on a sample; assignment of the full matrix is blockwise
+KMEANS_MAX_TRAIN = 65536
+ASSIGN_BLOCK_ROWS = 16384
+
+
+def default_n_lists(n: int) -> int:
+    # common IVF rule of thumb: ~4 * sqrt(N) lists
+    return max(1, min(n, int(4 * np.sqrt(n))))
+
+
+def _assign(X: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(X.shape[0], dtype=np.int32)
+    for s in range(0, X.shape[0], ASSIGN_BLOCK_ROWS):
+        block = np.asarray(X[s:s + ASSIGN_BLOCK_ROWS], dtype=np.float32)
+        out[s:s + ASSIGN_BLOCK_ROWS] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def spherical_kmeans(X: np.ndarray, k: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    k-means on the unit sphere (cosine). X rows must be normalized.
+    Returns (k, D) normalized centroids.
+    """
+    rng = np.random.default_rng(seed)
+    n = X.shape[0]
+    train_idx = np.sort(rng.choice(n, size=min(n, max(k, KMEANS_MAX_TRAIN)), replace=False))
+    T = np.asarray(X[train_idx], dtype=np.float32)
+
+    C = T[rng.choice(T.shape[0], size=k, replace=False)].copy()
+    for _ in range(n_iter):
+        assign = _assign(T, C)
+        counts = np.bincount(assign, minlength=k)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        # per-cluster sums via one sort + reduceat (np.add.at is far slower)
+        sums = np.zeros_like(C)
+        nz = counts > 0
+        sums[nz] = np.add.reduceat(T[np.argsort(assign, kind="stable")], starts[nz], axis=0)
+
+        empty = counts == 0
+        if empty.any():
+            # re-seed dead lists with random training points
+            sums[empty] = T[rng.choice(T.shape[0], size=int(empty.sum()), replace=False)]
+        C = sums / (np.linalg.norm(sums, axis=1, keepdims=True) + 1e-12)
+    return C.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Inverted-file ANN index over a normalized vector matrix.
+
+    Rows are bucketed by nearest k-means centroid. A query scores the centroids,
+    visits the nprobe closest lists and returns their row ids as candidates;
+    the store then scores only those rows. nprobe = n_lists is exact search.
+    """
+
+    def __init__(self, centroids: np.ndarray, list_offsets: np.ndarray, list_ids: np.ndarray):
+        self.centroids = centroids
+        self.list_offsets = list_offsets
+        self.list_ids = list_ids
+
+    @property
+    def n_lists(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @classmethod
+    def build(cls, X: np.ndarray, n_lists: Optional[int] = None, n_iter: int = 10, seed: int = 0) -> "IVFIndex":
+        n = X.shape[0]
+        if n == 0:
+            raise ValueError("No vectors to build IVF index.")
+        n_lists = min(n, n_lists or default_n_lists(n))
+
+        centroids = spherical_kmeans(X, n_lists, n_iter=n_iter, seed=seed)
+        assign = _assign(X, centroids)
+
+        order = np.argsort(assign, kind="stable")
+        list_offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        np.cumsum(np.bincount(assign, minlength=n_lists), out=list_offsets[1:])
+        return cls(centroids, list_offsets, order.astype(np.int32))
+
+    def candidates(self, q: np.ndarray, nprobe: int) -> np.ndarray:
+        """Sorted row ids in the nprobe lists closest to q."""
+        nprobe = max(1, min(nprobe, self.n_lists))
+        sims = self.centroids @ q
+        if nprobe < self.n_lists:
+            probe = np.argpartition(-sims, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(self.n_lists)
+        parts = [self.list_ids[self.list_offsets[c]:self.list_offsets[c + 1]] for c in probe]
+        return np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=np.int32)
+
+    def save(self, path: str) -> None:
+        # write + rename: live readers may have the old file memory-mapped.
+        # np.savez appends .npz unless given a file object
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=self.centroids, list_offsets=self.list_offsets, list_ids=self.list_ids)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = False) -> "IVFIndex":
+        if mmap:
+            arrays = _memmap_npz(path)
+            if arrays is not None:
+                return cls(arrays["centroids"], arrays["list_offsets"], arrays["list_ids"])
+        with np.load(path) as data:
+            return cls(data["centroids"], data["list_offsets"], data["list_ids"])
+
+
+def _memmap_npz(path: str) -> Optional[dict]:
+    """
+    Memory-maps the members of an uncompressed .npz (np.savez stores them as-is),
+    so every process mapping the file shares one copy. None if a member is compressed.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, "rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED:
+                return None
+            # data starts after the local file header (30 bytes + name + extra)
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            arrays[info.filename[:-len(".npy")]] = np.memmap(
+                path, dtype=dtype, mode="r", offset=f.tell(), shape=shape, order="F" if fortran else "C"
+            )
+    return arrays
@@ -0,0 +1,189 @@
+# src/rag/answer_cache.py
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Hashable, Optional
+
+import numpy as np
+
+from src.rag.query_cache import normalize_query
+
+
+class SemanticAnswerCache:
+    """
+    Answers (+ sources) keyed by question embedding.
+
+    A lookup hits when an entry in the same scope (mode, top_k) has cosine similarity
+    >= threshold with the question, is younger than ttl_s, and was produced against
+    the current store generation. A new generation drops everything; a request still
+    pinned to a generation the cache has already moved past (it finished after a swap)
+    neither reads nor writes and leaves the cache as is.
+    Exact (whitespace-normalized) text matches also hit, so the cache still works
+    when no query vector is available (RAG_VECTOR_ENABLED=false).
+
+    Eviction: expired entries first, then least recently used. maxsize <= 0 disables.
+    Scopes are client-controlled (filters), so a scope is only tracked while it has entries.
+    """
+
+    RETIRED_GENERATIONS = 16
+
+    def __init__(self, maxsize: int = 512, ttl_s: float = 3600.0, threshold: float = 0.95):
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._retired: Deque[str] = deque(maxlen=self.RETIRED_GENERATIONS)
+        self._reset("")
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def _reset(self, generation: str) -> None:
+        self._generation = generation
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._by_text: Dict[Hashable, int] = {}
+        self._vecs: Optional[np.ndarray] = None  # (maxsize, D), allocated on first vector put
+        self._has_vec = np.zeros(max(self.maxsize, 0), dtype=bool)
+        self._created = np.zeros(max(self.maxsize, 0), dtype=np.float64)
+        self._last_used = np.zeros(max(self.maxsize, 0), dtype=np.float64)
+        self._scope = np.full(max(self.maxsize, 0), -1, dtype=np.int64)
+        # scope key <-> id, with the number of entries holding each id; ids are never reused
+        self._scope_ids: Dict[Hashable, int] = {}
+        self._scope_keys: Dict[int, Hashable] = {}
+        self._scope_refs: Dict[int, int] = {}
+        self._next_scope = 0
+
+    def _sync_generation(self, generation: str) -> bool:
+        """False for a generation the cache has already moved past (the caller skips the cache)."""
+        if generation == self._generation:
+            return True
+        if generation in self._retired:
+            return False
+        if self._generation:
+            self._retired.append(self._generation)
+        self._reset(generation)
+        return True
+
+    def _acquire_scope(self, mode: str, top_k: int) -> int:
+        key = (mode, top_k)
+        sid = self._scope_ids.get(key)
+        if sid is None:
+            sid = self._scope_ids[key] = self._next_scope
+            self._scope_keys[sid] = key
+            self._next_scope += 1
+        self._scope_refs[sid] = self._scope_refs.get(sid, 0) + 1
+        return sid
+
+    def _release_scope(self, sid: int) -> None:
+        self._scope_refs[sid] -= 1
+        if self._scope_refs[sid] == 0:
+            del self._scope_refs[sid]
+            del self._scope_ids[self._scope_keys.pop(sid)]
+
+    def lookup(
+        self,
+        question: str,
+        vec: Optional[np.ndarray],
+        mode: str,
+        top_k: int,
+        generation: str,
+    ) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            sid = self._scope_ids.get((mode, top_k)) if self._sync_generation(generation) else None
+            if sid is None:
+                self.misses += 1
+                return None
+            live = (self._scope == sid) & (now - self._created <= self.ttl_s)
+
+            slot = self._by_text.get((sid, normalize_query(question)))
+            if slot is not None and not live[slot]:
+                slot = None
+
+            similarity = 1.0
+            if slot is None and vec is not None and self._vecs is not None:
+                cand = np.flatnonzero(live & self._has_vec)
+                if cand.size:
+                    sims = self._vecs[cand] @ np.asarray(vec, dtype=np.float32)
+                    best = int(np.argmax(sims))
+                    if sims[best] >= self.threshold:
+                        slot, similarity = int(cand[best]), float(sims[best])
+
+            if slot is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._last_used[slot] = now
+            entry = self._entries[slot]
+            return {**entry["payload"], "cache_similarity": similarity}
+
+    def put(
+        self,
+        question: str,
+        vec: Optional[np.ndarray],
+        mode: str,
+        top_k: int,
+        generation: str,
+        payload: Dict[str, Any],
+    ) -> None:
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            if not self._sync_generation(generation):
+                return
+            sid = self._acquire_scope(mode, top_k)
+            text_key = (sid, normalize_query(question))
+
+            slot = self._by_text.get(text_key)
+            if slot is None:
+                slot = self._free_slot(now)
+
+            old = self._entries.get(slot)
+            if old is not None:
+                self._by_text.pop(old["text_key"], None)
+                self._release_scope(int(self._scope[slot]))
+
+            self._entries[slot] = {"text_key": text_key, "payload": payload}
+            self._by_text[text_key] = slot
+            self._created[slot] = now
+            self._last_used[slot] = now
+            self._scope[slot] = sid
+            self._has_vec[slot] = vec is not None
+            if vec is not None:
+                v = np.asarray(vec, dtype=np.float32)
+                if self._vecs is None:
+                    self._vecs = np.zeros((self.maxsize, v.shape[0]), dtype=np.float32)
+                self._vecs[slot] = v
+
+    def _free_slot(self, now: float) -> int:
+        used = np.zeros(self.maxsize, dtype=bool)
+        used[list(self._entries)] = True
+        if not used.all():
+            return int(np.argmin(used))
+        expired = np.flatnonzero(now - self._created > self.ttl_s)
+        if expired.size:
+            return int(expired[0])
+        return int(np.argmin(self._last_used))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset(self._generation)
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "scopes": len(self._scope_ids),
+                "generation": self._generation,
+            }
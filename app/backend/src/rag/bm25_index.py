@@ -0,0 +1,362 @@
+from __future__ import annotations
+import json
+import os
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Same defaults as rank_bm25.BM25Okapi so rankings don't move when switching engines
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+_MAGIC = b"PQBM25\x00\x01"
+_ALIGN = 64
+_MAX_TF = np.iinfo(np.uint16).max
+
+
+class InvertedIndexBuilder:
+    """
+    Accumulates (term, doc, tf) postings one document at a time.
+    Memory is bounded by the number of postings, not by the raw text.
+    """
+
+    def __init__(self):
+        self.vocab: Dict[str, int] = {}
+        self._term_ids = array("i")
+        self._doc_ids = array("i")
+        self._tfs = array("I")
+        self._doc_len = array("I")
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, tokens: List[str]) -> int:
+        doc_id = len(self._doc_len)
+        for term, tf in Counter(tokens).items():
+            tid = self.vocab.setdefault(term, len(self.vocab))
+            self._term_ids.append(tid)
+            self._doc_ids.append(doc_id)
+            self._tfs.append(tf)
+        self._doc_len.append(len(tokens))
+        return doc_id
+
+    def finish(self, k1: float = BM25_K1, b: float = BM25_B, epsilon: float = BM25_EPSILON) -> "InvertedIndex":
+        n_docs = len(self._doc_len)
+        if n_docs == 0:
+            raise ValueError("No documents to build BM25 index.")
+
+        n_terms = len(self.vocab)
+        term_ids = np.frombuffer(self._term_ids, dtype=np.int32)
+        doc_ids = np.frombuffer(self._doc_ids, dtype=np.int32)
+        tfs = np.frombuffer(self._tfs, dtype=np.uint32)
+        doc_len = np.frombuffer(self._doc_len, dtype=np.uint32).astype(np.float32)
+
+        avgdl = float(doc_len.sum()) / n_docs
+        df = np.bincount(term_ids, minlength=n_terms)
+
+        # Okapi IDF; negative values are floored to epsilon * mean idf (BM25Okapi semantics)
+        idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+        if n_terms:
+            idf[idf < 0] = epsilon * float(idf.mean())
+
+        # stable sort keeps doc ids ascending inside each postings list
+        order = np.argsort(term_ids, kind="stable")
+        term_offsets = np.zeros(n_terms + 1, dtype=np.int64)
+        np.cumsum(df, out=term_offsets[1:])
+
+        doc_norm = k1 * (1.0 - b + b * doc_len / max(avgdl, 1e-9))
+
+        vocab = [""] * n_terms
+        for term, tid in self.vocab.items():
+            vocab[tid] = term
+
+        return InvertedIndex(
+            vocab=vocab,
+            term_offsets=term_offsets,
+            idf=idf.astype(np.float32),
+            post_docs=doc_ids[order].astype(np.int32),
+            post_tf=np.minimum(tfs[order], _MAX_TF).astype(np.uint16),
+            doc_len=doc_len,
+            doc_norm=doc_norm.astype(np.float32),
+            avgdl=avgdl,
+            k1=k1,
+            b=b,
+            epsilon=epsilon,
+        )
+
+
+class _RowFilter:
+    """
+    Restricts postings lists (ascending doc ids) to a sorted set of allowed rows.
+    Per term this costs O(min(rows * log(postings), postings)), never O(n_docs) scoring.
+    """
+
+    def __init__(self, rows: np.ndarray, n_docs: int):
+        self.rows = np.asarray(rows, dtype=np.int64)
+        self.n_docs = n_docs
+        self._mask: Optional[np.ndarray] = None
+
+    def positions(self, docs: np.ndarray) -> np.ndarray:
+        """Indices into `docs` of the allowed doc ids."""
+        if len(self.rows) < len(docs):
+            pos = np.searchsorted(docs, self.rows)
+            ok = pos < len(docs)
+            pos = pos[ok]
+            return pos[docs[pos] == self.rows[ok]]
+        if self._mask is None:
+            self._mask = np.zeros(self.n_docs, dtype=bool)
+            self._mask[self.rows] = True
+        return np.flatnonzero(self._mask[docs])
+
+
+class InvertedIndex:
+    """
+    Okapi BM25 over term -> postings lists.
+
+    Persisted as a single binary file:
+      magic | uint64 header length | JSON header (vocab + params) | 64-byte aligned arrays
+    load() memory-maps the arrays, so startup cost is the vocab dict only and a query
+    only touches the postings of its own terms.
+    """
+
+    _ARRAYS = ("term_offsets", "idf", "post_docs", "post_tf", "doc_len", "doc_norm")
+
+    def __init__(
+        self,
+        vocab: List[str],
+        term_offsets: np.ndarray,
+        idf: np.ndarray,
+        post_docs: np.ndarray,
+        post_tf: np.ndarray,
+        doc_len: np.ndarray,
+        doc_norm: np.ndarray,
+        avgdl: float,
+        k1: float = BM25_K1,
+        b: float = BM25_B,
+        epsilon: float = BM25_EPSILON,
+    ):
+        self.vocab = {t: i for i, t in enumerate(vocab)}
+        self._terms = vocab
+        self.term_offsets = term_offsets
+        self.idf = idf
+        self.post_docs = post_docs
+        self.post_tf = post_tf
+        self.doc_len = doc_len
+        self.doc_norm = doc_norm
+        self.avgdl = avgdl
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+
+    @classmethod
+    def build(cls, corpus_tokens: Iterable[List[str]], **params) -> "InvertedIndex":
+        builder = InvertedIndexBuilder()
+        for tokens in corpus_tokens:
+            builder.add(tokens)
+        return builder.finish(**params)
+
+    @property
+    def n_docs(self) -> int:
+        return int(self.doc_len.shape[0])
+
+    def __len__(self) -> int:
+        return self.n_docs
+
+    def score_tokens(self, tokens: List[str], rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (doc_ids, scores) for every doc containing at least one query term.
+        Repeated query terms count repeatedly, same as BM25Okapi.get_scores.
+        rows (sorted doc ids) limits scoring to those docs; IDF / avgdl stay corpus-wide,
+        so their scores equal the unfiltered ones.
+        """
+        docs_parts: List[np.ndarray] = []
+        score_parts: List[np.ndarray] = []
+        k1p1 = self.k1 + 1.0
+        allowed = _RowFilter(rows, self.n_docs) if rows is not None else None
+
+        for term in tokens:
+            tid = self.vocab.get(term)
+            if tid is None:
+                continue
+            s, e = int(self.term_offsets[tid]), int(self.term_offsets[tid + 1])
+            if s == e:
+                continue
+            docs = self.post_docs[s:e]
+            tf = self.post_tf[s:e]
+            if allowed is not None:
+                keep = allowed.positions(docs)
+                if keep.size == 0:
+                    continue
+                docs, tf = docs[keep], tf[keep]
+            tf = tf.astype(np.float64)
+            docs_parts.append(docs)
+            score_parts.append(float(self.idf[tid]) * tf * k1p1 / (tf + self.doc_norm[docs]))
+
+        if not docs_parts:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float64)
+        if len(docs_parts) == 1:
+            return np.asarray(docs_parts[0]), score_parts[0]
+
+        docs = np.concatenate(docs_parts)
+        uniq, inv = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inv, weights=np.concatenate(score_parts), minlength=len(uniq))
+        return uniq, scores
+
+    def search(self, tokens: List[str], top_k: int = 10, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        docs, scores = self.score_tokens(tokens, rows=rows)
+        keep = scores > 0
+        docs, scores = docs[keep], scores[keep]
+        if docs.size == 0 or top_k <= 0:
+            return []
+
+        if docs.size > top_k:
+            # keep every doc tied with the k-th score, so the cut below is by doc id too
+            kth = np.partition(scores, docs.size - top_k)[docs.size - top_k]
+            part = np.flatnonzero(scores >= kth)
+            docs, scores = docs[part], scores[part]
+        # score desc, ties by doc id asc (matches a stable sort over enumerate(scores))
+        order = np.lexsort((docs, -scores))[:top_k]
+        return [(int(docs[i]), float(scores[i])) for i in order]
+
+    def search_batch(
+        self, queries: List[List[str]], top_k: int = 10, rows: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        search() for many token lists at once: postings of all queries are scored in one
+        pass, accumulated on a (query, doc) key and ranked with a single grouped sort.
+        rows restricts every query to those docs, as in score_tokens().
+        """
+        n_q = len(queries)
+        if n_q == 0:
+            return []
+        allowed = _RowFilter(rows, self.n_docs) if rows is not None else None
+
+        qids_parts: List[np.ndarray] = []
+        docs_parts: List[np.ndarray] = []
+        terms_parts: List[np.ndarray] = []
+        for qi, tokens in enumerate(queries):
+            for term in tokens:
+                tid = self.vocab.get(term)
+                if tid is None:
+                    continue
+                s, e = int(self.term_offsets[tid]), int(self.term_offsets[tid + 1])
+                if s == e:
+                    continue
+                docs = self.post_docs[s:e]
+                pos = np.arange(s, e, dtype=np.int64)
+                if allowed is not None:
+                    keep = allowed.positions(docs)
+                    docs, pos = docs[keep], pos[keep]
+                    if pos.size == 0:
+                        continue
+                docs_parts.append(docs)
+                terms_parts.append(pos)
+                qids_parts.append(np.full(len(pos), qi, dtype=np.int64))
+
+        out: List[List[Tuple[int, float]]] = [[] for _ in range(n_q)]
+        if not docs_parts or top_k <= 0:
+            return out
+
+        docs = np.concatenate(docs_parts).astype(np.int64)
+        pos = np.concatenate(terms_parts)
+        qids = np.concatenate(qids_parts)
+
+        # idf per posting: postings of term t live in [term_offsets[t], term_offsets[t+1])
+        post_term = np.searchsorted(self.term_offsets, pos, side="right") - 1
+        tf = self.post_tf[pos].astype(np.float64)
+        contrib = self.idf[post_term].astype(np.float64) * tf * (self.k1 + 1.0) / (tf + self.doc_norm[docs])
+
+        keys, inv = np.unique(qids * self.n_docs + docs, return_inverse=True)
+        scores = np.bincount(inv, weights=contrib, minlength=len(keys))
+        kq, kd = keys // self.n_docs, keys % self.n_docs
+
+        keep = scores > 0
+        kq, kd, scores = kq[keep], kd[keep], scores[keep]
+
+        # group by query, score desc, doc asc; then keep the first top_k of each group
+        order = np.lexsort((kd, -scores, kq))
+        kq, kd, scores = kq[order], kd[order], scores[order]
+        group_start = np.searchsorted(kq, np.arange(n_q))
+        rank = np.arange(len(kq)) - group_start[kq]
+        sel = rank < top_k
+
+        for q, d, sc in zip(kq[sel].tolist(), kd[sel].tolist(), scores[sel].tolist()):
+            out[q].append((d, sc))
+        return out
+
+    def save(self, path: str) -> None:
+        arrays = {name: np.ascontiguousarray(getattr(self, name)) for name in self._ARRAYS}
+        header = {
+            "version": 1,
+            "avgdl": self.avgdl,
+            "k1": self.k1,
+            "b": self.b,
+            "epsilon": self.epsilon,
+            "vocab": self._terms,
+            "arrays": {},
+        }
+
+        # Offsets depend on the header size, so lay out against a fixed-width placeholder first
+        def _layout(header_len: int) -> int:
+            pos = _align(len(_MAGIC) + 8 + header_len)
+            for name, arr in arrays.items():
+                header["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": pos}
+                pos = _align(pos + arr.nbytes)
+            return pos
+
+        header_len = len(json.dumps(header, ensure_ascii=False).encode("utf-8")) + 512
+        while True:
+            _layout(header_len)
+            raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+            if len(raw) <= header_len:
+                raw = raw + b" " * (header_len - len(raw))
+                break
+            header_len = len(raw) + 512
+
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_MAGIC)
+            f.write(np.uint64(header_len).tobytes())
+            f.write(raw)
+            for name, arr in arrays.items():
+                f.seek(header["arrays"][name]["offset"])
+                f.write(arr.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "InvertedIndex":
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise RuntimeError(f"{path} is not a BM25 index file")
+            header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        arrays: Dict[str, np.ndarray] = {}
+        for name in cls._ARRAYS:
+            spec = header["arrays"][name]
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            elif mmap:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=spec["offset"], shape=shape)
+            else:
+                with open(path, "rb") as f:
+                    f.seek(spec["offset"])
+                    arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+
+        return cls(
+            vocab=header["vocab"],
+            avgdl=float(header["avgdl"]),
+            k1=float(header["k1"]),
+            b=float(header["b"]),
+            epsilon=float(header["epsilon"]),
+            **arrays,
+        )
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
@@ -0,0 +1,312 @@
+# src/rag/chunk_store.py
+from __future__ import annotations
+import json
+import mmap
+import os
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+TEXT_FILE = "chunks.bin"
+OFFSETS_FILE = "chunks.offsets.npy"
+META_CODES_FILE = "chunks.meta.npy"
+META_TABLE_FILE = "chunks.meta.json"
+FILES = (TEXT_FILE, OFFSETS_FILE, META_CODES_FILE, META_TABLE_FILE)
+
+_MISSING = -1  # code for "key not present in this chunk's metadata"
+
+
+@dataclass
+class StoredChunk:
+    text: str
+    metadata: Dict[str, Any]
+
+
+def exists(storage_dir: str) -> bool:
+    return all(os.path.exists(os.path.join(storage_dir, f)) for f in FILES)
+
+
+def group_ids(chunks: Sequence[Any], keys: Sequence[str], defaults: Sequence[Any]) -> np.ndarray:
+    """
+    Dense int64 id per chunk for the tuple (str(metadata.get(key, default)) for each key):
+    chunks with equal ids would collide in a dict keyed on those strings.
+    Vectorized over the code columns for a ChunkStore, one pass over dicts otherwise.
+    """
+    if isinstance(chunks, ChunkStore):
+        return chunks.group_ids(keys, defaults)
+    index: Dict[Tuple[str, ...], int] = {}
+    return np.fromiter(
+        (
+            index.setdefault(tuple(str(ch.metadata.get(k, d)) for k, d in zip(keys, defaults)), len(index))
+            for ch in chunks
+        ),
+        dtype=np.int64,
+        count=len(chunks),
+    )
+
+
+class ChunkStore(Sequence):
+    """
+    Read-only chunk texts + metadata, materialized per id on demand.
+
+    On disk:
+      - chunks.bin          UTF-8 texts back to back (memory-mapped)
+      - chunks.offsets.npy  int64 (N + 1) byte offsets into chunks.bin
+      - chunks.meta.npy     int32 (N, K) codes, one column per metadata key
+      - chunks.meta.json    {"keys": [...], "values": [[...] per key]}: the lookup tables
+
+    Resident cost is the offsets, the code columns and the distinct metadata values;
+    text is only read for the ids that are asked for. store[i] returns a StoredChunk,
+    whose metadata dict is rebuilt from the codes on each access. from_chunks() builds
+    the same layout in memory (blob = bytes) for stores that are not on disk yet.
+    """
+
+    def __init__(
+        self,
+        blob: Any,
+        offsets: np.ndarray,
+        keys: List[str],
+        values: List[List[Any]],
+        codes: np.ndarray,
+    ):
+        self._blob = blob
+        self.offsets = offsets
+        self.keys = keys
+        self.values = values
+        self.codes = codes
+        self._key_index = {k: j for j, k in enumerate(keys)}
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def text(self, i: int) -> str:
+        return bytes(self._blob[int(self.offsets[i]):int(self.offsets[i + 1])]).decode("utf-8")
+
+    def metadata(self, i: int) -> Dict[str, Any]:
+        row = self.codes[i]
+        return {k: self.values[j][c] for j, (k, c) in enumerate(zip(self.keys, row.tolist())) if c != _MISSING}
+
+    def column(self, key: str) -> Tuple[np.ndarray, List[Any]]:
+        """(codes, lookup table) of one metadata key; code -1 means absent."""
+        j = self._key_index.get(key)
+        if j is None:
+            return np.full(len(self), _MISSING, dtype=np.int32), []
+        return self.codes[:, j], self.values[j]
+
+    def postings(self, key: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (rows, bounds) for one key, built on first use: rows with code c are
+        rows[bounds[c + 1]:bounds[c + 2]] in ascending order (slot 0 holds code -1).
+        """
+        cached = self._postings.get(key)
+        if cached is None:
+            codes, values = self.column(key)
+            shifted = np.asarray(codes, dtype=np.int64) + 1
+            bounds = np.zeros(len(values) + 2, dtype=np.int64)
+            np.cumsum(np.bincount(shifted, minlength=len(values) + 1), out=bounds[1:])
+            cached = self._postings[key] = (np.argsort(shifted, kind="stable"), bounds)
+        return cached
+
+    def rows_with(self, key: str, codes: Sequence[int]) -> np.ndarray:
+        """Sorted row ids whose value for `key` has one of these codes."""
+        rows, bounds = self.postings(key)
+        parts = [rows[bounds[c + 1]:bounds[c + 2]] for c in codes]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+    def group_ids(self, keys: Sequence[str], defaults: Sequence[Any]) -> np.ndarray:
+        """See group_ids(); works on the code columns without materializing any metadata."""
+        combined = np.zeros(len(self), dtype=np.int64)
+        for key, default in zip(keys, defaults):
+            codes, values = self.column(key)
+            # lookup entries that print the same (1 and "1") share a label; code -1 -> default
+            labels: Dict[str, int] = {}
+            remap = np.array(
+                [labels.setdefault(str(v), len(labels)) for v in [*values, default]], dtype=np.int64
+            )
+            combined = combined * len(labels) + remap[codes]
+            combined = np.unique(combined, return_inverse=True)[1].astype(np.int64)  # keep ids dense
+        return combined
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return StoredChunk(text=self.text(i), metadata=self.metadata(i))
+
+    @classmethod
+    def load(cls, storage_dir: str) -> "ChunkStore":
+        offsets = np.load(os.path.join(storage_dir, OFFSETS_FILE), mmap_mode="r")
+        codes = np.load(os.path.join(storage_dir, META_CODES_FILE), mmap_mode="r")
+        with open(os.path.join(storage_dir, META_TABLE_FILE), "r", encoding="utf-8") as f:
+            table = json.load(f)
+
+        blob: Any = b""
+        text_path = os.path.join(storage_dir, TEXT_FILE)
+        if os.path.getsize(text_path) > 0:  # an empty file cannot be mapped
+            with open(text_path, "rb") as f:
+                blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if codes.shape[0] != len(offsets) - 1:
+            raise RuntimeError(f"{META_CODES_FILE} has {codes.shape[0]} rows, expected {len(offsets) - 1}")
+        if int(offsets[-1]) != len(blob):
+            raise RuntimeError(f"{TEXT_FILE} has {len(blob)} bytes, {OFFSETS_FILE} expects {int(offsets[-1])}")
+        return cls(blob, offsets, table["keys"], table["values"], codes)
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[Any]) -> "ChunkStore":
+        """Columnar copy of StoredChunk-like objects (.text, .metadata), kept in memory."""
+        parts: List[bytes] = []
+        offsets = array("q", [0])
+        meta = MetaColumns()
+        for ch in chunks:
+            raw = (ch.text or "").encode("utf-8")
+            parts.append(raw)
+            offsets.append(offsets[-1] + len(raw))
+            meta.add(ch.metadata)
+        return cls(b"".join(parts), np.frombuffer(offsets, dtype=np.int64), meta.keys, meta.values, meta.codes())
+
+    def save(self, storage_dir: str) -> None:
+        """Writes the arrays as they are (no re-interning), via the same .tmp + rename as the writer."""
+        def _path(name: str) -> str:
+            return os.path.join(storage_dir, name)
+
+        with open(_path(TEXT_FILE) + ".tmp", "wb") as f:
+            f.write(self._blob[: int(self.offsets[-1])])
+        with open(_path(OFFSETS_FILE) + ".tmp", "wb") as f:
+            np.save(f, np.asarray(self.offsets, dtype=np.int64))
+        with open(_path(META_CODES_FILE) + ".tmp", "wb") as f:
+            np.save(f, np.asarray(self.codes, dtype=np.int32))
+        with open(_path(META_TABLE_FILE) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"keys": self.keys, "values": self.values}, f, ensure_ascii=False)
+        for name in FILES:
+            os.replace(_path(name) + ".tmp", _path(name))
+
+    @staticmethod
+    def write(storage_dir: str, chunks: Iterable[Any]) -> int:
+        if isinstance(chunks, ChunkStore):
+            chunks.save(storage_dir)
+            return len(chunks)
+        w = ChunkStoreWriter(storage_dir)
+        try:
+            for ch in chunks:
+                w.add(ch.text, ch.metadata)
+            w.finish()
+        except BaseException:
+            w.abort()
+            raise
+        return w.n
+
+
+class MetaColumns:
+    """Interns metadata dicts into one int32 code column + lookup table per key."""
+
+    def __init__(self):
+        self.n = 0
+        self.keys: List[str] = []
+        self.values: List[List[Any]] = []
+        self._columns: List[array] = []
+        self._key_index: Dict[str, int] = {}
+        self._lookup: List[Dict[Any, int]] = []
+
+    def _column(self, key: str) -> int:
+        j = self._key_index.get(key)
+        if j is None:
+            j = self._key_index[key] = len(self.keys)
+            self.keys.append(key)
+            self._columns.append(array("i", [_MISSING]) * self.n)  # backfill earlier chunks
+            self.values.append([])
+            self._lookup.append({})
+        return j
+
+    def add(self, metadata: Optional[Dict[str, Any]]) -> None:
+        metadata = metadata or {}
+        for key in metadata:
+            self._column(key)
+        for j, key in enumerate(self.keys):
+            if key not in metadata:
+                self._columns[j].append(_MISSING)
+                continue
+            value = metadata[key]
+            token = _token(value)
+            code = self._lookup[j].get(token)
+            if code is None:
+                code = self._lookup[j][token] = len(self.values[j])
+                self.values[j].append(value)
+            self._columns[j].append(code)
+        self.n += 1
+
+    def codes(self) -> np.ndarray:
+        codes = np.zeros((self.n, len(self.keys)), dtype=np.int32)
+        for j, col in enumerate(self._columns):
+            codes[:, j] = np.frombuffer(col, dtype=np.int32)
+        return codes
+
+
+def _token(value: Any) -> Any:
+    # interning key: 1, 1.0, True and "1" stay distinct; strings (the common case) skip json
+    if type(value) is str:
+        return value
+    return (type(value).__name__, json.dumps(value, sort_keys=True, ensure_ascii=False))
+
+
+class ChunkStoreWriter:
+    """
+    Appends chunks one at a time: text goes straight to chunks.bin, metadata values
+    are interned into per-key lookup tables. finish() writes the offsets / code
+    columns / tables and renames everything into place (or leaves that to publish()).
+    """
+
+    def __init__(self, storage_dir: str):
+        self.storage_dir = storage_dir
+        self.n = 0
+        self._text_f = open(self._path(TEXT_FILE) + ".tmp", "wb")
+        self._offsets = array("q", [0])
+        self._meta = MetaColumns()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.storage_dir, name)
+
+    def add(self, text: str, metadata: Optional[Dict[str, Any]]) -> int:
+        raw = (text or "").encode("utf-8")
+        self._text_f.write(raw)
+        self._offsets.append(self._offsets[-1] + len(raw))
+        self._meta.add(metadata)
+        self.n += 1
+        return self.n - 1
+
+    def abort(self) -> None:
+        if not self._text_f.closed:
+            self._text_f.close()
+        for name in FILES:
+            if os.path.exists(self._path(name) + ".tmp"):
+                os.remove(self._path(name) + ".tmp")
+
+    def finish(self, publish: bool = True) -> None:
+        self._text_f.close()
+        codes = self._meta.codes()
+
+        with open(self._path(OFFSETS_FILE) + ".tmp", "wb") as f:
+            np.save(f, np.frombuffer(self._offsets, dtype=np.int64))
+        with open(self._path(META_CODES_FILE) + ".tmp", "wb") as f:
+            np.save(f, codes)
+        with open(self._path(META_TABLE_FILE) + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"keys": self._meta.keys, "values": self._meta.values}, f, ensure_ascii=False)
+        if publish:
+            self.publish()
+
+    def publish(self) -> None:
+        # one os.replace per file, so not atomic as a set: a reader loading in between
+        # can pair new text with old offsets / codes. load() rejects a blob whose size
+        # disagrees with the offsets; StoreWriter publishes vectors.npy after these and
+        # HybridStore.load checks the counts, and the generations layout avoids it entirely.
+        for name in FILES:
+            os.replace(self._path(name) + ".tmp", self._path(name))
@@ -5,6 +5,11 @@ from dataclasses import dataclass
 from typing import Dict, Any, List, Optional
 import re
 
+from src.core.config import CHUNK_MAX_WORDS, CHUNK_OVERLAP_WORDS
+
+# bump when a code change alters chunk texts or metadata for the same input
+CHUNKING_VERSION = 1
+
 # Simple heading detection: works for resumes + papers + patents reasonably well
 # - Lines in ALL CAPS
 # - Lines ending with ":" (like "EXPERIENCE:")
@@ -75,9 +80,14 @@ def _chunk_by_words(text: str, max_words: int = 220, overlap_words: int = 40) ->
         chunks.append(" ".join(words[i:j]))
         if j == len(words):
             break
-        i = max(0, j - overlap_words)
+        i = max(i + 1, j - overlap_words)
     return chunks
 
+
+def chunking_params() -> Dict[str, Any]:
+    """Everything besides the page text that chunk output depends on (stored in the ingest manifest)."""
+    return {"version": CHUNKING_VERSION, "max_words": CHUNK_MAX_WORDS, "overlap_words": CHUNK_OVERLAP_WORDS}
+
 def make_chunks(
     text: str,
     file_name: str,
@@ -97,7 +107,7 @@ def make_chunks(
     out: List[Chunk] = []
 
     for section_title, section_text in sections:
-        parts = _chunk_by_words(section_text, max_words=220, overlap_words=40)
+        parts = _chunk_by_words(section_text, max_words=CHUNK_MAX_WORDS, overlap_words=CHUNK_OVERLAP_WORDS)
         for k, part in enumerate(parts):
             meta = {
                 "file_name": file_name,
@@ -0,0 +1,124 @@
+# src/rag/coalesce.py
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+from src.core.metrics import Histogram
+
+QUEUE_DEPTH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _Request:
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.done = threading.Event()
+        self.result: Optional[np.ndarray] = None
+        self.error: Optional[BaseException] = None
+
+
+class QueryCoalescer:
+    """
+    Micro-batches concurrent encode calls into one forward pass.
+
+    The first call to arrive opens a window of window_ms; calls arriving inside it
+    (up to max_batch texts in total) are encoded together by a single dispatcher
+    thread and each caller gets its own rows back. The window is only waited for
+    while traffic is concurrent (the previous pass served more than one call), so a
+    lone query is not delayed; calls arriving during a pass always join the next one.
+    Identical texts in a batch are encoded once. Calls with max_batch or more texts,
+    or window_ms <= 0, go straight to encode_fn.
+
+    queue_depth: requests waiting (including the new one) when a call is enqueued.
+    batch_size: texts per forward pass.
+    """
+
+    def __init__(self, encode_fn: Callable[[List[str]], np.ndarray], window_ms: float = 2.0, max_batch: int = 32):
+        self.encode_fn = encode_fn
+        self.window_s = max(0.0, window_ms) / 1000.0
+        self.max_batch = max(1, max_batch)
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+        self.batch_size = Histogram(BATCH_SIZE_BUCKETS)
+        self._pending: Deque[_Request] = deque()
+        self._pending_texts = 0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._concurrent = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_s > 0 and self.max_batch > 1
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not self.enabled or len(texts) >= self.max_batch:
+            self.batch_size.observe(len(texts))
+            return self.encode_fn(texts)
+
+        req = _Request(list(texts))
+        with self._cond:
+            self._pending.append(req)
+            self._pending_texts += len(req.texts)
+            self.queue_depth.observe(len(self._pending))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="query-coalescer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        req.done.wait()
+        if req.error is not None:
+            raise req.error
+        return req.result
+
+    def _take_batch(self) -> List[_Request]:
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            # the window starts with the oldest waiting call and closes early once full
+            deadline = time.monotonic() + (self.window_s if self._concurrent else 0.0)
+            while self._pending_texts < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch: List[_Request] = []
+            n = 0
+            while self._pending and (not batch or n + len(self._pending[0].texts) <= self.max_batch):
+                req = self._pending.popleft()
+                n += len(req.texts)
+                batch.append(req)
+            self._pending_texts -= n
+            self._concurrent = len(batch) > 1 or bool(self._pending)
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            index: Dict[str, int] = {}
+            for req in batch:
+                for t in req.texts:
+                    index.setdefault(t, len(index))
+            try:
+                self.batch_size.observe(len(index))
+                vecs = np.asarray(self.encode_fn(list(index)), dtype=np.float32)
+                for req in batch:
+                    req.result = vecs[[index[t] for t in req.texts]]
+            except BaseException as e:  # every caller in the batch sees the failure
+                for req in batch:
+                    req.error = e
+            for req in batch:
+                req.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_s * 1000.0,
+            "max_batch": self.max_batch,
+            "pending": len(self._pending),
+            "queue_depth": self.queue_depth.snapshot(),
+            "batch_size": self.batch_size.snapshot(),
+        }
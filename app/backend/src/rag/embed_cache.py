@@ -0,0 +1,142 @@
+# src/rag/embed_cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.rag.quantize import NPY_HEADER_BYTES, npy_header
+from src.rag.query_cache import normalize_query
+
+
+def text_key(text: str) -> int:
+    """64-bit blake2b of the whitespace-normalized text (stable across processes)."""
+    digest = hashlib.blake2b(normalize_query(text).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class EmbeddingDiskCache:
+    """
+    Persistent chunk-embedding cache for one encoder (identity "backend:model").
+
+    Layout under <cache_dir>/<sha1(identity)[:12]>/:
+      - meta.json    identity + dim
+      - vectors.npy  append-only float32 rows (memory-mapped)
+      - keys.npy     sorted uint64 text hashes
+      - rows.npy     row in vectors.npy of each key
+
+    Lookups are a searchsorted over keys; the vectors are only paged in for hits.
+    New rows are buffered by put_many() and appended by save(): the vectors are written
+    (and the header patched) before keys/rows are atomically replaced, so a crash
+    leaves at most unreferenced rows behind.
+    """
+
+    def __init__(self, cache_dir: str, identity: str, dim: int):
+        self.identity = identity
+        self.dim = dim
+        self.dir = os.path.join(cache_dir, hashlib.sha1(identity.encode("utf-8")).hexdigest()[:12])
+        self.vectors_path = os.path.join(self.dir, "vectors.npy")
+        self.keys_path = os.path.join(self.dir, "keys.npy")
+        self.rows_path = os.path.join(self.dir, "rows.npy")
+        self.hits = 0
+        self.misses = 0
+
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.vectors: Optional[np.ndarray] = None
+        self._pending_keys: List[int] = []
+        self._pending_vecs: List[np.ndarray] = []
+        self._pending_index: dict = {}
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.keys) + len(self._pending_keys)
+
+    def _load(self) -> None:
+        meta_path = os.path.join(self.dir, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("identity") != self.identity or meta.get("dim") != self.dim:
+            print(f"[embed_cache] {self.dir} belongs to {meta.get('identity')}, ignoring it", flush=True)
+            return
+        if not all(os.path.exists(p) for p in (self.keys_path, self.rows_path, self.vectors_path)):
+            return
+        keys, rows = np.load(self.keys_path), np.load(self.rows_path)
+        vectors = np.load(self.vectors_path, mmap_mode="r")
+        if len(keys) != len(rows) or (len(rows) and int(rows.max()) >= vectors.shape[0]):
+            print(f"[embed_cache] {self.dir} is inconsistent, starting empty", flush=True)
+            return
+        self.keys, self.rows, self.vectors = keys, rows, vectors
+
+    def get_many(self, keys: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """(found mask, (len(keys), dim) vectors); rows where found is False are zeros."""
+        q = np.asarray(keys, dtype=np.uint64)
+        out = np.zeros((len(q), self.dim), dtype=np.float32)
+        found = np.zeros(len(q), dtype=bool)
+        if len(self.keys) and len(q):
+            pos = np.minimum(np.searchsorted(self.keys, q), len(self.keys) - 1)
+            found = self.keys[pos] == q
+            if found.any():
+                rows = self.rows[pos[found]]
+                order = np.argsort(rows)  # read the mmap front to back
+                out[np.flatnonzero(found)[order]] = self.vectors[rows[order]]
+
+        # rows put since the last save() are not in the sorted arrays yet
+        for i in np.flatnonzero(~found):
+            j = self._pending_index.get(int(q[i]))
+            if j is not None:
+                out[i] = self._pending_vecs[j]
+                found[i] = True
+
+        self.hits += int(found.sum())
+        self.misses += int(len(q) - found.sum())
+        return found, out
+
+    def put_many(self, keys: List[int], vectors: np.ndarray) -> None:
+        q = np.asarray(keys, dtype=np.uint64)
+        saved = np.zeros(len(q), dtype=bool)
+        if len(self.keys) and len(q):
+            pos = np.minimum(np.searchsorted(self.keys, q), len(self.keys) - 1)
+            saved = self.keys[pos] == q
+        for k, v, known in zip(keys, np.asarray(vectors, dtype=np.float32), saved):
+            if known or int(k) in self._pending_index:
+                continue
+            self._pending_index[int(k)] = len(self._pending_keys)
+            self._pending_keys.append(int(k))
+            self._pending_vecs.append(v)
+
+    def save(self) -> None:
+        if not self._pending_keys:
+            return
+        os.makedirs(self.dir, exist_ok=True)
+        start = 0 if self.vectors is None else int(self.vectors.shape[0])
+        new = np.stack(self._pending_vecs).astype(np.float32)
+        self.vectors = None  # drop the mapping before growing the file
+
+        with open(self.vectors_path, "r+b" if start else "wb") as f:
+            if not start:
+                f.write(npy_header((0, self.dim), "float32"))
+            # append after the last referenced row (drops rows a crashed save left behind)
+            f.seek(NPY_HEADER_BYTES + start * self.dim * 4)
+            f.write(new.tobytes())
+            f.truncate()
+            f.seek(0)
+            f.write(npy_header((start + len(new), self.dim), "float32"))
+
+        keys = np.concatenate([self.keys, np.asarray(self._pending_keys, dtype=np.uint64)])
+        rows = np.concatenate([self.rows, np.arange(start, start + len(new), dtype=np.int64)])
+        order = np.argsort(keys, kind="stable")
+        self.keys, self.rows = keys[order], rows[order]
+        for path, arr in ((self.keys_path, self.keys), (self.rows_path, self.rows)):
+            with open(path + ".tmp", "wb") as f:
+                np.save(f, arr)
+            os.replace(path + ".tmp", path)
+        with open(os.path.join(self.dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"identity": self.identity, "dim": self.dim}, f)
+
+        self._pending_keys, self._pending_vecs, self._pending_index = [], [], {}
+        self.vectors = np.load(self.vectors_path, mmap_mode="r")
@@ -1,39 +1,174 @@
 from __future__ import annotations
+import hashlib
 import os
+import re
+import threading
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import List
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
-DEFAULT_EMBED_MODEL = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+from src.core.config import EMBED_BACKEND, EMBED_DIM, EMBED_MODEL
+
+DEFAULT_EMBED_MODEL = EMBED_MODEL
+
+# st: SentenceTransformer (float32) | st-int8: same model with Linear layers dynamically
+# quantized to int8 (CPU) | hash: deterministic feature hashing, no model download
+EMBED_BACKENDS = ("st", "st-int8", "hash")
 
 
 @dataclass
-class Embedder:
+class Embedder(ABC):
+    """
+    Backend interface. encode() returns an (N, dim) float32 array of L2-normalized
+    rows; embed() is the ingest entry point that also rejects empty texts.
+    `identity` ("backend:model") is what the store records, so an index is only ever
+    queried with the encoder that produced it.
+    """
+
     model_name: str = DEFAULT_EMBED_MODEL
+    backend = ""
 
     def __post_init__(self):
-        self.model = SentenceTransformer(self.model_name)
-        # ✅ dim works for sentence-transformers models
-        self.dim = int(self.model.get_sentence_embedding_dimension())
+        self.dim = 0
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
+    @property
+    def identity(self) -> str:
+        return f"{self.backend}:{self.model_name}"
+
+    def describe(self) -> Dict[str, Any]:
+        return {"embed_backend": self.backend, "embed_model": self.model_name, "embed_dim": self.dim}
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        ...
+
+    def embed(self, texts: List[str]) -> np.ndarray:
         # ✅ Guard: no texts
         if not texts:
-            return []
+            return np.zeros((0, self.dim), dtype=np.float32)
 
         cleaned = [t.strip() if t is not None else "" for t in texts]
         if any(not t for t in cleaned):
             raise ValueError("Empty text passed to embed(). Filter empties before embedding.")
+        return self.encode(cleaned)
 
+
+@dataclass
+class SentenceTransformerEmbedder(Embedder):
+    backend = "st"
+
+    def __post_init__(self):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(self.model_name)
+        # ✅ dim works for sentence-transformers models
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+
+    def encode(self, texts: List[str]) -> np.ndarray:
         vecs = self.model.encode(
-            cleaned,
+            texts,
             normalize_embeddings=True,      # ✅ cosine-ready
-            show_progress_bar=True,
+            show_progress_bar=len(texts) > 256,
             batch_size=int(os.getenv("EMBED_BATCH", "16")),
+            convert_to_numpy=True,
         )
-        return vecs.tolist()
+        return np.asarray(vecs, dtype=np.float32)
+
+
+@dataclass
+class QuantizedSentenceTransformerEmbedder(SentenceTransformerEmbedder):
+    """
+    Dynamic int8 quantization of every nn.Linear (weights int8, activations quantized
+    on the fly). Runs on CPU only; vectors are close to, not equal to, the float model's.
+    """
 
+    backend = "st-int8"
 
-def get_embedder() -> Embedder:
-    return Embedder()
+    def __post_init__(self):
+        import torch
+
+        super().__post_init__()
+        self.model.to("cpu")
+        torch.quantization.quantize_dynamic(self.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=1 << 16)
+def _feature_hash(feature: str) -> int:
+    # blake2b, not hash(): must be stable across processes and runs
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+@dataclass
+class HashingEmbedder(Embedder):
+    """
+    Signed feature hashing of unigrams + bigrams. Deterministic and dependency-free,
+    for offline tests and benchmarks; shares lexical, not semantic, similarity.
+    """
+
+    model_name: str = ""
+    backend = "hash"
+    dim_override: Optional[int] = None
+
+    def __post_init__(self):
+        self.dim = int(self.dim_override or EMBED_DIM)
+        self.model_name = self.model_name or f"hashing-{self.dim}"
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            toks = _TOKEN_RE.findall((text or "").lower())
+            feats = toks + [f"{a} {b}" for a, b in zip(toks, toks[1:])]
+            if not feats:
+                continue
+            h = np.fromiter((_feature_hash(f) for f in feats), dtype=np.uint64, count=len(feats))
+            sign = np.where(h >> np.uint64(63), 1.0, -1.0).astype(np.float32)
+            np.add.at(out[i], (h % np.uint64(self.dim)).astype(np.int64), sign)
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+_BACKEND_CLASSES = {
+    "st": SentenceTransformerEmbedder,
+    "st-int8": QuantizedSentenceTransformerEmbedder,
+    "hash": HashingEmbedder,
+}
+_embedders: Dict[Tuple[str, str], Embedder] = {}
+_embedders_lock = threading.Lock()
+
+
+def get_embedder(backend: Optional[str] = None, model_name: Optional[str] = None) -> Embedder:
+    """Shared embedder per (backend, model); defaults come from EMBED_BACKEND / EMBED_MODEL."""
+    backend = (backend or EMBED_BACKEND).lower()
+    if backend not in _BACKEND_CLASSES:
+        raise ValueError(f"Unknown embed backend {backend!r}. Use one of {EMBED_BACKENDS}")
+    if backend == "hash":
+        model_name = model_name or ""
+    else:
+        model_name = model_name or DEFAULT_EMBED_MODEL
+
+    key = (backend, model_name)
+    with _embedders_lock:
+        if key not in _embedders:
+            _embedders[key] = _BACKEND_CLASSES[backend](model_name=model_name)
+        return _embedders[key]
+
+
+def check_store_meta(meta: Dict[str, Any], embedder: Embedder) -> None:
+    """Raises if the store's vectors were produced by a different encoder than `embedder`."""
+    if not meta:
+        print("[embedder] store has no embedder metadata (older ingest); cannot verify the query encoder", flush=True)
+        return
+    want = (meta.get("embed_backend"), meta.get("embed_model"), meta.get("embed_dim"))
+    have = (embedder.backend, embedder.model_name, embedder.dim)
+    if want != have:
+        raise RuntimeError(
+            f"Query encoder {embedder.identity} (dim {embedder.dim}) does not match the store, "
+            f"which was indexed with {want[0]}:{want[1]} (dim {want[2]}). "
+            "Set EMBED_BACKEND / EMBED_MODEL to match, or re-run ingestion."
+        )
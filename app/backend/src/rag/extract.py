@@ -0,0 +1,128 @@
+# src/rag/extract.py
+from __future__ import annotations
+import os
+import signal
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Deque, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+from src.core.config import INGEST_PAGE_TIMEOUT_S, INGEST_PAGES_PER_TASK, INGEST_WORKERS
+
+
+class PageTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise PageTimeout()
+
+
+def _extract_page(page, timeout_s: float) -> Tuple[str, bool]:
+    """(text, timed_out). The limit uses SIGALRM, so it only applies on Unix main threads."""
+    if timeout_s <= 0 or not hasattr(signal, "SIGALRM"):
+        return page.extract_text() or "", False
+    try:
+        prev = signal.signal(signal.SIGALRM, _on_alarm)
+    except ValueError:  # not the main thread
+        return page.extract_text() or "", False
+
+    text, timed_out = "", True
+    try:
+        try:
+            signal.setitimer(signal.ITIMER_REAL, timeout_s)
+            text, timed_out = page.extract_text() or "", False
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    except PageTimeout:
+        pass  # one-shot timer: whichever line it interrupted, it cannot fire again
+    finally:
+        signal.signal(signal.SIGALRM, prev)
+    return text, timed_out
+
+
+def _extract_range(path: str, start: int, end: int, timeout_s: float) -> List[Tuple[str, bool]]:
+    reader = PdfReader(path)
+    return [_extract_page(reader.pages[i], timeout_s) for i in range(start, end)]
+
+
+@dataclass
+class ExtractStats:
+    pages: int = 0
+    timeouts: int = 0
+    seconds: float = 0.0
+    workers: int = 1
+    timed_out_pages: List[Tuple[str, str]] = field(default_factory=list)
+
+    @property
+    def pages_per_second(self) -> float:
+        return self.pages / self.seconds if self.seconds > 0 else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"[extract] {self.pages} pages in {self.seconds:.2f}s "
+            f"({self.pages_per_second:.1f} pages/s, workers={self.workers}, timeouts={self.timeouts})"
+        )
+
+
+def iter_pdf_pages(
+    paths: List[str],
+    workers: Optional[int] = None,
+    pages_per_task: int = INGEST_PAGES_PER_TASK,
+    page_timeout_s: float = INGEST_PAGE_TIMEOUT_S,
+    stats: Optional[ExtractStats] = None,
+) -> Iterator[Tuple[str, dict]]:
+    """
+    Yields (path, {"page_label", "text"}) for every page of every PDF, in file order
+    then page order, while page ranges are extracted across a process pool.
+
+    Only a bounded window of ranges is in flight, so pages stream back as the consumer
+    reads them instead of piling up. A page exceeding page_timeout_s yields empty text
+    (and is counted in stats). Output is identical to serial pypdf extraction.
+    """
+    stats = stats if stats is not None else ExtractStats()
+    workers = workers or INGEST_WORKERS or os.cpu_count() or 1
+    pages_per_task = max(1, pages_per_task)
+    t0 = time.perf_counter()
+
+    tasks: List[Tuple[str, int, int]] = []
+    for p in paths:
+        n = len(PdfReader(p).pages)
+        tasks.extend((p, s, min(s + pages_per_task, n)) for s in range(0, n, pages_per_task))
+    workers = max(1, min(workers, len(tasks)))
+    stats.workers = workers
+
+    def _emit(path: str, start: int, results: List[Tuple[str, bool]]):
+        for i, (text, timed_out) in enumerate(results):
+            label = str(start + i + 1)
+            stats.pages += 1
+            if timed_out:
+                stats.timeouts += 1
+                stats.timed_out_pages.append((path, label))
+                print(f"[extract] page {label} of {os.path.basename(path)} exceeded {page_timeout_s}s, skipped", flush=True)
+            yield path, {"page_label": label, "text": text}
+
+    try:
+        if workers == 1:
+            for path, s, e in tasks:
+                yield from _emit(path, s, _extract_range(path, s, e, page_timeout_s))
+            return
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            window: Deque = deque()
+            it = iter(tasks)
+            for task in it:
+                window.append((task, pool.submit(_extract_range, *task, page_timeout_s)))
+                if len(window) >= workers * 2:
+                    break
+            while window:
+                (path, s, _), fut = window.popleft()
+                nxt = next(it, None)
+                if nxt is not None:
+                    window.append((nxt, pool.submit(_extract_range, *nxt, page_timeout_s)))
+                yield from _emit(path, s, fut.result())
+    finally:
+        stats.seconds = time.perf_counter() - t0
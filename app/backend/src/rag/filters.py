@@ -0,0 +1,133 @@
+# src/rag/filters.py
+"""
+Metadata filters for retrieval: file names, section patterns, page ranges.
+
+  flt = MetadataFilter.parse(files=["cv.pdf"], sections=["experience"], pages=["2-4"])
+  retrieve(question, filters=flt)
+
+A filter resolves to the sorted row ids it allows (MetadataFilter.resolve) through the
+ChunkStore's per-key postings, so BM25 and vector search only score those rows.
+Different fields are AND-ed, values within a field are OR-ed. Chunks without the
+filtered key never match.
+"""
+from __future__ import annotations
+import fnmatch
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.rag.chunk_store import ChunkStore
+
+PageSpec = Union[int, str, Sequence[int]]
+
+_GLOB_CHARS = set("*?[")
+
+
+def _matcher(pattern: str, substring: bool):
+    """Case-insensitive glob if the pattern has wildcards, else equality / substring."""
+    p = pattern.strip().casefold()
+    if _GLOB_CHARS & set(p):
+        return lambda v: fnmatch.fnmatchcase(v, p)
+    if substring:
+        return lambda v: p in v
+    return lambda v: v == p
+
+
+def _any_of(matchers: List[Any]):
+    return lambda v: any(m(str(v).casefold()) for m in matchers)
+
+
+def _page_number(value: Any) -> Optional[int]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    s = str(value).strip()
+    return int(s) if s.isdigit() else None
+
+
+def _page_range(spec: PageSpec) -> Tuple[int, int]:
+    """7, "7", "3-9" or [3, 9] -> inclusive (lo, hi)."""
+    if isinstance(spec, (list, tuple)):
+        if len(spec) != 2:
+            raise ValueError(f"page range needs [start, end], got {spec!r}")
+        lo, hi = (_page_number(x) for x in spec)
+    else:
+        lo_s, sep, hi_s = str(spec).partition("-")
+        lo = _page_number(lo_s)
+        hi = _page_number(hi_s) if sep else lo
+    if lo is None or hi is None or lo > hi:
+        raise ValueError(f"invalid page range {spec!r}")
+    return lo, hi
+
+
+@dataclass(frozen=True)
+class MetadataFilter:
+    """
+    files:    file_name equals one of these (case-insensitive; globs like "cv*.pdf" allowed)
+    sections: section contains one of these (case-insensitive; or a glob)
+    pages:    numeric page_label inside one of these inclusive ranges
+    """
+
+    files: Tuple[str, ...] = ()
+    sections: Tuple[str, ...] = ()
+    pages: Tuple[Tuple[int, int], ...] = ()
+
+    @classmethod
+    def parse(
+        cls,
+        files: Optional[Iterable[str]] = None,
+        sections: Optional[Iterable[str]] = None,
+        pages: Optional[Iterable[PageSpec]] = None,
+    ) -> Optional["MetadataFilter"]:
+        """Normalizes request values; None when nothing is filtered. Raises ValueError on bad pages."""
+        flt = cls(
+            files=tuple(sorted({os.path.basename(f.strip()) for f in files or () if f and f.strip()})),
+            sections=tuple(sorted({s.strip() for s in sections or () if s and s.strip()})),
+            pages=tuple(sorted({_page_range(p) for p in pages or ()})),
+        )
+        return flt if (flt.files or flt.sections or flt.pages) else None
+
+    def key(self) -> str:
+        """Stable string form (cache scopes, logs)."""
+        return json.dumps([self.files, self.sections, self.pages], separators=(",", ":"))
+
+    def _predicates(self) -> List[Tuple[str, Any]]:
+        preds: List[Tuple[str, Any]] = []
+        if self.files:
+            preds.append(("file_name", _any_of([_matcher(f, substring=False) for f in self.files])))
+        if self.sections:
+            preds.append(("section", _any_of([_matcher(s, substring=True) for s in self.sections])))
+        if self.pages:
+            def _in_pages(v: Any) -> bool:
+                n = _page_number(v)
+                return n is not None and any(lo <= n <= hi for lo, hi in self.pages)
+            preds.append(("page_label", _in_pages))
+        return preds
+
+    def matches(self, metadata: Dict[str, Any]) -> bool:
+        """The same test on one metadata dict (what post-filtering a result list would do)."""
+        return all(key in metadata and pred(metadata[key]) for key, pred in self._predicates())
+
+    def resolve(self, chunks: Sequence[Any]) -> np.ndarray:
+        """
+        Sorted int64 row ids of the chunks that match. For a ChunkStore each predicate
+        runs once per distinct value of its key and the rows come from the postings;
+        other sequences are scanned chunk by chunk.
+        """
+        if not isinstance(chunks, ChunkStore):
+            return np.fromiter(
+                (i for i, ch in enumerate(chunks) if self.matches(ch.metadata)), dtype=np.int64
+            )
+        rows: Optional[np.ndarray] = None
+        for key, pred in self._predicates():
+            _, values = chunks.column(key)
+            codes = [c for c, v in enumerate(values) if pred(v)]
+            found = chunks.rows_with(key, codes)
+            rows = found if rows is None else np.intersect1d(rows, found, assume_unique=True)
+            if rows.size == 0:
+                break
+        return rows if rows is not None else np.arange(len(chunks), dtype=np.int64)
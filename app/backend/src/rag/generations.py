@@ -0,0 +1,84 @@
+# src/rag/generations.py
+"""
+Versioned store layout under the storage root:
+
+  storage/
+    CURRENT                 id of the published generation (replaced atomically)
+    generations/<id>/       one complete HybridStore per ingest
+    manifest.json, page_cache/, embed_cache/   shared across generations
+
+Ingest writes a new generation directory and publishes it by replacing CURRENT;
+servers poll CURRENT and swap stores. A root without CURRENT is a pre-generations
+(flat) store and is used as is.
+"""
+
+from __future__ import annotations
+import os
+import shutil
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+
+GENERATIONS_DIR = "generations"
+CURRENT_FILE = "CURRENT"
+
+
+def new_generation_id() -> str:
+    # sorts in creation order (nanosecond fraction; "-" < "." keeps older
+    # second-resolution ids first), random suffix for concurrent ingests
+    ns = time.time_ns()
+    stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(ns // 1_000_000_000))
+    return f"{stamp}.{ns % 1_000_000_000:09d}-{uuid.uuid4().hex[:6]}"
+
+
+def generation_dir(root: str, gen_id: str) -> str:
+    return os.path.join(root, GENERATIONS_DIR, gen_id)
+
+
+def read_current(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_FILE), "r", encoding="utf-8") as f:
+            gen_id = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return gen_id or None
+
+
+def resolve(root: str) -> Tuple[str, Optional[str]]:
+    """(directory holding the live store, generation id or None for a flat store)."""
+    gen_id = read_current(root)
+    if gen_id is None:
+        return root, None
+    return generation_dir(root, gen_id), gen_id
+
+
+def publish(root: str, gen_id: str) -> None:
+    path = os.path.join(root, CURRENT_FILE)
+    tmp = f"{path}.{gen_id}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(gen_id + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def list_generations(root: str) -> List[str]:
+    base = os.path.join(root, GENERATIONS_DIR)
+    if not os.path.isdir(base):
+        return []
+    return sorted(d for d in os.listdir(base) if os.path.isdir(os.path.join(base, d)))
+
+
+def prune(root: str, keep: int = 2) -> List[str]:
+    """
+    Deletes all but the newest `keep` generations (never the current one).
+    Servers still mapping a deleted generation keep reading it until they swap:
+    unlinked files stay valid while mapped.
+    """
+    current = read_current(root)
+    old = [g for g in list_generations(root) if g != current]
+    doomed = old[: max(0, len(old) - max(keep - 1, 0))]
+    for g in doomed:
+        shutil.rmtree(generation_dir(root, g), ignore_errors=True)
+    return doomed
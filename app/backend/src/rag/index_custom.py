@@ -3,6 +3,7 @@ from __future__ import annotations
 from pathlib import Path
 from typing import Dict, Any, List
 import json
+import os
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
@@ -14,9 +15,10 @@ from src.rag.ingest_pdf import load_pdf_chunks
 INDEX_FILE = "index.npz"
 META_FILE = "meta.json"
 
-# For MVP speed: limit chunks so indexing doesn't feel "stuck".
-# Set to None to index everything.
-MAX_CHUNKS: int | None = 300
+# Optional cap for quick local builds (MAX_CHUNKS env); unset indexes everything.
+MAX_CHUNKS: int | None = int(os.environ["MAX_CHUNKS"]) if os.getenv("MAX_CHUNKS") else None
+# Texts encoded per call; embeddings are written straight into one preallocated matrix.
+ENCODE_BATCH = 256
 
 
 def build_index(private_data_dir: str) -> Dict[str, Any]:
@@ -30,7 +32,7 @@ def build_index(private_data_dir: str) -> Dict[str, Any]:
     print(f"✅ Step 1 done: chunks created = {len(chunks)}", flush=True)
 
     if MAX_CHUNKS is not None and len(chunks) > MAX_CHUNKS:
-        print(f"🚀 Using MAX_CHUNKS={MAX_CHUNKS} for quick build (MVP mode)", flush=True)
+        print(f"🚀 Using MAX_CHUNKS={MAX_CHUNKS} for quick build", flush=True)
         chunks = chunks[:MAX_CHUNKS]
         print(f"✅ Trimmed chunks = {len(chunks)}", flush=True)
 
@@ -38,15 +40,18 @@ def build_index(private_data_dir: str) -> Dict[str, Any]:
     model = SentenceTransformer(EMBED_MODEL)
     print("✅ Step 2 done: model loaded", flush=True)
 
-    texts = [c.text for c in chunks]
     print("⚡ Step 3: Creating embeddings (CPU can take a few minutes)...", flush=True)
-    embeddings = model.encode(
-        texts,
-        batch_size=16,
-        show_progress_bar=True,
-        normalize_embeddings=True,
-    )
-    embeddings = np.array(embeddings, dtype=np.float32)
+    dim = int(model.get_sentence_embedding_dimension())
+    embeddings = np.empty((len(chunks), dim), dtype=np.float32)
+    for s in range(0, len(chunks), ENCODE_BATCH):
+        batch = chunks[s:s + ENCODE_BATCH]
+        embeddings[s:s + len(batch)] = model.encode(
+            [c.text for c in batch],
+            batch_size=16,
+            show_progress_bar=False,
+            normalize_embeddings=True,
+        )
+        print(f"  embedded {s + len(batch)}/{len(chunks)}", flush=True)
     print(f"✅ Step 3 done: embeddings shape = {embeddings.shape}", flush=True)
 
     print("💾 Step 4: Saving index to disk...", flush=True)
@@ -1,9 +1,9 @@
 from __future__ import annotations
 from pathlib import Path
 from typing import List
-from pypdf import PdfReader
 
 from src.rag.chunking import Chunk, chunk_text_for_file
+from src.rag.extract import ExtractStats, iter_pdf_pages
 
 
 def load_pdf_chunks(private_data_dir: str) -> List[Chunk]:
@@ -16,15 +16,17 @@ def load_pdf_chunks(private_data_dir: str) -> List[Chunk]:
         raise FileNotFoundError(f"No PDFs found under: {base}")
 
     all_chunks: List[Chunk] = []
-
-    for pdf_path in pdfs:
-        print(f"Reading PDF: {pdf_path.name}", flush=True)
-        reader = PdfReader(str(pdf_path))
-        total_pages = len(reader.pages)
-
-        for i, page in enumerate(reader.pages, start=1):
-            print(f"  page {i}/{total_pages}", flush=True)
-            text = page.extract_text() or ""
-            all_chunks.extend(chunk_text_for_file(text, file_name=pdf_path.name, page_num=i))
-
+    stats = ExtractStats()
+    current = None
+
+    # pages are extracted in parallel but arrive in file / page order
+    for path, page in iter_pdf_pages([str(p) for p in pdfs], stats=stats):
+        name = Path(path).name
+        if path != current:
+            print(f"Reading PDF: {name}", flush=True)
+            current = path
+        i = int(page["page_label"])
+        all_chunks.extend(chunk_text_for_file(page["text"], file_name=name, page_num=i))
+
+    print(stats.summary(), flush=True)
     return all_chunks
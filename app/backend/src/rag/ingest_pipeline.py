@@ -1,87 +1,326 @@
 from __future__ import annotations
+import hashlib
+import json
 import os
-from typing import List
-from pypdf import PdfReader
+import shutil
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from src.rag.chunking import make_chunks
+import numpy as np
+
+from src.core.config import (
+    INGEST_EMBED_BATCH,
+    INGEST_EMBED_CACHE,
+    RAG_STORE_GENERATIONS,
+    RAG_STORE_KEEP_GENERATIONS,
+)
+from src.rag import generations
+from src.rag.embed_cache import EmbeddingDiskCache, text_key
+from src.rag import chunk_store
+from src.rag.chunking import chunking_params, make_chunks
+from src.rag.extract import ExtractStats, iter_pdf_pages
 from src.rag.store import HybridStore, StoredChunk
 from src.rag.embedder import get_embedder
 
+MANIFEST_FILE = "manifest.json"
+PAGE_CACHE_DIR = "page_cache"
+EMBED_CACHE_DIR = "embed_cache"
+
+
+def read_pdf_pages(path: str, workers: Optional[int] = None) -> List[dict]:
+    return [pg for _, pg in iter_pdf_pages([path], workers=workers)]
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _write_json_atomic(path: str, obj: Any) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_manifest(storage_dir: str) -> Dict[str, Any]:
+    """
+    manifest.json records, per ingested file (absolute path), its content hash and the
+    contiguous range of chunk ids it produced, so the next ingest can reuse them.
+    """
+    path = os.path.join(storage_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _page_cache_path(cache_dir: str, sha256: str) -> str:
+    return os.path.join(cache_dir, f"{sha256}.json")
 
-def read_pdf_pages(path: str) -> List[dict]:
-    reader = PdfReader(path)
-    pages = []
-    for i, page in enumerate(reader.pages):
-        txt = page.extract_text() or ""
-        pages.append({"page_label": str(i + 1), "text": txt})
+
+def prefetch_pdf_pages(items: List[Tuple[str, str]], cache_dir: str) -> ExtractStats:
+    """
+    Extracts every (path, sha256) PDF not yet in the page cache in one parallel pass
+    (pages of all files share the pool), writing each file's cache entry as soon as
+    its last page arrives. extract_pages then finds them cached.
+    """
+    stats = ExtractStats()
+    todo: Dict[str, str] = {}
+    for path, sha in items:
+        if os.path.splitext(path)[1].lower() == ".pdf" and not os.path.exists(_page_cache_path(cache_dir, sha)):
+            todo.setdefault(path, sha)
+    if not todo:
+        return stats
+
+    os.makedirs(cache_dir, exist_ok=True)
+    current, pages = None, []
+    for path, page in iter_pdf_pages(list(todo), stats=stats):
+        if path != current:
+            if current is not None:
+                _write_json_atomic(_page_cache_path(cache_dir, todo[current]), {"pages": pages})
+            current, pages = path, []
+        pages.append(page)
+    if current is not None:
+        _write_json_atomic(_page_cache_path(cache_dir, todo[current]), {"pages": pages})
+    print(stats.summary(), flush=True)
+    return stats
+
+
+def extract_pages(path: str, sha256: str, cache_dir: Optional[str] = None) -> List[dict]:
+    """
+    Pages of a file as [{"page_label", "text"}]. PDF extraction results are cached by
+    content hash, so an unchanged (or renamed / moved) file is never parsed twice.
+    Text files are a single page with page_label None.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext != ".pdf":
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            return [{"page_label": None, "text": f.read() or ""}]
+
+    cache_path = _page_cache_path(cache_dir, sha256) if cache_dir else None
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f)["pages"]
+
+    pages = read_pdf_pages(path)
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        _write_json_atomic(cache_path, {"pages": pages})
     return pages
 
 
-def ingest_paths(paths: List[str], store: HybridStore) -> None:
+def iter_chunks(pages: List[dict], file_name: str) -> Iterator[StoredChunk]:
+    for pg in pages:
+        raw = (pg["text"] or "").strip()
+        if len(raw) < 20:
+            continue  # skip empty pages
+
+        chunks = make_chunks(
+            raw,
+            file_name=file_name,
+            page_label=pg["page_label"],
+            doc_id=file_name,
+        )
+        for c in chunks:
+            txt = (c.text or "").strip()
+            if len(txt) < 20:
+                continue
+            yield StoredChunk(text=txt, metadata=c.metadata)
+
+
+class _PreviousStore:
+    """
+    Read-only view of the store being replaced, so unchanged files' chunks and vectors
+    can be copied into the new one range by range without loading it whole.
+    """
+
+    def __init__(self, store: HybridStore):
+        self.vectors = np.load(store.vectors_path, mmap_mode="r")
+        self._chunks = store.load_chunks()
+
+    @classmethod
+    def open(cls, store: HybridStore) -> Optional["_PreviousStore"]:
+        has_chunks = chunk_store.exists(store.storage_dir) or os.path.exists(store.chunks_path)
+        if not (has_chunks and os.path.exists(store.vectors_path)):
+            return None
+        prev = cls(store)
+        if prev.vectors.ndim != 2 or prev.vectors.shape != (len(prev._chunks), store.embed_dim):
+            prev.close()
+            return None
+        return prev
+
+    def chunks(self, start: int, stop: int) -> List[StoredChunk]:
+        return [self._chunks[i] for i in range(start, stop)]
+
+    def close(self) -> None:
+        self._chunks = []
+        self.vectors = None
+
+
+def ingest_paths(
+    paths: List[str],
+    store: HybridStore,
+    incremental: bool = True,
+    batch_size: int = INGEST_EMBED_BATCH,
+    use_embed_cache: bool = INGEST_EMBED_CACHE,
+    use_generations: bool = RAG_STORE_GENERATIONS,
+) -> Dict[str, Any]:
+    """
+    (Re)builds the store from `paths`, streaming pages -> chunks -> embedding batches
+    of `batch_size` into a StoreWriter, so peak memory is bounded by the batch rather
+    than by the corpus (no chunk cap).
+
+    With incremental=True and a previous manifest for the same embedding model and
+    chunking parameters (src.rag.chunking.chunking_params), files whose content hash
+    is unchanged keep their chunks and vectors (copied across from the old files);
+    only new or modified files are extracted, chunked and embedded,
+    and files no longer in `paths` are dropped. The keyword index is rebuilt from the
+    chunk texts (IDF and average length are corpus-wide, so every posting's weight
+    changes anyway), which costs far less than embedding. Returns a summary of what
+    was reused / embedded. The store is left unloaded; call store.load() to query it.
+
+    Chunks of new / modified files are looked up in the on-disk embedding cache
+    (keyed by encoder and normalized chunk text) first, so only texts never seen by
+    this encoder are encoded, e.g. after a chunking change or with --full.
+
+    `store.storage_dir` is the storage root. With use_generations the new store is
+    written to generations/<id> and only published (CURRENT replaced) once complete,
+    so running servers can keep serving the old one and swap when they notice.
+    """
+    t0 = time.perf_counter()
     embedder = get_embedder()
+    if embedder.dim != store.embed_dim:
+        raise ValueError(f"Embedder {embedder.identity} has dim {embedder.dim}, store expects {store.embed_dim}")
+    batch_size = max(1, batch_size)
+    root = store.storage_dir
+    cache_dir = os.path.join(root, PAGE_CACHE_DIR)
 
-    max_chunks = int(os.getenv("MAX_CHUNKS", "600"))  # ✅ cap to avoid RAM blowups
-    all_chunks: List[StoredChunk] = []
+    # the manifest describes the published store (a generation, or the flat root)
+    prev_dir, prev_gen = generations.resolve(root)
+    prev_manifest = load_manifest(root) if incremental else {}
+    prev: Optional[_PreviousStore] = None
+    prev_files: Dict[str, Dict[str, Any]] = {}
+    chunking = chunking_params()
+    if prev_manifest and prev_manifest.get("chunking") != chunking:
+        print(f"[ingest] chunking changed ({prev_manifest.get('chunking')} -> {chunking}), re-chunking every file", flush=True)
+    elif prev_manifest.get("embed_model") == embedder.identity and prev_manifest.get("generation") == prev_gen:
+        prev = _PreviousStore.open(store.with_storage_dir(prev_dir))
+        if prev is not None:
+            prev_files = prev_manifest.get("files", {})
 
-    for p in paths:
-        file_name = os.path.basename(p)
-        ext = os.path.splitext(p)[1].lower()
+    gen_id = generations.new_generation_id() if use_generations else None
+    out = store.with_storage_dir(generations.generation_dir(root, gen_id)) if gen_id else store
 
-        if ext == ".pdf":
-            for pg in read_pdf_pages(p):
-                raw = (pg["text"] or "").strip()
-                if len(raw) < 20:
-                    continue  # skip empty pages
+    stats = {"files_reused": 0, "files_embedded": 0, "files_dropped": 0, "chunks_reused": 0, "chunks_embedded": 0}
+    stats["embed_cache_hits"] = 0
+    stats["chunks_encoded"] = 0
+    cache = None
+    if use_embed_cache:
+        cache = EmbeddingDiskCache(os.path.join(root, EMBED_CACHE_DIR), embedder.identity, embedder.dim)
 
-                chunks = make_chunks(
-                    raw,
-                    file_name=file_name,
-                    page_label=pg["page_label"],
-                    doc_id=file_name,
-                )
-                for c in chunks:
-                    txt = (c.text or "").strip()
-                    if len(txt) < 20:
-                        continue
-                    all_chunks.append(StoredChunk(text=txt, metadata=c.metadata))
-                    if len(all_chunks) >= max_chunks:
-                        break
-                if len(all_chunks) >= max_chunks:
-                    break
+    hashed = [(p, file_sha256(p)) for p in paths]
+    changed = [(p, sha) for p, sha in hashed if prev_files.get(os.path.abspath(p), {}).get("sha256") != sha]
+    extract_stats = prefetch_pdf_pages(changed, cache_dir)
+    stats["pages_extracted"] = extract_stats.pages
+    stats["pages_per_second"] = round(extract_stats.pages_per_second, 1)
 
+    out.meta = {**embedder.describe(), "generation": gen_id or ""}
+    writer = out.writer()
+    pending: List[StoredChunk] = []
+
+    def _flush() -> None:
+        if not pending:
+            return
+        keys = [text_key(c.text) for c in pending]
+        if cache is not None:
+            found, vectors = cache.get_many(keys)
         else:
-            with open(p, "r", encoding="utf-8", errors="ignore") as f:
-                txt = (f.read() or "").strip()
+            found, vectors = np.zeros(len(keys), dtype=bool), np.zeros((len(keys), embedder.dim), dtype=np.float32)
 
-            if len(txt) < 20:
-                continue
+        # ✅ embeddings (must match chunk count) — only for texts this encoder never saw
+        miss: Dict[int, List[int]] = {}
+        for i in np.flatnonzero(~found):
+            miss.setdefault(keys[i], []).append(int(i))
+        if miss:
+            encoded = embedder.embed([pending[idxs[0]].text for idxs in miss.values()])
+            if len(encoded) == 0:
+                raise RuntimeError("Embedding returned 0 vectors. Likely empty/short chunks. Check PDF extraction.")
+            if len(encoded) != len(miss):
+                raise RuntimeError(
+                    f"Vector/chunk mismatch: vectors={len(encoded)} chunks={len(miss)}. "
+                    "Ensure you filter empty/short chunks only in ingest_pipeline."
+                )
+            for idxs, v in zip(miss.values(), encoded):
+                vectors[idxs] = v
+            if cache is not None:
+                cache.put_many(list(miss), encoded)
+
+        stats["embed_cache_hits"] += int(found.sum())
+        stats["chunks_encoded"] += len(miss)
+        writer.add(pending, vectors)
+        pending.clear()
 
-            chunks = make_chunks(txt, file_name=file_name, page_label=None, doc_id=file_name)
-            for c in chunks:
-                t = (c.text or "").strip()
-                if len(t) < 20:
+    files: Dict[str, Dict[str, Any]] = {}
+    try:
+        for p, sha in hashed:
+            key = os.path.abspath(p)
+            start = writer.n + len(pending)
+            old = prev_files.get(key)
+
+            if old is not None and old["sha256"] == sha:
+                _flush()  # keep chunk ids in path order
+                s0, s1 = old["start"], old["start"] + old["n_chunks"]
+                for s in range(s0, s1, batch_size):
+                    e = min(s + batch_size, s1)
+                    writer.add(prev.chunks(s, e), prev.vectors[s:e])
+                stats["files_reused"] += 1
+                stats["chunks_reused"] += s1 - s0
+            else:
+                n = 0
+                for c in iter_chunks(extract_pages(p, sha, cache_dir), os.path.basename(p)):
+                    pending.append(c)
+                    n += 1
+                    if len(pending) >= batch_size:
+                        _flush()
+                if n == 0:
                     continue
-                all_chunks.append(StoredChunk(text=t, metadata=c.metadata))
-                if len(all_chunks) >= max_chunks:
-                    break
-
-        if len(all_chunks) >= max_chunks:
-            break
-
-    if not all_chunks:
-        raise RuntimeError("No chunks created. PDF extraction might be empty or chunking is too strict.")
-
-    # ✅ embeddings (must match chunk count)
-    texts = [c.text for c in all_chunks]
-    vectors = embedder.embed(texts)
-
-    if not vectors:
-        raise RuntimeError("Embedding returned 0 vectors. Likely empty/short chunks. Check PDF extraction.")
-    if len(vectors) != len(all_chunks):
-        raise RuntimeError(
-            f"Vector/chunk mismatch: vectors={len(vectors)} chunks={len(all_chunks)}. "
-            "Ensure you filter empty/short chunks only in ingest_pipeline."
-        )
+                stats["files_embedded"] += 1
+                stats["chunks_embedded"] += n
+
+            files[key] = {"sha256": sha, "start": start, "n_chunks": writer.n + len(pending) - start}
+        _flush()
+
+        if writer.n == 0:
+            raise RuntimeError("No chunks created. PDF extraction might be empty or chunking is too strict.")
+        writer.finish()
+    except BaseException:
+        writer.abort()
+        if gen_id:
+            shutil.rmtree(out.storage_dir, ignore_errors=True)
+        raise
+    finally:
+        if prev is not None:
+            prev.close()
+        if cache is not None:
+            cache.save()  # keep what was encoded even if the run failed
+
+    stats["files_dropped"] = len(set(prev_files) - set(files))
+    if gen_id:
+        generations.publish(root, gen_id)
+        generations.prune(root, keep=RAG_STORE_KEEP_GENERATIONS)
+    elif prev_gen is not None:
+        # flat ingest over a generations root: drop CURRENT so the flat store is live
+        os.remove(os.path.join(root, generations.CURRENT_FILE))
+    _write_json_atomic(
+        os.path.join(root, MANIFEST_FILE),
+        {"version": 1, "embed_model": embedder.identity, "chunking": chunking, "generation": gen_id, "files": files},
+    )
 
-    store.build(vectors, all_chunks)
-    store.save()
+    stats["generation"] = out.generation
+    stats["chunks_total"] = writer.n
+    stats["seconds"] = round(time.perf_counter() - t0, 2)
+    return stats
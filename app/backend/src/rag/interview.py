@@ -1,12 +1,12 @@
 # src/rag/interview.py
 from __future__ import annotations
 from typing import Dict, Any, List
+import asyncio
 import uuid
 import random
 
-from src.rag.rag import get_store
-from src.rag.retrieve_custom import make_context_pack
-from src.rag.llm_groq import answer_with_groq
+from src.rag.retrieve_custom import get_store, make_context_pack
+from src.rag.llm_groq import answer_with_groq_async
 
 # in-memory sessions (fine for dev; swap to Redis for prod)
 _SESSIONS: Dict[str, Dict[str, Any]] = {}
@@ -28,8 +28,9 @@ def _pick_seed_chunks(k: int = 10) -> List[Dict[str, Any]]:
         })
     return hits
 
-def start_interview(n_questions: int = 6) -> Dict[str, Any]:
-    hits = _pick_seed_chunks(k=12)
+async def start_interview(n_questions: int = 6) -> Dict[str, Any]:
+    # first call may load the store from disk; keep that off the event loop
+    hits = await asyncio.to_thread(_pick_seed_chunks, 12)
     context = make_context_pack(hits, max_chars=9000)
 
     prompt = f"""
@@ -42,7 +43,7 @@ Output JSON only in this schema:
   ]
 }}
 """
-    raw = answer_with_groq(prompt, context, mode="interview")
+    raw = await answer_with_groq_async(prompt, context, mode="interview")
 
     # best effort parse JSON (keep simple)
     import json
@@ -71,7 +72,7 @@ Output JSON only in this schema:
         "total": len(questions),
     }
 
-def answer_interview(session_id: str, user_answer: str) -> Dict[str, Any]:
+async def answer_interview(session_id: str, user_answer: str) -> Dict[str, Any]:
     s = _SESSIONS.get(session_id)
     if not s:
         return {"error": "Invalid session_id. Start again."}
@@ -98,7 +99,7 @@ Return:
 4) A corrected "ideal answer" (short), grounded (no invention)
 Output in plain text with bullet points.
 """
-    grading = answer_with_groq(grade_prompt, context, mode="interview")
+    grading = await answer_with_groq_async(grade_prompt, context, mode="interview")
 
     s["history"].append({"q": qobj["q"], "a": user_answer, "grading": grading})
 
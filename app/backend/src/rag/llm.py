@@ -1,12 +1,22 @@
 from groq import Groq
 from src.core.config import GROQ_API_KEY, GROQ_MODEL
 
+# reuse one client (and its connection pool) across calls
+_client = None
+
+
+def _get_client() -> Groq:
+    global _client
+    if _client is None:
+        _client = Groq(api_key=GROQ_API_KEY)
+    return _client
+
 
 def generate_answer(question: str, context: str) -> str:
     if not GROQ_API_KEY:
         raise ValueError("GROQ_API_KEY is missing. Add it to your .env")
 
-    client = Groq(api_key=GROQ_API_KEY)
+    client = _get_client()
 
     system = (
         "You are PersonaQuery, a professional assistant that answers ONLY using the provided context.\n"
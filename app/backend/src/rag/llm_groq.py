@@ -1,10 +1,28 @@
 # src/rag/llm_groq.py
 from __future__ import annotations
-import requests
+import asyncio
+import json
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Optional, Tuple
 
-from src.core.config import GROQ_API_KEY, GROQ_MODEL
+import httpx
 
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"
+from src.core.config import (
+    GROQ_API_KEY,
+    GROQ_MODEL,
+    GROQ_URL,
+    GROQ_CONNECT_TIMEOUT,
+    GROQ_READ_TIMEOUT,
+    GROQ_MAX_CONNECTIONS,
+    GROQ_MAX_KEEPALIVE,
+)
+from src.core.metrics import REGISTRY
+
+# answer_with_groq reports failures in-band; these prefixes mark such answers
+LLM_ERROR_PREFIXES = ("Server misconfiguration:", "LLM error:", "LLM request failed:")
+
+LLM_ERRORS = REGISTRY.counter(
+    "rag_llm_errors_total", "Failed LLM calls by reason (misconfigured, http_<status>, exception, truncated).", ("reason",)
+)
 
 SYSTEM_PROMPT = """You are PersonaQuery, a grounded RAG assistant.
 Rules:
@@ -24,10 +42,16 @@ Output:
 """
 
 
-def answer_with_groq(question: str, context: str, mode: str = "chat") -> str:
-    if not GROQ_API_KEY:
-        return "Server misconfiguration: GROQ_API_KEY is missing."
+class LLMStreamError(Exception):
+    """A stream that failed or ended early; str(e) is the in-band message (LLM_ERROR_PREFIXES)."""
+
+
+def _error(reason: str, message: str) -> str:
+    LLM_ERRORS.labels(reason=reason).inc()
+    return message
 
+
+def _build_payload(question: str, context: str, mode: str) -> Dict[str, Any]:
     mode_guidance = ""
     if mode == "advisor":
         mode_guidance = """Advisor mode:
@@ -50,7 +74,7 @@ Citation rule: Use [[cite:1,3]] where the numbers match SOURCE ids in the contex
 Answer now, following the rules.
 """
 
-    payload = {
+    return {
         "model": GROQ_MODEL,
         "temperature": 0.2,
         "messages": [
@@ -59,16 +83,134 @@ Answer now, following the rules.
         ],
     }
 
+
+def _headers() -> Dict[str, str]:
+    return {"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"}
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(GROQ_READ_TIMEOUT, connect=GROQ_CONNECT_TIMEOUT)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=GROQ_MAX_CONNECTIONS, max_keepalive_connections=GROQ_MAX_KEEPALIVE)
+
+
+def _parse_response(r: httpx.Response) -> str:
+    if r.status_code != 200:
+        return _error(f"http_{r.status_code}", f"LLM error: {r.status_code} {r.text[:400]}")
+    data = r.json()
+    return data["choices"][0]["message"]["content"].strip()
+
+
+# Pooled keep-alive clients: one TCP+TLS handshake per connection, not per call.
+_client: Optional[httpx.Client] = None
+_async_clients: Dict[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, AsyncGenerator[None, None]]] = {}
+
+
+def _get_client() -> httpx.Client:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.Client(timeout=_timeout(), limits=_limits())
+    return _client
+
+
+async def _close_with_loop(client: httpx.AsyncClient) -> AsyncGenerator[None, None]:
+    # Parked async generator: asyncio.run() finalizes live async generators
+    # (loop.shutdown_asyncgens) before closing the loop, which closes the client on
+    # its own loop instead of leaking its pooled connections.
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+async def _park(agen: AsyncGenerator[None, None]) -> None:
+    await agen.__anext__()
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    # An AsyncClient's pool is bound to the loop that created it (asyncio.run() in
+    # scripts creates a fresh loop each time), so there is one client per loop.
+    loop = asyncio.get_running_loop()
+    entry = _async_clients.get(loop)
+    if entry is None or entry[0].is_closed:
+        # finished loops closed their clients on the way out; drop the references
+        for old in [lp for lp in _async_clients if lp.is_closed()]:
+            del _async_clients[old]
+        client = httpx.AsyncClient(timeout=_timeout(), limits=_limits())
+        closer = _close_with_loop(client)
+        loop.create_task(_park(closer))
+        entry = _async_clients[loop] = (client, closer)
+    return entry[0]
+
+
+async def aclose_clients() -> None:
+    """Closes every pooled client: the running loop's directly, other live loops' on their loop."""
+    global _client
+    loop = asyncio.get_running_loop()
+    clients = list(_async_clients.items())
+    _async_clients.clear()
+    for lp, (client, _) in clients:
+        if lp is loop:
+            await client.aclose()
+        elif lp.is_running():
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), lp))
+    if _client is not None:
+        _client.close()
+        _client = None
+
+
+def answer_with_groq(question: str, context: str, mode: str = "chat") -> str:
+    """Blocking variant for scripts; the API uses answer_with_groq_async."""
+    if not GROQ_API_KEY:
+        return _error("misconfigured", "Server misconfiguration: GROQ_API_KEY is missing.")
+
+    try:
+        r = _get_client().post(GROQ_URL, headers=_headers(), json=_build_payload(question, context, mode))
+        return _parse_response(r)
+    except Exception as e:
+        return _error("exception", f"LLM request failed: {e}")
+
+
+async def answer_with_groq_async(question: str, context: str, mode: str = "chat") -> str:
+    if not GROQ_API_KEY:
+        return _error("misconfigured", "Server misconfiguration: GROQ_API_KEY is missing.")
+
+    try:
+        r = await _get_async_client().post(GROQ_URL, headers=_headers(), json=_build_payload(question, context, mode))
+        return _parse_response(r)
+    except Exception as e:
+        return _error("exception", f"LLM request failed: {e}")
+
+
+async def stream_with_groq_async(question: str, context: str, mode: str = "chat") -> AsyncIterator[str]:
+    """
+    Yields content deltas as the model generates them (OpenAI-style SSE stream).
+    Failures, including a stream that ends without [DONE], raise LLMStreamError
+    after whatever was already yielded, so callers can tell a partial answer
+    from a complete one.
+    """
+    if not GROQ_API_KEY:
+        raise LLMStreamError(_error("misconfigured", "Server misconfiguration: GROQ_API_KEY is missing."))
+
+    payload = {**_build_payload(question, context, mode), "stream": True}
     try:
-        r = requests.post(
-            GROQ_URL,
-            headers={"Authorization": f"Bearer {GROQ_API_KEY}", "Content-Type": "application/json"},
-            json=payload,
-            timeout=45,
-        )
-        if r.status_code != 200:
-            return f"LLM error: {r.status_code} {r.text[:400]}"
-        data = r.json()
-        return data["choices"][0]["message"]["content"].strip()
+        async with _get_async_client().stream("POST", GROQ_URL, headers=_headers(), json=payload) as r:
+            if r.status_code != 200:
+                body = (await r.aread()).decode("utf-8", errors="replace")
+                raise LLMStreamError(_error(f"http_{r.status_code}", f"LLM error: {r.status_code} {body[:400]}"))
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    return
+                delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+        raise LLMStreamError(_error("truncated", "LLM request failed: stream ended before [DONE]"))
+    except LLMStreamError:
+        raise
     except Exception as e:
-        return f"LLM request failed: {e}"
+        raise LLMStreamError(_error("exception", f"LLM request failed: {e}")) from e
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+
+VECTOR_DTYPES = ("float32", "float16", "int8")
+
+# Rows scored per block, so the float32 upcast of a quantized matrix never
+# materializes more than ~block * dim * 4 bytes at once.
+SCORE_BLOCK_ROWS = 4096
+
+# .npy header padded to a fixed size, so appenders can patch the row count in place
+NPY_HEADER_BYTES = 128
+
+
+def npy_header(shape: Tuple[int, ...], dtype: str) -> bytes:
+    desc = {"descr": np.lib.format.dtype_to_descr(np.dtype(dtype)), "fortran_order": False, "shape": tuple(shape)}
+    body = repr(desc).encode("latin1")
+    prefix = np.lib.format.magic(1, 0) + struct.pack("<H", NPY_HEADER_BYTES - 10)
+    return prefix + body + b" " * (NPY_HEADER_BYTES - len(prefix) - len(body) - 1) + b"\n"
+
+
+def quantize(X: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Returns (matrix, per-vector scales). Scales are None unless dtype is int8.
+    int8 uses symmetric per-row scaling: x ~= q * scale, scale = max|x| / 127.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unknown vector dtype {dtype!r}. Use one of {VECTOR_DTYPES}")
+    if dtype == "float32":
+        return np.asarray(X, dtype=np.float32), None
+    if dtype == "float16":
+        return np.asarray(X, dtype=np.float16), None
+
+    n = X.shape[0]
+    Q = np.empty(X.shape, dtype=np.int8)
+    scales = np.empty(n, dtype=np.float32)
+    for s in range(0, n, SCORE_BLOCK_ROWS):
+        block = np.asarray(X[s:s + SCORE_BLOCK_ROWS], dtype=np.float32)
+        amax = np.abs(block).max(axis=1) if block.size else np.empty(0, dtype=np.float32)
+        sc = np.where(amax > 0, amax / 127.0, 1.0).astype(np.float32)
+        Q[s:s + SCORE_BLOCK_ROWS] = np.clip(np.rint(block / sc[:, None]), -127, 127).astype(np.int8)
+        scales[s:s + SCORE_BLOCK_ROWS] = sc
+    return Q, scales
+
+
+class RowReader:
+    """
+    Reads individual rows of a 2-D .npy file with pread.
+
+    Used for the float32 re-scoring step: touching a handful of rows through an mmap
+    can fault in whole large folios (megabytes) per row, while pread only copies the
+    bytes asked for.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            self.offset = f.tell()
+        if fortran or len(shape) != 2:
+            raise RuntimeError(f"{path}: expected a C-ordered 2-D array")
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.row_bytes = int(shape[1]) * self.dtype.itemsize
+        self._fd = os.open(path, os.O_RDONLY)
+
+    def __getitem__(self, rows: np.ndarray) -> np.ndarray:
+        out = np.empty((len(rows), self.shape[1]), dtype=self.dtype)
+        for j, r in enumerate(rows):
+            buf = os.pread(self._fd, self.row_bytes, self.offset + int(r) * self.row_bytes)
+            out[j] = np.frombuffer(buf, dtype=self.dtype)
+        return out
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def __del__(self):
+        self.close()
+
+
+def score(
+    X: np.ndarray,
+    scales: Optional[np.ndarray],
+    q: np.ndarray,
+    rows: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Dot products of q against X (optionally only `rows`), dequantizing blockwise.
+    q may be (D,) or (D, Q) for a batch of queries.
+    """
+    q = np.asarray(q, dtype=np.float32)
+    n = X.shape[0] if rows is None else len(rows)
+    out = np.empty((n,) + q.shape[1:], dtype=np.float32)
+
+    for s in range(0, n, SCORE_BLOCK_ROWS):
+        e = min(s + SCORE_BLOCK_ROWS, n)
+        block = X[s:e] if rows is None else X[rows[s:e]]
+        sims = np.asarray(block, dtype=np.float32) @ q
+        if scales is not None:
+            sc = scales[s:e] if rows is None else scales[rows[s:e]]
+            sims *= sc.reshape((-1,) + (1,) * (sims.ndim - 1))
+        out[s:e] = sims
+    return out
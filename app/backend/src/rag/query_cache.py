@@ -0,0 +1,64 @@
+# src/rag/query_cache.py
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    # whitespace only: casing/punctuation can change the embedding
+    return " ".join((text or "").split())
+
+
+class EmbeddingLRUCache:
+    """
+    Bounded LRU of query embeddings keyed by (model name, normalized text).
+    Thread-safe; vectors are stored read-only so callers can't mutate cached entries.
+    maxsize <= 0 disables caching (every lookup is a miss).
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> Tuple[str, str]:
+        return (model_name, normalize_query(text))
+
+    def get(self, key: Hashable) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return vec
+
+    def put(self, key: Hashable, vec: np.ndarray) -> None:
+        if self.maxsize <= 0:
+            return
+        vec = np.array(vec, dtype=np.float32)
+        vec.flags.writeable = False
+        with self._lock:
+            self._data[key] = vec
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data), "maxsize": self.maxsize}
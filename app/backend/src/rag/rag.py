@@ -1,43 +1,121 @@
 # src/rag/rag.py
 from __future__ import annotations
 
-from typing import Dict, Any, List
+from dataclasses import dataclass
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple, Union
+import asyncio
 import re
 import os
 import time
 
-from src.core.config import TOP_K, INJECTION_GUARD_ENABLED
+import numpy as np
+
+from src.core.config import (
+    TOP_K,
+    INJECTION_GUARD_ENABLED,
+    RAG_ANSWER_CACHE_SIZE,
+    RAG_ANSWER_CACHE_TTL_S,
+    RAG_ANSWER_CACHE_THRESHOLD,
+    RAG_VECTOR_ENABLED,
+)
+from src.core.metrics import CACHE_REQUESTS, span, start_timings
+from src.rag.answer_cache import SemanticAnswerCache
+from src.rag.filters import MetadataFilter
 from src.rag.guardrails import check_question
-from src.rag.retrieve_custom import retrieve, make_context_pack
-from src.rag.llm_groq import answer_with_groq
+from src.rag.retrieve_custom import retrieve, make_context_pack, embed_query, get_store
+from src.rag.llm_groq import LLM_ERROR_PREFIXES, LLMStreamError, answer_with_groq_async, stream_with_groq_async
 
 SOURCE_ID_RE = re.compile(r"\[\[cite:([0-9,\s]+)\]\]")
+# a text tail that could still grow into a [[cite:...]] marker
+PARTIAL_CITE_RE = re.compile(r"\[(\[(c(i(t(e(:[0-9,\s]*(\])?)?)?)?)?)?)?$")
+
+_answer_cache = SemanticAnswerCache(
+    maxsize=RAG_ANSWER_CACHE_SIZE,
+    ttl_s=RAG_ANSWER_CACHE_TTL_S,
+    threshold=RAG_ANSWER_CACHE_THRESHOLD,
+)
+
+
+def answer_cache_stats() -> Dict[str, Any]:
+    return _answer_cache.stats()
+
 
+@dataclass
+class _Prepared:
+    question: str
+    sources_with_ids: List[Tuple[int, Dict[str, Any]]]
+    context: str
+    use_cache: bool
+    q_vec: Optional[np.ndarray] = None
+    generation: str = ""
+    cache_scope: str = "chat"
 
-def run_rag(question: str, top_k: int = TOP_K, mode: str = "chat") -> Dict[str, Any]:
+
+def _prepare(
+    question: str,
+    top_k: int,
+    mode: str,
+    use_cache: bool,
+    filters: Optional[MetadataFilter] = None,
+) -> Union[Dict[str, Any], _Prepared]:
+    """
+    Everything before the LLM call (guardrails, answer cache, retrieval, context).
+    CPU-bound, so async callers run it in a worker thread.
+    Returns a finished response (blocked / cache hit / nothing matches the filters)
+    or the prepared request.
+    """
     debug = os.getenv("DEBUG_RAG", "0").lower() in {"1", "true", "yes"}
     t0 = time.perf_counter()
     if INJECTION_GUARD_ENABLED:
-        gr = check_question(question)
+        with span("guardrail"):
+            gr = check_question(question)
         if not gr.allowed:
-            return {"answer": gr.reason or "Request blocked by guardrails.", "sources": []}
+            return {"answer": gr.reason or "Request blocked by guardrails.", "sources": [], "cached": False}
         question = gr.sanitized_question or question
 
-    hits = retrieve(question, top_k=top_k)
+    # pin one store generation for the whole request (a hot swap may happen meanwhile)
+    store = get_store()
+    generation = store.generation
+
+    if filters is not None:
+        with span("filter"):
+            matched = store.filter_rows(filters).size
+        if matched == 0:
+            return {"answer": "No indexed documents match the given filters.", "sources": [], "cached": False}
+
+    # answers to the same question under different filters must not be shared
+    cache_scope = mode if filters is None else f"{mode}|{filters.key()}"
+    use_cache = use_cache and _answer_cache.enabled
+    q_vec = None
+    if use_cache:
+        if RAG_VECTOR_ENABLED:
+            try:
+                # also warms the query-embedding LRU that retrieve() reads
+                q_vec = embed_query(question)
+            except Exception:
+                q_vec = None
+        cached = _answer_cache.lookup(question, q_vec, cache_scope, top_k, generation)
+        CACHE_REQUESTS.labels(cache="answer", result="miss" if cached is None else "hit").inc()
+        if cached is not None:
+            if debug:
+                print(f"[rag] answer cache hit in {time.perf_counter() - t0:.3f}s", flush=True)
+            return {**cached, "cached": True}
+
+    hits = retrieve(question, top_k=top_k, store=store, filters=filters)
     if debug:
         print(f"[rag] retrieve: {len(hits)} hits in {time.perf_counter() - t0:.2f}s", flush=True)
 
     # Assign stable source ids (1..N) for answer citations
     sources_with_ids = list(zip(range(1, len(hits) + 1), hits))
-    context = make_context_pack(
-        [h for _, h in sources_with_ids],
-        source_ids=[sid for sid, _ in sources_with_ids],
-    )
+    with span("context"):
+        context = make_context_pack(
+            [h for _, h in sources_with_ids],
+            source_ids=[sid for sid, _ in sources_with_ids],
+        )
+    return _Prepared(question, sources_with_ids, context, use_cache, q_vec, generation, cache_scope)
 
-    answer = answer_with_groq(question, context, mode=mode)
-    if debug:
-        print(f"[rag] llm done in {time.perf_counter() - t0:.2f}s", flush=True)
 
+def _cited_ids(answer: str) -> set[int]:
     # Cite-only-if-used: match [[cite:1,2]] markers
     used_ids: set[int] = set()
     for match in SOURCE_ID_RE.findall(answer or ""):
@@ -45,27 +123,157 @@ def run_rag(question: str, top_k: int = TOP_K, mode: str = "chat") -> Dict[str,
         for p in parts:
             if p.isdigit():
                 used_ids.add(int(p))
+    return used_ids
+
+
+def _source_entry(sid: int, h: Dict[str, Any]) -> Dict[str, Any]:
+    m = h["metadata"]
+    return {
+        "id": sid,
+        "file_name": m.get("file_name", "unknown"),
+        "page_label": m.get("page_label", "n/a"),
+        "section": m.get("section", "Document"),
+        "relevance": h.get("score", 0.0),
+        "channel": m.get("channel", "hybrid"),
+        "snippet": h["text"][:320],
+    }
+
+
+def _finish(prep: _Prepared, answer: str, top_k: int, mode: str, complete: bool = True) -> Dict[str, Any]:
+    """complete=False (a failed / truncated stream) keeps the answer out of the cache."""
+    with span("citation"):
+        used_ids = _cited_ids(answer)
+        sources_with_ids = prep.sources_with_ids
+
+        used_hits: List[Tuple[int, Dict[str, Any]]] = []
+        if used_ids:
+            for sid, h in sources_with_ids:
+                if sid in used_ids:
+                    used_hits.append((sid, h))
+
+        # fallback: if model didn't cite, return top 3 sources
+        sources_with_ids = used_hits if used_hits else sources_with_ids[: min(3, len(sources_with_ids))]
+        sources = [_source_entry(sid, h) for sid, h in sources_with_ids]
+
+    result = {"answer": answer, "sources": sources, "generation": prep.generation}
+    if prep.use_cache and complete and not (answer or "").startswith(LLM_ERROR_PREFIXES):
+        _answer_cache.put(prep.question, prep.q_vec, prep.cache_scope, top_k, prep.generation, result)
+    return {**result, "cached": False}
+
+
+def _with_timings(result: Dict[str, Any], timings: Dict[str, float], t0: float) -> Dict[str, Any]:
+    return {**result, "timings_ms": {**timings, "total": round((time.perf_counter() - t0) * 1000, 3)}}
+
+
+async def run_rag(
+    question: str,
+    top_k: int = TOP_K,
+    mode: str = "chat",
+    use_cache: bool = True,
+    timings: bool = False,
+    filters: Optional[MetadataFilter] = None,
+) -> Dict[str, Any]:
+    """
+    timings=True adds "timings_ms": per-stage milliseconds (guardrail, embed, bm25, ...) + total.
+    filters restricts retrieval to matching chunks (see src.rag.filters).
+    """
+    debug = os.getenv("DEBUG_RAG", "0").lower() in {"1", "true", "yes"}
+    t0 = time.perf_counter()
+    stage_ms = start_timings()
+
+    prep = await asyncio.to_thread(_prepare, question, top_k, mode, use_cache, filters)
+    if not isinstance(prep, _Prepared):
+        return _with_timings(prep, stage_ms, t0) if timings else prep
+
+    # awaiting the pooled async client doesn't hold a thread while the LLM generates
+    with span("llm"):
+        answer = await answer_with_groq_async(prep.question, prep.context, mode=mode)
+    if debug:
+        print(f"[rag] llm done in {time.perf_counter() - t0:.2f}s {stage_ms}", flush=True)
+
+    result = _finish(prep, answer, top_k, mode)
+    return _with_timings(result, stage_ms, t0) if timings else result
+
+
+class CitationStream:
+    """
+    Incremental [[cite:n]] resolution over streamed LLM deltas.
+
+    feed() returns (text, ids): text that is safe to emit now and the source ids of
+    markers completed inside it. A tail that may still become a marker is held back,
+    so a marker is never split across two emitted chunks.
+    """
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, delta: str) -> Tuple[str, List[int]]:
+        buf = self._pending + delta
+        m = PARTIAL_CITE_RE.search(buf)
+        cut = m.start() if m else len(buf)
+        text, self._pending = buf[:cut], buf[cut:]
+        return text, sorted(_cited_ids(text))
+
+    def flush(self) -> Tuple[str, List[int]]:
+        text, self._pending = self._pending, ""
+        return text, sorted(_cited_ids(text))
+
+
+async def stream_rag(
+    question: str,
+    top_k: int = TOP_K,
+    mode: str = "chat",
+    use_cache: bool = True,
+    timings: bool = False,
+    filters: Optional[MetadataFilter] = None,
+) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming run_rag. Yields (event, data):
+      sources  - every retrieved source with its id, before any LLM output
+      token    - answer text as it is generated (markers kept whole)
+      citation - ids + source entries of a [[cite:...]] marker, as soon as it completes
+      done     - the same payload run_rag returns (answer, cited sources, cached)
+    """
+    t0 = time.perf_counter()
+    stage_ms = start_timings()
+    prep = await asyncio.to_thread(_prepare, question, top_k, mode, use_cache, filters)
+    if not isinstance(prep, _Prepared):
+        # guardrail block, answer-cache hit or no filter match: nothing to stream from the LLM
+        if prep.get("sources"):
+            yield "sources", {"sources": prep["sources"], "cached": prep.get("cached", False)}
+        yield "token", {"text": prep.get("answer", "")}
+        yield "done", _with_timings(prep, stage_ms, t0) if timings else prep
+        return
+
+    by_id = {sid: _source_entry(sid, h) for sid, h in prep.sources_with_ids}
+    yield "sources", {"sources": list(by_id.values()), "cached": False, "generation": prep.generation}
+
+    cites = CitationStream()
+    parts: List[str] = []
+
+    def _events(text: str, ids: List[int]):
+        if text:
+            yield "token", {"text": text}
+        known = [i for i in ids if i in by_id]
+        if known:
+            yield "citation", {"ids": known, "sources": [by_id[i] for i in known]}
+
+    # the llm span runs to the last token, so it includes time spent sending events
+    complete = True
+    with span("llm"):
+        try:
+            async for delta in stream_with_groq_async(prep.question, prep.context, mode=mode):
+                parts.append(delta)
+                for ev in _events(*cites.feed(delta)):
+                    yield ev
+        except LLMStreamError as e:
+            # the error text still reaches the client after the partial answer, as before
+            complete = False
+            parts.append(str(e))
+            for ev in _events(*cites.feed(str(e))):
+                yield ev
+    for ev in _events(*cites.flush()):
+        yield ev
 
-    used_hits: List[tuple[int, Dict[str, Any]]] = []
-    if used_ids:
-        for sid, h in sources_with_ids:
-            if sid in used_ids:
-                used_hits.append((sid, h))
-
-    # fallback: if model didn't cite, return top 3 sources
-    sources_with_ids = used_hits if used_hits else sources_with_ids[: min(3, len(sources_with_ids))]
-
-    sources = []
-    for sid, h in sources_with_ids:
-        m = h["metadata"]
-        sources.append({
-            "id": sid,
-            "file_name": m.get("file_name", "unknown"),
-            "page_label": m.get("page_label", "n/a"),
-            "section": m.get("section", "Document"),
-            "relevance": h.get("score", 0.0),
-            "channel": m.get("channel", "hybrid"),
-            "snippet": h["text"][:320],
-        })
-
-    return {"answer": answer, "sources": sources}
+    result = _finish(prep, "".join(parts).strip(), top_k, mode, complete=complete)
+    yield "done", _with_timings(result, stage_ms, t0) if timings else result
@@ -1,47 +1,295 @@
 from __future__ import annotations
 from typing import List, Dict, Any, Tuple, Optional
 import os
+import threading
+import time
 
-from src.core.config import EMBED_MODEL, TOP_K
-from src.rag.store import HybridStore
+import numpy as np
+
+from src.core.config import (
+    EMBED_DIM,
+    TOP_K,
+    RAG_EMBED_BATCH_WINDOW_MS,
+    RAG_EMBED_MAX_BATCH,
+    RAG_QUERY_CACHE_SIZE,
+    RAG_SHM_DIR,
+    RAG_VECTOR_ENABLED,
+    RAG_STORE_WATCH_S,
+)
+from src.core.metrics import CACHE_REQUESTS, REGISTRY, span
+from src.rag import generations, shm
+from src.rag.coalesce import BATCH_SIZE_BUCKETS, QUEUE_DEPTH_BUCKETS, QueryCoalescer
+from src.rag.embedder import Embedder, check_store_meta, get_embedder
+from src.rag.filters import MetadataFilter
+from src.rag.query_cache import EmbeddingLRUCache
+from src.rag.store import STORAGE_DIR, HybridStore, read_store_meta
 
 
 # singletons
-_model = None
+_model: Optional[Embedder] = None
+_coalescer: Optional[QueryCoalescer] = None
 _store: Optional[HybridStore] = None
+_store_lock = threading.Lock()
+_store_swaps = 0
+_failed_generation: Optional[str] = None
+_watcher: Optional[threading.Thread] = None
+_query_cache = EmbeddingLRUCache(RAG_QUERY_CACHE_SIZE)
+
+BM25_FALLBACKS = REGISTRY.counter(
+    "rag_bm25_fallbacks_total", "Queries answered from BM25 only because vector search failed."
+)
 
 
-def _get_model():
+def _get_model() -> Embedder:
+    """Query encoder (EMBED_BACKEND / EMBED_MODEL); must match the store's store_meta.json."""
     global _model
     if _model is None:
-        from sentence_transformers import SentenceTransformer
-        _model = SentenceTransformer(EMBED_MODEL)
+        _model = get_embedder()
     return _model
 
 
+def _get_coalescer() -> QueryCoalescer:
+    global _coalescer
+    if _coalescer is None:
+        c = QueryCoalescer(_get_model().encode, RAG_EMBED_BATCH_WINDOW_MS, RAG_EMBED_MAX_BATCH)
+        REGISTRY.histogram(
+            "rag_query_encoder_queue_depth", "Encode calls waiting when a call is enqueued.", QUEUE_DEPTH_BUCKETS
+        ).attach(c.queue_depth)
+        REGISTRY.histogram(
+            "rag_query_encoder_batch_size", "Texts per query-encoder forward pass.", BATCH_SIZE_BUCKETS
+        ).attach(c.batch_size)
+        _coalescer = c
+    return _coalescer
+
+
+def _open_store(store_dir: str, **kwargs: Any) -> HybridStore:
+    # store_meta.json records the dim; EMBED_DIM (384 = all-MiniLM-L6-v2) covers older stores
+    meta = read_store_meta(store_dir)
+    st = HybridStore(embed_dim=int(meta.get("embed_dim") or EMBED_DIM), storage_dir=store_dir, **kwargs)
+    loaded = st.load(load_vectors=RAG_VECTOR_ENABLED)
+    if not loaded:
+        raise RuntimeError(
+            "RAG store not found. Run ingestion to create storage/chunks.bin, vectors.npy, bm25.idx"
+        )
+    if RAG_VECTOR_ENABLED:
+        # fail loudly instead of ranking with vectors from a different encoder
+        check_store_meta(st.meta, _get_model())
+    return st
+
+
+def _load_store(store_dir: str, gen_id: Optional[str] = None) -> HybridStore:
+    if RAG_SHM_DIR:
+        # one tmpfs copy per node, mapped (not copied) by every worker; load inside the
+        # block so no other worker prunes the copy before it is mapped
+        with shm.staged(store_dir, RAG_SHM_DIR, gen_id or "") as staged_dir:
+            return _open_store(staged_dir, mmap=True)
+    return _open_store(store_dir)
+
+
 def _get_store() -> HybridStore:
     """
-    Loads persisted hybrid store:
-      storage/chunks.jsonl
-      storage/vectors.npy
-      storage/bm25.json
+    Loads the published hybrid store (storage/CURRENT -> storage/generations/<id>/,
+    or a flat storage/ from before generations):
+      chunks.bin (+ offsets / metadata columns)
+      vectors.npy
+      bm25.idx (or legacy bm25.json)
     """
     global _store
-    if _store is not None:
+    st = _store
+    if st is not None:
+        return st
+    with _store_lock:
+        if _store is None:
+            _store = _load_store(*generations.resolve(STORAGE_DIR))
         return _store
 
-    # Default embed dim for all-MiniLM-L6-v2 is 384.
-    # If you switch embedding model later, update this or compute it dynamically.
-    embed_dim = int(os.getenv("EMBED_DIM", "384"))
-    st = HybridStore(embed_dim=embed_dim)
-    vector_enabled = os.getenv("RAG_VECTOR_ENABLED", "1").lower() in {"1", "true", "yes"}
-    loaded = st.load(load_vectors=vector_enabled)
-    if not loaded:
-        raise RuntimeError(
-            "RAG store not found. Run ingestion to create storage/chunks.jsonl, vectors.npy, bm25.json"
-        )
-    _store = st
-    return st
+
+def get_store() -> HybridStore:
+    return _get_store()
+
+
+def store_generation() -> str:
+    return _get_store().generation
+
+
+def refresh_store() -> bool:
+    """
+    Swaps in the published generation if it differs from the live one.
+    The new store is loaded and warmed before the swap; queries already running keep
+    their reference to the old store, which is released when the last one finishes.
+    """
+    global _store, _store_swaps, _failed_generation
+    store_dir, gen_id = generations.resolve(STORAGE_DIR)
+    current = _store
+    if current is None or gen_id is None or gen_id in {current.generation, _failed_generation}:
+        return False
+
+    t0 = time.perf_counter()
+    try:
+        new = _load_store(store_dir, gen_id)
+        new.search_bm25("warm up", top_k=1)
+        if new.vectors is not None:
+            new.search_vector(embed_query("warm up"), top_k=1)
+    except Exception as e:
+        _failed_generation = gen_id  # don't retry a broken generation every poll
+        print(f"[store] failed to load generation {gen_id}: {e}", flush=True)
+        return False
+
+    with _store_lock:
+        old, _store = _store, new
+        _store_swaps += 1
+    print(
+        f"[store] swapped generation {old.generation} -> {new.generation} "
+        f"({len(new.chunks)} chunks) in {time.perf_counter() - t0:.2f}s",
+        flush=True,
+    )
+    return True
+
+
+def _watch_store(interval_s: float) -> None:
+    while True:
+        time.sleep(interval_s)
+        try:
+            refresh_store()
+        except Exception as e:
+            print(f"[store] watcher error: {e}", flush=True)
+
+
+def start_store_watcher(interval_s: float = RAG_STORE_WATCH_S) -> Optional[threading.Thread]:
+    global _watcher
+    if interval_s <= 0:
+        return None
+    if _watcher is None or not _watcher.is_alive():
+        _watcher = threading.Thread(target=_watch_store, args=(interval_s,), name="rag-store-watcher", daemon=True)
+        _watcher.start()
+    return _watcher
+
+
+def store_info() -> Dict[str, Any]:
+    st = _store
+    return {
+        "generation": st.generation if st is not None else None,
+        "chunks": len(st.chunks) if st is not None else None,
+        "swaps": _store_swaps,
+    }
+
+
+def embed_queries(questions: List[str]) -> np.ndarray:
+    """
+    (Q, D) normalized query embeddings. Cached questions skip the encoder;
+    the misses are encoded together in one forward pass.
+    """
+    with span("embed"):
+        return _embed_queries(questions)
+
+
+def _embed_queries(questions: List[str]) -> np.ndarray:
+    model = _get_model()
+    keys = [EmbeddingLRUCache.key(model.identity, q) for q in questions]
+    vecs: List[Optional[np.ndarray]] = [_query_cache.get(k) for k in keys]
+
+    miss: Dict[Tuple[str, str], List[int]] = {}
+    for i, v in enumerate(vecs):
+        if v is None:
+            miss.setdefault(keys[i], []).append(i)
+    CACHE_REQUESTS.labels(cache="query_embedding", result="hit").inc(len(questions) - sum(map(len, miss.values())))
+    CACHE_REQUESTS.labels(cache="query_embedding", result="miss").inc(sum(map(len, miss.values())))
+    if miss:
+        # encode the normalized text, i.e. exactly what the cache key describes;
+        # concurrent callers share a forward pass through the coalescer
+        encoded = _get_coalescer().encode([k[1] for k in miss])
+        for (key, idxs), v in zip(miss.items(), encoded):
+            _query_cache.put(key, v)
+            for i in idxs:
+                vecs[i] = v
+    return np.asarray(vecs, dtype=np.float32)
+
+
+def embed_query(question: str) -> np.ndarray:
+    return embed_queries([question])[0]
+
+
+def query_cache_stats() -> Dict[str, int]:
+    return _query_cache.stats()
+
+
+def clear_query_cache() -> None:
+    """Drops cached query vectors, so the next queries pay for encoding (benchmarks, evals)."""
+    _query_cache.clear()
+
+
+def coalescer_stats() -> Dict[str, Any]:
+    """Queue-depth / batch-size histograms of the query encoder (empty before first use)."""
+    return _coalescer.stats() if _coalescer is not None else {}
+
+
+class Hit:
+    """
+    One retrieval result. Built only for the hits retrieve() returns; reads like the
+    dicts it replaced (hit["text"], hit["score"], hit["metadata"], hit.get(...)).
+    metadata is the chunk's metadata plus doc_id / vec_sim / channel debug fields.
+    """
+
+    __slots__ = ("doc_id", "score", "text", "vec_sim", "channel", "_chunk_meta")
+
+    def __init__(self, doc_id: int, score: float, text: str, chunk_meta: Dict[str, Any], vec_sim: float, channel: str):
+        self.doc_id = doc_id
+        self.score = score
+        self.text = text
+        self.vec_sim = vec_sim
+        self.channel = channel
+        self._chunk_meta = chunk_meta
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return {**self._chunk_meta, "doc_id": self.doc_id, "vec_sim": self.vec_sim, "channel": self.channel}
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ("score", "text", "metadata"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self) -> Tuple[str, ...]:
+        return ("score", "text", "metadata")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"score": self.score, "text": self.text, "metadata": self.metadata}
+
+    def __repr__(self) -> str:
+        return f"Hit(doc_id={self.doc_id}, score={self.score:.6f}, channel={self.channel!r})"
+
+
+_EMPTY_IDS = np.empty(0, dtype=np.int64)
+
+
+def _ranked_arrays(hits: List[Tuple[int, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    """[(doc_id, score), ...] -> (int64 ids, float64 scores) in rank order."""
+    if not hits:
+        return _EMPTY_IDS, np.empty(0, dtype=np.float64)
+    ids, scores = zip(*hits)
+    return np.asarray(ids, dtype=np.int64), np.asarray(scores, dtype=np.float64)
+
+
+def _rrf_fuse_arrays(vec_ids: np.ndarray, bm25_ids: np.ndarray, k: int = 60) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reciprocal Rank Fusion (RRF) over doc ids -> (ids, scores), best first.
+    Robust because it doesn't require score calibration between BM25 and cosine similarity.
+    Ties keep first appearance (vector list before BM25 list).
+    """
+    ids = np.concatenate([vec_ids, bm25_ids])
+    if ids.size == 0:
+        return _EMPTY_IDS, np.empty(0, dtype=np.float64)
+    ranks = np.concatenate([np.arange(len(vec_ids)), np.arange(len(bm25_ids))])
+    uniq, first_seen, inv = np.unique(ids, return_index=True, return_inverse=True)
+    scores = np.bincount(inv, weights=1.0 / (k + ranks + 1.0), minlength=len(uniq))
+    order = np.lexsort((first_seen, -scores))
+    return uniq[order], scores[order]
 
 
 def _rrf_fuse(
@@ -49,111 +297,194 @@ def _rrf_fuse(
     bm25_ranked: List[int],
     k: int = 60,
 ) -> List[Tuple[int, float]]:
+    """_rrf_fuse_arrays over id lists, as [(doc_id, score), ...]."""
+    ids, scores = _rrf_fuse_arrays(
+        np.asarray(vec_ranked, dtype=np.int64), np.asarray(bm25_ranked, dtype=np.int64), k=k
+    )
+    return list(zip(ids.tolist(), scores.tolist()))
+
+
+def _rrf_fuse_batch(
+    vec_ranked: List[np.ndarray],
+    bm25_ranked: List[np.ndarray],
+    k: int = 60,
+) -> List[Tuple[np.ndarray, np.ndarray]]:
     """
-    Reciprocal Rank Fusion (RRF) over doc ids.
-    Robust because it doesn't require score calibration between BM25 and cosine similarity.
+    _rrf_fuse_arrays for a batch of queries in one pass: every (query, doc, rank) of both
+    channels is flattened, summed per (query, doc) and sorted per query.
+    """
+    n_q = len(vec_ranked)
+    qids, docs, ranks = [], [], []
+    for lists in (vec_ranked, bm25_ranked):
+        for qi, ranked in enumerate(lists):
+            qids.append(np.full(len(ranked), qi, dtype=np.int64))
+            docs.append(np.asarray(ranked, dtype=np.int64))
+            ranks.append(np.arange(len(ranked), dtype=np.float64))
+
+    q = np.concatenate(qids) if qids else np.empty(0, dtype=np.int64)
+    if q.size == 0:
+        return [(_EMPTY_IDS, np.empty(0, dtype=np.float64)) for _ in range(n_q)]
+    d = np.concatenate(docs)
+    r = np.concatenate(ranks)
+
+    n = int(d.max()) + 1
+    keys, inv = np.unique(q * n + d, return_inverse=True)
+    scores = np.bincount(inv, weights=1.0 / (k + r + 1), minlength=len(keys))
+    first_seen = np.full(len(keys), q.size, dtype=np.int64)
+    np.minimum.at(first_seen, inv, np.arange(q.size))
+
+    kq, kd = keys // n, keys % n
+    order = np.lexsort((first_seen, -scores, kq))
+    kq, kd, scores = kq[order], kd[order], scores[order]
+    bounds = np.searchsorted(kq, np.arange(n_q + 1))
+    return [(kd[bounds[i]:bounds[i + 1]], scores[bounds[i]:bounds[i + 1]]) for i in range(n_q)]
+
+
+def _select_hits(
+    store: HybridStore,
+    ids: np.ndarray,
+    scores: np.ndarray,
+    vec_ids: np.ndarray,
+    vec_sims: np.ndarray,
+    bm25_ids: np.ndarray,
+    top_k: int,
+) -> List[Hit]:
+    """
+    ids / scores: fused candidates, best first. Applies RAG_MIN_SCORE, keeps the best
+    candidate per (file_name, page_label) via the store's precomputed group ids, takes
+    the top_k and only then touches chunk text / metadata.
     """
-    scores: Dict[int, float] = {}
+    # Optional score thresholding
+    min_score = float(os.getenv("RAG_MIN_SCORE", "0") or "0")
+    if min_score > 0:
+        keep = scores >= min_score
+        ids, scores = ids[keep], scores[keep]
+
+    # Dedupe: candidates are sorted best first, so a group's first row is its best
+    _, first = np.unique(store.page_groups()[ids], return_index=True)
+    top = np.sort(first)[:top_k]
+    ids, scores = ids[top], scores[top]
 
-    for rank, doc_id in enumerate(vec_ranked):
-        scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    # vector similarity + channel per selected id
+    order = np.argsort(vec_ids, kind="stable")
+    pos = np.searchsorted(vec_ids, ids, sorter=order)
+    pos = order[np.minimum(pos, max(len(vec_ids) - 1, 0))] if len(vec_ids) else pos
+    in_vec = (vec_ids[pos] == ids) if len(vec_ids) else np.zeros(len(ids), dtype=bool)
+    in_bm25 = np.isin(ids, bm25_ids)
 
-    for rank, doc_id in enumerate(bm25_ranked):
-        scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    hits: List[Hit] = []
+    for doc_id, score, v, b, p in zip(ids.tolist(), scores.tolist(), in_vec.tolist(), in_bm25.tolist(), pos.tolist()):
+        ch = store.chunks[doc_id]
+        channel = "hybrid" if (v and b) else ("vector" if v else "keyword")
+        hits.append(Hit(doc_id, float(score), ch.text, ch.metadata, float(vec_sims[p]) if v else 0.0, channel))
+    return hits
 
-    fused = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-    return fused
 
+def _filter_rows(store: HybridStore, filters: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+    if filters is None:
+        return None
+    with span("filter"):
+        return store.filter_rows(filters)
 
-def retrieve(question: str, top_k: int = TOP_K) -> List[Dict[str, Any]]:
+
+def retrieve(
+    question: str,
+    top_k: int = TOP_K,
+    store: Optional[HybridStore] = None,
+    filters: Optional[MetadataFilter] = None,
+) -> List[Hit]:
     """
     Hybrid retrieval:
       - Vector search (cosine)
       - BM25 keyword search
-      - RRF fusion
+      - RRF fusion, then one dedupe by (file, page) + top_k over all fused candidates
     Fallback:
       - If embedding fails, return BM25 only
+    Pass `store` to pin a generation across several calls. `filters` restrict both
+    channels to the matching chunks before scoring; the result equals filtering an
+    exhaustive (unlimited cand_k) unfiltered ranking.
     """
-    store = _get_store()
+    if store is None:
+        store = _get_store()
+
+    rows = _filter_rows(store, filters)
+    if rows is not None and rows.size == 0:
+        return []
 
     # Pull more candidates than final top_k for better fusion
     cand_k = max(top_k * 4, 12)
 
     # BM25 always available
-    bm25_hits = store.search_bm25(question, top_k=cand_k)
-    bm25_ranked_ids = [doc_id for doc_id, _ in bm25_hits]
+    with span("bm25"):
+        bm25_ids, _ = _ranked_arrays(store.search_bm25(question, top_k=cand_k, rows=rows))
 
     # Vector retrieval (may fail). Allow disabling for low-memory deployments.
-    vec_ranked_ids: List[int] = []
-    vec_scores_by_id: Dict[int, float] = {}
+    vec_ids, vec_sims = _EMPTY_IDS, np.empty(0, dtype=np.float64)
 
-    vector_enabled = os.getenv("RAG_VECTOR_ENABLED", "1").lower() in {"1", "true", "yes"}
-    if vector_enabled:
-        model = _get_model()
+    if RAG_VECTOR_ENABLED:
         try:
-            q_vec = model.encode([question], normalize_embeddings=True)[0].tolist()
-            vec_hits = store.search_vector(q_vec, top_k=cand_k)
-            vec_ranked_ids = [doc_id for doc_id, _ in vec_hits]
-            vec_scores_by_id = {doc_id: float(score) for doc_id, score in vec_hits}
+            q_vec = embed_query(question)
+            with span("vector"):
+                vec_ids, vec_sims = _ranked_arrays(store.search_vector(q_vec, top_k=cand_k, rows=rows))
         except Exception:
             # fallback = BM25-only
-            vec_ranked_ids = []
+            vec_ids, vec_sims = _EMPTY_IDS, np.empty(0, dtype=np.float64)
+            BM25_FALLBACKS.inc()
 
     # Fuse
-    if vec_ranked_ids:
-        fused = _rrf_fuse(vec_ranked_ids, bm25_ranked_ids, k=60)
-        fused_ids = [doc_id for doc_id, _ in fused[:top_k]]
-        fused_rrf_score = {doc_id: float(score) for doc_id, score in fused}
-    else:
-        # BM25-only fallback
-        fused_ids = bm25_ranked_ids[:top_k]
-        fused_rrf_score = {doc_id: 0.0 for doc_id in fused_ids}
-
-    # Build final hits
-    hits: List[Dict[str, Any]] = []
-    for doc_id in fused_ids:
-        ch = store.chunks[int(doc_id)]
-        m = ch.metadata
-        in_vec = int(doc_id) in vec_scores_by_id
-        in_bm25 = int(doc_id) in bm25_ranked_ids
-        if in_vec and in_bm25:
-            channel = "hybrid"
-        elif in_vec:
-            channel = "vector"
+    with span("fusion"):
+        if len(vec_ids):
+            ids, scores = _rrf_fuse_arrays(vec_ids, bm25_ids, k=60)
         else:
-            channel = "keyword"
-
-        hits.append(
-            {
-                "score": float(fused_rrf_score.get(int(doc_id), 0.0)),
-                "text": ch.text,
-                "metadata": {
-                    **m,
-                    # helpful debug fields:
-                    "doc_id": int(doc_id),
-                    "vec_sim": float(vec_scores_by_id.get(int(doc_id), 0.0)),
-                    "channel": channel,
-                },
-            }
-        )
+            # BM25-only fallback
+            ids, scores = bm25_ids, np.zeros(len(bm25_ids))
+        return _select_hits(store, ids, scores, vec_ids, vec_sims, bm25_ids, top_k)
 
-    # Optional score thresholding
-    min_score = float(os.getenv("RAG_MIN_SCORE", "0") or "0")
-    if min_score > 0:
-        hits = [h for h in hits if h.get("score", 0.0) >= min_score]
-
-    # Dedupe by (file_name, page_label) keeping best score
-    deduped: Dict[tuple[str, str], Dict[str, Any]] = {}
-    for h in hits:
-        m = h.get("metadata", {}) or {}
-        key = (str(m.get("file_name", "unknown")), str(m.get("page_label", "n/a")))
-        if key not in deduped or h.get("score", 0.0) > deduped[key].get("score", 0.0):
-            deduped[key] = h
-    hits = list(deduped.values())
-
-    # Keep deterministic order by score desc
-    hits = sorted(hits, key=lambda x: x.get("score", 0.0), reverse=True)[:top_k]
-    return hits
+
+def retrieve_many(
+    questions: List[str],
+    top_k: int = TOP_K,
+    filters: Optional[MetadataFilter] = None,
+) -> List[List[Hit]]:
+    """
+    retrieve() for a batch of questions: one encode call, one BM25 pass, one
+    matrix-matrix vector search and one RRF fusion for the whole batch.
+    Results match calling retrieve() per question (with the same filters).
+    """
+    if not questions:
+        return []
+    store = _get_store()
+    rows = _filter_rows(store, filters)
+    if rows is not None and rows.size == 0:
+        return [[] for _ in questions]
+    cand_k = max(top_k * 4, 12)
+
+    with span("bm25"):
+        bm25 = [_ranked_arrays(hits)[0] for hits in store.search_bm25_batch(questions, top_k=cand_k, rows=rows)]
+
+    vec = [(_EMPTY_IDS, np.empty(0, dtype=np.float64)) for _ in questions]
+    if RAG_VECTOR_ENABLED:
+        try:
+            q_vecs = embed_queries(questions)
+            with span("vector"):
+                vec = [_ranked_arrays(hits) for hits in store.search_vector_batch(q_vecs, top_k=cand_k, rows=rows)]
+        except Exception:
+            # fallback = BM25-only for the whole batch
+            vec = [(_EMPTY_IDS, np.empty(0, dtype=np.float64)) for _ in questions]
+            BM25_FALLBACKS.inc(len(questions))
+
+    with span("fusion"):
+        fused_all = _rrf_fuse_batch([v[0] for v in vec], bm25, k=60)
+
+        out: List[List[Hit]] = []
+        for qi in range(len(questions)):
+            vec_ids, vec_sims = vec[qi]
+            if len(vec_ids):
+                ids, scores = fused_all[qi]
+            else:
+                ids, scores = bm25[qi], np.zeros(len(bm25[qi]))
+            out.append(_select_hits(store, ids, scores, vec_ids, vec_sims, bm25[qi], top_k))
+        return out
 
 
 def make_context_pack(
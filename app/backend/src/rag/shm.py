@@ -0,0 +1,122 @@
+# src/rag/shm.py
+from __future__ import annotations
+import hashlib
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Iterator, List
+
+# not part of the searchable store
+_SKIP_FILES = {"manifest.json"}
+
+
+def store_files(store_dir: str) -> List[str]:
+    return sorted(
+        f
+        for f in os.listdir(store_dir)
+        if os.path.isfile(os.path.join(store_dir, f)) and f not in _SKIP_FILES and not f.endswith(".tmp")
+    )
+
+
+def store_key(store_dir: str, generation: str = "") -> str:
+    """Generation id when there is one, else a fingerprint of the files (flat stores)."""
+    if generation:
+        return generation
+    h = hashlib.sha1()
+    for f in store_files(store_dir):
+        st = os.stat(os.path.join(store_dir, f))
+        h.update(f"{f}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return "flat-" + h.hexdigest()[:12]
+
+
+# only directories named <STAGE_PREFIX><source hash>-<key> are ever removed
+STAGE_PREFIX = "rag-store-"
+
+
+def _namespace(store_dir: str, generation: str) -> str:
+    """Staging prefix for one storage root, so deployments sharing shm_root keep apart."""
+    src = os.path.abspath(store_dir)
+    if generation:
+        src = os.path.dirname(os.path.dirname(src))  # <root>/generations/<id> -> <root>
+    return f"{STAGE_PREFIX}{hashlib.sha1(src.encode('utf-8')).hexdigest()[:8]}-"
+
+
+@contextmanager
+def _node_lock(shm_root: str, name: str, mode: str = "ex") -> Iterator[bool]:
+    """
+    flock on shm_root/<name>: "ex" / "sh" block, "try" is a non-blocking exclusive
+    lock; yields whether it was taken. Without fcntl (non-POSIX) nothing is locked.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield mode != "try"  # racing copies still end in one rename winner; never prune
+        return
+    flags = {"ex": fcntl.LOCK_EX, "sh": fcntl.LOCK_SH, "try": fcntl.LOCK_EX | fcntl.LOCK_NB}[mode]
+    with open(os.path.join(shm_root, name), "a") as f:
+        try:
+            fcntl.flock(f, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _copy(store_dir: str, dest: str) -> None:
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for f in store_files(store_dir):
+        shutil.copyfile(os.path.join(store_dir, f), os.path.join(tmp, f))
+    try:
+        os.rename(tmp, dest)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)  # lost a lock-free race; use the winner
+
+
+def _prune(shm_root: str, prefix: str, dest: str) -> List[str]:
+    """Removes staged stores (and dead .tmp copies) under `prefix` older than dest."""
+    newest = os.stat(dest).st_mtime_ns
+    doomed = []
+    for d in os.listdir(shm_root):
+        path = os.path.join(shm_root, d)
+        if path == dest or not d.startswith(prefix) or not os.path.isdir(path):
+            continue
+        if os.stat(path).st_mtime_ns < newest:
+            shutil.rmtree(path, ignore_errors=True)
+            doomed.append(d)
+    return doomed
+
+
+@contextmanager
+def staged(store_dir: str, shm_root: str, generation: str = "") -> Iterator[str]:
+    """
+    Copies the store files into shm_root/rag-store-<root hash>-<key>/ (a tmpfs such as
+    /dev/shm) unless a previous worker already did, and yields that directory. Loading
+    the store from there with mmap makes every worker on the node share one physical,
+    never-evicted copy of the vectors, BM25 postings and chunk text.
+
+    Load inside the with block: until it exits the worker holds a shared lock that
+    keeps other workers from pruning the directory before it is mapped. On exit,
+    staged copies of the same storage root older than this one are removed if no
+    worker is loading; workers still mapping them keep valid mappings until they swap.
+    Nothing else in shm_root is touched.
+    """
+    os.makedirs(shm_root, exist_ok=True)
+    key = store_key(store_dir, generation)
+    prefix = _namespace(store_dir, generation)
+    dest = os.path.join(shm_root, prefix + key)
+    with _node_lock(shm_root, ".lock", "sh"):
+        # one worker copies, the others wait and then map the same files
+        with _node_lock(shm_root, ".copy.lock", "ex"):
+            if not os.path.isdir(dest):
+                _copy(store_dir, dest)
+                print(f"[shm] staged store {key} in {dest}", flush=True)
+        yield dest
+
+    with _node_lock(shm_root, ".lock", "try") as exclusive:
+        if exclusive and os.path.isdir(dest):
+            _prune(shm_root, prefix, dest)
@@ -1,21 +1,111 @@
 from __future__ import annotations
+import hashlib
 import json
 import os
-from dataclasses import dataclass
-from typing import List, Dict, Any, Tuple, Optional
+import uuid
+from typing import List, Dict, Any, Tuple, Optional, Sequence
 
 import numpy as np
-from rank_bm25 import BM25Okapi
+
+from src.core.config import (
+    RAG_VECTOR_DTYPE,
+    RAG_VECTOR_MMAP,
+    RAG_RESCORE_FACTOR,
+    RAG_VECTOR_INDEX,
+    RAG_IVF_NLIST,
+    RAG_IVF_NPROBE,
+)
+from src.rag import chunk_store
+from src.rag.ann import IVFIndex
+from src.rag.bm25_index import InvertedIndex, InvertedIndexBuilder
+from src.rag.chunk_store import ChunkStore, ChunkStoreWriter, StoredChunk
+from src.rag.filters import MetadataFilter
+from src.rag import quantize
 
 STORAGE_DIR = os.getenv("RAG_STORAGE_DIR", "storage")
 
 CHUNKS_PATH = os.path.join(STORAGE_DIR, "chunks.jsonl")
 VECTORS_PATH = os.path.join(STORAGE_DIR, "vectors.npy")
+BM25_INDEX_PATH = os.path.join(STORAGE_DIR, "bm25.idx")
+# legacy: raw token lists, only read when bm25.idx is missing
 BM25_PATH = os.path.join(STORAGE_DIR, "bm25.json")
+# which encoder produced vectors.npy (backend, model, dim)
+STORE_META_FILE = "store_meta.json"
+# resolved metadata filters kept per store (row id arrays); cleared when full
+FILTER_CACHE_SIZE = 256
+
+
+def read_store_meta(storage_dir: str = STORAGE_DIR) -> Dict[str, Any]:
+    path = os.path.join(storage_dir, STORE_META_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_store_meta(storage_dir: str, meta: Dict[str, Any]) -> None:
+    path = os.path.join(storage_dir, STORE_META_FILE)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def ensure_storage_dir(storage_dir: str = STORAGE_DIR):
+    os.makedirs(storage_dir, exist_ok=True)
+
 
+def _save_npy_atomic(path: str, arr: np.ndarray) -> None:
+    # write + rename: readers that still mmap the old file keep a valid mapping
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
 
-def ensure_storage_dir():
-    os.makedirs(STORAGE_DIR, exist_ok=True)
+
+def _save_quantized_atomic(X: np.ndarray, dtype: str, q_path: str, scale_path: str, publish: bool = True) -> None:
+    """Quantizes X block by block straight into memory-mapped sidecar files (left as .tmp unless publish)."""
+    Q = np.lib.format.open_memmap(q_path + ".tmp", mode="w+", dtype=dtype, shape=X.shape)
+    S = None
+    if dtype == "int8":
+        S = np.lib.format.open_memmap(scale_path + ".tmp", mode="w+", dtype=np.float32, shape=(X.shape[0],))
+    for s in range(0, X.shape[0], quantize.SCORE_BLOCK_ROWS):
+        q, sc = quantize.quantize(np.asarray(X[s:s + quantize.SCORE_BLOCK_ROWS]), dtype)
+        Q[s:s + len(q)] = q
+        if S is not None:
+            S[s:s + len(q)] = sc
+    Q.flush()
+    del Q
+    if S is not None:
+        S.flush()
+        del S
+    if publish:
+        os.replace(q_path + ".tmp", q_path)
+        if dtype == "int8":
+            os.replace(scale_path + ".tmp", scale_path)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, without sorting all of them."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.shape[0])
+    # ties go to the lower index so results are deterministic
+    return idx[np.lexsort((idx, -scores[idx]))]
+
+
+def _intersect_sorted(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersection of two sorted unique id arrays, searching the shorter in the longer."""
+    if len(a) > len(b):
+        a, b = b, a
+    if len(a) == 0:
+        return np.empty(0, dtype=np.int64)
+    pos = np.minimum(np.searchsorted(b, a), len(b) - 1)
+    return np.asarray(a[b[pos] == a], dtype=np.int64)
 
 
 def simple_tokenize(text: str) -> List[str]:
@@ -23,107 +113,443 @@ def simple_tokenize(text: str) -> List[str]:
     return re.findall(r"[a-z0-9]+", (text or "").lower())
 
 
-@dataclass
-class StoredChunk:
-    text: str
-    metadata: Dict[str, Any]
+def _top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row-wise _top_k for a (Q, N) score matrix -> (Q, k) column indices, best first."""
+    k = min(k, scores.shape[1])
+    if k <= 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    order = np.lexsort((idx, -np.take_along_axis(scores, idx, axis=1)), axis=1)
+    return np.take_along_axis(idx, order, axis=1)
 
 
 class HybridStore:
     """
     Persisted:
-      - chunks.jsonl (text + metadata)
+      - chunks.bin + chunks.offsets.npy + chunks.meta.{npy,json} (ChunkStore: text is
+        memory-mapped and materialized per id; older stores' chunks.jsonl is still read)
       - vectors.npy  (float32 normalized embeddings)
-      - bm25.json    (tokenized corpus)
+      - vectors.<dtype>.npy (+ .scale.npy for int8) when vector_dtype is quantized
+      - vectors.ivf.npz (IVF centroids + lists) when vector_index is "ivf"
+      - bm25.idx     (inverted index, memory-mapped on load)
+      - store_meta.json (`meta`: the embedder backend / model / dim behind the vectors)
+
+    With mmap=True the matrices are memory-mapped read-only instead of copied into
+    the process, and with a quantized vector_dtype search_vector scores the compact
+    matrix and only re-scores a short list against the float32 rows.
+    With vector_index="ivf" only the rows in the nprobe nearest IVF lists are scored;
+    search_vector(..., exact=True) always scans everything.
     """
 
-    def __init__(self, embed_dim: int):
+    def __init__(
+        self,
+        embed_dim: int,
+        storage_dir: str = STORAGE_DIR,
+        vector_dtype: str = RAG_VECTOR_DTYPE,
+        mmap: bool = RAG_VECTOR_MMAP,
+        rescore_factor: int = RAG_RESCORE_FACTOR,
+        vector_index: str = RAG_VECTOR_INDEX,
+        ivf_nlist: int = RAG_IVF_NLIST,
+        nprobe: int = RAG_IVF_NPROBE,
+    ):
+        if vector_dtype not in quantize.VECTOR_DTYPES:
+            raise ValueError(f"Unknown vector dtype {vector_dtype!r}. Use one of {quantize.VECTOR_DTYPES}")
+        if vector_index not in {"exact", "ivf"}:
+            raise ValueError(f"Unknown vector index {vector_index!r}. Use 'exact' or 'ivf'")
         self.embed_dim = embed_dim
-        self.chunks: List[StoredChunk] = []
+        self.storage_dir = storage_dir
+        self.vector_dtype = vector_dtype
+        self.mmap = mmap
+        self.rescore_factor = max(1, rescore_factor)
+        self.vector_index = vector_index
+        self.ivf_nlist = ivf_nlist
+        self.nprobe = nprobe
+
+        self.chunks_path = os.path.join(storage_dir, "chunks.jsonl")
+        self.vectors_path = os.path.join(storage_dir, "vectors.npy")
+        self.bm25_index_path = os.path.join(storage_dir, "bm25.idx")
+        self.bm25_path = os.path.join(storage_dir, "bm25.json")
+        self.ivf_path = os.path.join(storage_dir, "vectors.ivf.npz")
+
+        self.chunks: Sequence[StoredChunk] = []  # ChunkStore once built or loaded
         self.vectors: Optional[np.ndarray] = None  # (N, D) float32 normalized
-        self.bm25: Optional[BM25Okapi] = None
-        self._bm25_tokens: List[List[str]] = []
+        self.qvectors: Optional[np.ndarray] = None  # (N, D) float16/int8, None for float32
+        self.qscales: Optional[np.ndarray] = None  # (N,) int8 per-vector scales
+        self._rescore_rows: Optional[quantize.RowReader] = None
+        self.ann: Optional[IVFIndex] = None
+        self.bm25: Optional[InvertedIndex] = None
+        # identifies the indexed content; caches keyed on it go stale when it changes
+        self.generation: str = ""
+        self.meta: Dict[str, Any] = {}
+        self._page_groups: Optional[np.ndarray] = None
+        self._filter_rows: Dict[MetadataFilter, np.ndarray] = {}
+
+    def with_storage_dir(self, storage_dir: str) -> "HybridStore":
+        """Same configuration, different directory (e.g. another store generation)."""
+        return HybridStore(
+            embed_dim=self.embed_dim,
+            storage_dir=storage_dir,
+            vector_dtype=self.vector_dtype,
+            mmap=self.mmap,
+            rescore_factor=self.rescore_factor,
+            vector_index=self.vector_index,
+            ivf_nlist=self.ivf_nlist,
+            nprobe=self.nprobe,
+        )
+
+    def _qvectors_path(self) -> str:
+        return os.path.join(self.storage_dir, f"vectors.{self.vector_dtype}.npy")
+
+    def _qscales_path(self) -> str:
+        return os.path.join(self.storage_dir, f"vectors.{self.vector_dtype}.scale.npy")
 
     def is_built(self) -> bool:
         return (len(self.chunks) > 0) and (self.bm25 is not None)
 
+    def _fingerprint(self) -> str:
+        h = hashlib.sha1()
+        paths = [os.path.join(self.storage_dir, f) for f in chunk_store.FILES]
+        for p in paths + [self.chunks_path, self.vectors_path, self.bm25_index_path, self.bm25_path]:
+            if os.path.exists(p):
+                st = os.stat(p)
+                h.update(f"{os.path.basename(p)}:{st.st_size}:{st.st_mtime_ns};".encode())
+        return h.hexdigest()[:12]
+
     def load(self, load_vectors: bool = True) -> bool:
-        if not (os.path.exists(CHUNKS_PATH) and os.path.exists(BM25_PATH)):
+        has_bm25 = os.path.exists(self.bm25_index_path) or os.path.exists(self.bm25_path)
+        has_chunks = chunk_store.exists(self.storage_dir) or os.path.exists(self.chunks_path)
+        if not (has_chunks and has_bm25):
             return False
-        if load_vectors and not os.path.exists(VECTORS_PATH):
+        if load_vectors and not os.path.exists(self.vectors_path):
             return False
 
+        self.meta = read_store_meta(self.storage_dir)
+
         # chunks
-        self.chunks = []
-        with open(CHUNKS_PATH, "r", encoding="utf-8") as f:
-            for line in f:
-                obj = json.loads(line)
-                self.chunks.append(StoredChunk(text=obj["text"], metadata=obj["metadata"]))
+        self.chunks = self.load_chunks()
+        self._page_groups = None
+        self._filter_rows = {}
 
         # vectors (optional)
         if load_vectors:
-            self.vectors = np.load(VECTORS_PATH).astype("float32")
-            if self.vectors.ndim != 2 or self.vectors.shape[1] != self.embed_dim:
-                raise RuntimeError(f"vectors.npy shape mismatch. got {self.vectors.shape}, expected (*, {self.embed_dim})")
+            self.load_vectors()
+            if self.vectors.shape[0] != len(self.chunks):
+                raise RuntimeError(f"vectors.npy has {self.vectors.shape[0]} rows, expected {len(self.chunks)}")
         else:
-            self.vectors = None
+            self.vectors = self.qvectors = self.qscales = self.ann = None
 
         # bm25
-        with open(BM25_PATH, "r", encoding="utf-8") as f:
-            bm = json.load(f)
-        self._bm25_tokens = bm["tokens"]
-        self.bm25 = BM25Okapi(self._bm25_tokens)
+        if os.path.exists(self.bm25_index_path):
+            self.bm25 = InvertedIndex.load(self.bm25_index_path)
+        else:
+            # older ingests only persisted tokens; index them in memory until the next ingest
+            with open(self.bm25_path, "r", encoding="utf-8") as f:
+                bm = json.load(f)
+            self.bm25 = InvertedIndex.build(bm["tokens"])
+        if len(self.bm25) != len(self.chunks):
+            raise RuntimeError(f"BM25 index size mismatch. got {len(self.bm25)}, expected {len(self.chunks)}")
 
+        # published generations carry their id; flat stores fall back to file stats
+        self.generation = self.meta.get("generation") or self._fingerprint()
         return True
 
+    def load_chunks(self) -> Sequence[StoredChunk]:
+        if chunk_store.exists(self.storage_dir):
+            return ChunkStore.load(self.storage_dir)
+        # older ingests wrote chunks.jsonl; interned in memory until the next ingest
+        with open(self.chunks_path, "r", encoding="utf-8") as f:
+            return ChunkStore.from_chunks(
+                StoredChunk(text=obj["text"], metadata=obj["metadata"]) for obj in map(json.loads, f)
+            )
+
+    def load_vectors(self) -> None:
+        if self.mmap:
+            self.vectors = np.load(self.vectors_path, mmap_mode="r")
+        else:
+            self.vectors = np.load(self.vectors_path).astype("float32")
+        if self.vectors.ndim != 2 or self.vectors.shape[1] != self.embed_dim:
+            raise RuntimeError(f"vectors.npy shape mismatch. got {self.vectors.shape}, expected (*, {self.embed_dim})")
+        if self.vectors.dtype != np.float32:
+            self.vectors = self.vectors.astype("float32")
+
+        self.ann = None
+        if self.vector_index == "ivf":
+            if os.path.exists(self.ivf_path):
+                self.ann = IVFIndex.load(self.ivf_path, mmap=self.mmap)
+            else:
+                print(f"[store] {self.ivf_path} missing, falling back to exact vector search", flush=True)
+
+        self.qvectors = self.qscales = self._rescore_rows = None
+        if self.vector_dtype == "float32":
+            return
+        if self.mmap:
+            self._rescore_rows = quantize.RowReader(self.vectors_path)
+
+        mmap_mode = "r" if self.mmap else None
+        if os.path.exists(self._qvectors_path()):
+            self.qvectors = np.load(self._qvectors_path(), mmap_mode=mmap_mode)
+            if self.vector_dtype == "int8":
+                self.qscales = np.load(self._qscales_path(), mmap_mode=mmap_mode)
+        else:
+            # store was ingested as float32; quantize in memory until the next ingest
+            print(f"[store] {self._qvectors_path()} missing, quantizing in memory", flush=True)
+            self.qvectors, self.qscales = quantize.quantize(self.vectors, self.vector_dtype)
+        if self.qvectors.shape != self.vectors.shape:
+            raise RuntimeError(f"{self._qvectors_path()} shape mismatch. got {self.qvectors.shape}, expected {self.vectors.shape}")
+
     def save(self) -> None:
-        ensure_storage_dir()
+        ensure_storage_dir(self.storage_dir)
 
-        with open(CHUNKS_PATH, "w", encoding="utf-8") as f:
-            for ch in self.chunks:
-                f.write(json.dumps({"text": ch.text, "metadata": ch.metadata}, ensure_ascii=False) + "\n")
+        ChunkStore.write(self.storage_dir, self.chunks)
 
         if self.vectors is None:
             raise RuntimeError("vectors missing")
-        np.save(VECTORS_PATH, self.vectors.astype("float32"))
+        X = np.asarray(self.vectors, dtype="float32")
+        _save_npy_atomic(self.vectors_path, X)
+
+        # float32 stays the source of truth (re-scoring); quantized copy is a sidecar
+        if self.vector_dtype != "float32":
+            _save_quantized_atomic(X, self.vector_dtype, self._qvectors_path(), self._qscales_path())
 
-        with open(BM25_PATH, "w", encoding="utf-8") as f:
-            json.dump({"tokens": self._bm25_tokens}, f)
+        if self.ann is not None:
+            self.ann.save(self.ivf_path)
 
-    def build(self, embeddings: List[List[float]], chunks: List[StoredChunk]) -> None:
+        if self.bm25 is None:
+            raise RuntimeError("bm25 index missing")
+        self.bm25.save(self.bm25_index_path)
+        if self.meta:
+            _write_store_meta(self.storage_dir, self.meta)
+
+    def build(self, embeddings: List[List[float]] | np.ndarray, chunks: List[StoredChunk]) -> None:
         if not chunks:
             raise ValueError("No chunks to build index.")
-        if not embeddings:
+        if len(embeddings) == 0:
             raise ValueError("No embeddings to build index.")
         if len(embeddings) != len(chunks):
             raise ValueError(f"Embedding/chunk mismatch: {len(embeddings)} vs {len(chunks)}")
 
-        self.chunks = chunks
+        # columnar from the start: no per-chunk dicts are kept around after build
+        self.chunks = chunks if isinstance(chunks, ChunkStore) else ChunkStore.from_chunks(chunks)
+        self._page_groups = None
+        self._filter_rows = {}
+        self.generation = uuid.uuid4().hex[:12]
 
         X = np.array(embeddings, dtype="float32")
         # ✅ Normalize for cosine similarity
         norms = np.linalg.norm(X, axis=1, keepdims=True) + 1e-12
         X = X / norms
         self.vectors = X
+        self.ann = IVFIndex.build(X, n_lists=self.ivf_nlist or None) if self.vector_index == "ivf" else None
 
         # BM25
-        self._bm25_tokens = [simple_tokenize(c.text) for c in chunks]
-        self.bm25 = BM25Okapi(self._bm25_tokens)
+        self.bm25 = InvertedIndex.build(simple_tokenize(c.text) for c in chunks)
+
+    def page_groups(self) -> np.ndarray:
+        """(N,) int64 id of each chunk's (file_name, page_label); retrieve() dedupes on it."""
+        groups = self._page_groups
+        if groups is None or len(groups) != len(self.chunks):
+            groups = self._page_groups = chunk_store.group_ids(
+                self.chunks, ("file_name", "page_label"), ("unknown", "n/a")
+            )
+        return groups
+
+    def writer(self) -> "StoreWriter":
+        """Streaming alternative to build() + save() for corpora that should not sit in RAM."""
+        return StoreWriter(self)
+
+    def filter_rows(self, flt: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+        """
+        Sorted row ids allowed by a metadata filter (None = no filter). The search_*
+        methods take these as `rows` and score nothing else. Cached per filter.
+        """
+        if flt is None:
+            return None
+        rows = self._filter_rows.get(flt)
+        if rows is None:
+            rows = flt.resolve(self.chunks)
+            if len(self._filter_rows) >= FILTER_CACHE_SIZE:
+                self._filter_rows.clear()
+            self._filter_rows[flt] = rows
+        return rows
 
-    def search_bm25(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+    def search_bm25(self, query: str, top_k: int = 10, rows: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
         if self.bm25 is None:
             return []
-        q = simple_tokenize(query)
-        scores = self.bm25.get_scores(q)
-        ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:top_k]
-        return [(int(i), float(s)) for i, s in ranked if s > 0]
+        return self.bm25.search(simple_tokenize(query), top_k=top_k, rows=rows)
+
+    def search_bm25_batch(
+        self, queries: List[str], top_k: int = 10, rows: Optional[np.ndarray] = None
+    ) -> List[List[Tuple[int, float]]]:
+        if self.bm25 is None:
+            return [[] for _ in queries]
+        return self.bm25.search_batch([simple_tokenize(q) for q in queries], top_k=top_k, rows=rows)
+
+    def search_vector_batch(
+        self,
+        query_vecs: List[List[float]] | np.ndarray,
+        top_k: int = 10,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        search_vector for Q queries: one (N, D) x (D, Q) product and a row-wise top-k.
+        With an IVF index each query probes different lists, so those go one by one.
+        rows (sorted) limits the product to those rows.
+        """
+        Q = np.asarray(query_vecs, dtype="float32")
+        if self.vectors is None or Q.shape[0] == 0:
+            return [[] for _ in range(len(Q))]
+        Q = Q / (np.linalg.norm(Q, axis=1, keepdims=True) + 1e-12)
+
+        if self.ann is not None and not exact:
+            return [self.search_vector(q, top_k=top_k, nprobe=nprobe, rows=rows) for q in Q]
 
-    def search_vector(self, query_vec: List[float], top_k: int = 10) -> List[Tuple[int, float]]:
+        if self.qvectors is None:
+            sims = quantize.score(self.vectors, None, Q.T, rows=rows).T  # (Q, N or len(rows))
+            top = _top_k_rows(sims, top_k)
+            vals = np.take_along_axis(sims, top, axis=1)
+            ids = top if rows is None else rows[top]
+            return [list(zip(t.tolist(), v.tolist())) for t, v in zip(ids, vals)]
+
+        approx = quantize.score(self.qvectors, self.qscales, Q.T, rows=rows).T  # (Q, N or len(rows))
+        short = _top_k_rows(approx, top_k * self.rescore_factor)
+        short = np.sort(short if rows is None else rows[short], axis=1)  # (Q, S)
+
+        # re-score the union of all short lists once, then pick each query's rows out of it
+        rows = np.unique(short)
+        if self._rescore_rows is not None:
+            full_rows = self._rescore_rows[rows] @ Q.T  # (U, Q)
+        else:
+            full_rows = quantize.score(self.vectors, None, Q.T, rows=rows)
+        full = full_rows[np.searchsorted(rows, short), np.arange(Q.shape[0])[:, None]]  # (Q, S)
+
+        top = _top_k_rows(full, top_k)
+        ids = np.take_along_axis(short, top, axis=1)
+        vals = np.take_along_axis(full, top, axis=1)
+        return [list(zip(i.tolist(), v.tolist())) for i, v in zip(ids, vals)]
+
+    def search_vector(
+        self,
+        query_vec: List[float],
+        top_k: int = 10,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        rows: Optional[np.ndarray] = None,
+    ) -> List[Tuple[int, float]]:
+        """rows (sorted ids, e.g. from filter_rows) restricts scoring to those rows."""
         if self.vectors is None:
             return []
         q = np.array(query_vec, dtype="float32")
         q = q / (np.linalg.norm(q) + 1e-12)
 
-        sims = self.vectors @ q  # cosine
-        top_idx = np.argsort(-sims)[:top_k]
-        return [(int(i), float(sims[int(i)])) for i in top_idx]
+        # IVF and / or a filter narrow the rows to score; None means scan the whole matrix
+        if self.ann is not None and not exact:
+            probed = self.ann.candidates(q, nprobe or self.nprobe)
+            rows = probed if rows is None else _intersect_sorted(probed, rows)
+
+        if self.qvectors is None:
+            sims = quantize.score(self.vectors, None, q, rows=rows)  # cosine
+            top_idx = _top_k(sims, top_k)
+            ids = top_idx if rows is None else rows[top_idx]
+            return [(int(i), float(sims[j])) for i, j in zip(ids, top_idx)]
+
+        # approximate scores on the quantized matrix -> exact float32 scores on the short list
+        approx = quantize.score(self.qvectors, self.qscales, q, rows=rows)
+        short = _top_k(approx, top_k * self.rescore_factor)
+        short = np.sort(short if rows is None else rows[short])
+        if self._rescore_rows is not None:
+            full = self._rescore_rows[short] @ q
+        else:
+            full = quantize.score(self.vectors, None, q, rows=short)
+        top = _top_k(full, top_k)
+        return [(int(short[i]), float(full[i])) for i in top]
+
+
+class StoreWriter:
+    """
+    Writes a store to disk incrementally, one batch of (chunks, vectors) at a time.
+
+    Vectors are normalized and appended to vectors.npy, chunks to the ChunkStore files and the
+    tokens to a BM25 postings builder, so memory is bounded by the batch (plus the
+    postings), not by the corpus. finish() stages the keyword index and the optional
+    quantized / IVF sidecars as .tmp files from the memory-mapped vectors, then
+    publishes everything in one pass of renames, vectors.npy last. Until that pass the
+    previous store is untouched; abort() discards. The renames are not atomic as a
+    group: a flat store read during them can mix old and new files (load() then fails
+    its size checks), so readers that must never see that use the generations layout.
+    The store object is left unloaded: call store.load() to search the new data.
+    """
+
+    def __init__(self, store: HybridStore):
+        ensure_storage_dir(store.storage_dir)
+        self.store = store
+        self.n = 0
+        self._bm25 = InvertedIndexBuilder()
+        self._chunks = ChunkStoreWriter(store.storage_dir)
+        self._vectors_f = open(store.vectors_path + ".tmp", "wb")
+        self._vectors_f.write(quantize.npy_header((0, store.embed_dim), "float32"))
+
+    def add(self, chunks: List[StoredChunk], vectors: List[List[float]] | np.ndarray) -> None:
+        X = np.asarray(vectors, dtype="float32").reshape(-1, self.store.embed_dim)
+        if X.shape[0] != len(chunks):
+            raise ValueError(f"Embedding/chunk mismatch: {X.shape[0]} vs {len(chunks)}")
+        X = X / (np.linalg.norm(X, axis=1, keepdims=True) + 1e-12)
+        self._vectors_f.write(np.ascontiguousarray(X).tobytes())
+        for ch in chunks:
+            self._chunks.add(ch.text, ch.metadata)
+            self._bm25.add(simple_tokenize(ch.text))
+        self.n += len(chunks)
+
+    def _staged(self) -> List[str]:
+        """Final paths of the staged side files, in publish order (vectors.npy and chunks are separate)."""
+        st = self.store
+        paths = []
+        if st.vector_dtype != "float32":
+            paths.append(st._qvectors_path())
+            if st.vector_dtype == "int8":
+                paths.append(st._qscales_path())
+        if st.vector_index == "ivf":
+            paths.append(st.ivf_path)
+        return paths + [st.bm25_index_path]
+
+    def abort(self) -> None:
+        self._chunks.abort()
+        if not self._vectors_f.closed:
+            self._vectors_f.close()
+        for path in self._staged() + [self.store.vectors_path]:
+            if os.path.exists(path + ".tmp"):
+                os.remove(path + ".tmp")
+
+    def finish(self) -> None:
+        if self.n == 0:
+            self.abort()
+            raise ValueError("No chunks to build index.")
+        st = self.store
+        self._vectors_f.seek(0)
+        self._vectors_f.write(quantize.npy_header((self.n, st.embed_dim), "float32"))
+        self._vectors_f.close()
+        self._chunks.finish(publish=False)
+
+        X = np.load(st.vectors_path + ".tmp", mmap_mode="r")
+        if st.vector_dtype != "float32":
+            _save_quantized_atomic(X, st.vector_dtype, st._qvectors_path(), st._qscales_path(), publish=False)
+        if st.vector_index == "ivf":
+            IVFIndex.build(X, n_lists=st.ivf_nlist or None).save(st.ivf_path + ".tmp")
+        del X
+        self._bm25.finish().save(st.bm25_index_path + ".tmp")
+
+        # everything is staged; publish in one pass, vectors.npy last
+        for path in self._staged():
+            os.replace(path + ".tmp", path)
+        self._chunks.publish()
+        os.replace(st.vectors_path + ".tmp", st.vectors_path)
+        if st.meta:
+            _write_store_meta(st.storage_dir, st.meta)
+
+        st.chunks = []
+        st.vectors = st.qvectors = st.qscales = st._rescore_rows = st.ann = st.bm25 = None
+        st.generation = st.meta.get("generation") or uuid.uuid4().hex[:12]
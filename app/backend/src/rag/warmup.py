@@ -0,0 +1,90 @@
+# src/rag/warmup.py
+from __future__ import annotations
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from src.core.config import RAG_VECTOR_ENABLED, TOP_K
+from src.rag import retrieve_custom
+
+# cold -> warming -> ready | failed
+_state: Dict[str, Any] = {"status": "cold", "timings_ms": {}, "error": None}
+_lock = threading.Lock()
+_thread: Optional[threading.Thread] = None
+
+
+def rss_mb() -> Optional[float]:
+    try:
+        import psutil  # optional
+        return round(psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024, 1)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def warm_up() -> Dict[str, Any]:
+    """
+    Loads the store and the query encoder, then runs one dummy encode and one full
+    retrieve so every lazy path (mmaps, BM25 vocab, model weights, BLAS threads) is
+    initialized before real traffic. Safe to call more than once.
+    """
+    with _lock:
+        if _state["status"] in {"warming", "ready"}:
+            return dict(_state)
+        _state.update(status="warming", error=None, timings_ms={})
+
+    timings: Dict[str, float] = {}
+
+    def _timed(name: str, fn):
+        t = time.perf_counter()
+        out = fn()
+        timings[name] = round((time.perf_counter() - t) * 1000, 1)
+        return out
+
+    t0 = time.perf_counter()
+    try:
+        if RAG_VECTOR_ENABLED:
+            # model first: the store load checks the encoder against store_meta.json
+            model = _timed("model_load", retrieve_custom._get_model)
+            _timed("dummy_encode", lambda: model.encode(["warm up"]))
+        _timed("store_load", retrieve_custom.get_store)
+        _timed("dummy_retrieve", lambda: retrieve_custom.retrieve("warm up query", top_k=TOP_K))
+        timings["total"] = round((time.perf_counter() - t0) * 1000, 1)
+        with _lock:
+            _state.update(status="ready", timings_ms=timings)
+        print(f"[warmup] ready in {timings['total']} ms {timings} rss_mb={rss_mb()}", flush=True)
+    except Exception as e:
+        with _lock:
+            _state.update(status="failed", timings_ms=timings, error=str(e))
+        print(f"[warmup] failed: {e}", flush=True)
+    return dict(_state)
+
+
+def start_background_warmup() -> threading.Thread:
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _thread = threading.Thread(target=warm_up, name="rag-warmup", daemon=True)
+        _thread.start()
+    return _thread
+
+
+def is_ready() -> bool:
+    return _state["status"] == "ready"
+
+
+def readiness() -> Dict[str, Any]:
+    with _lock:
+        out = dict(_state)
+    out["ready"] = out["status"] == "ready"
+    out.update(retrieve_custom.store_info())  # live: generation changes on hot swaps
+    out["query_encoder"] = retrieve_custom.coalescer_stats()
+    out["rss_mb"] = rss_mb()
+    return out
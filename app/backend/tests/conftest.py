@@ -0,0 +1,100 @@
+# tests/conftest.py
+"""
+Offline test setup: hashing embedder, a temporary storage root and a stub Groq key.
+src.core.config reads the environment at import time, so this runs before any src import.
+"""
+from __future__ import annotations
+import os
+import shutil
+import sys
+import tempfile
+from typing import List
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+STORAGE_ROOT = tempfile.mkdtemp(prefix="rag-tests-")
+os.environ.update({
+    "EMBED_BACKEND": "hash",
+    "RAG_STORAGE_DIR": STORAGE_ROOT,
+    "RAG_STORE_WATCH_S": "0",
+    "RAG_WARMUP": "off",
+    "RAG_VECTOR_ENABLED": "true",
+    "RAG_VECTOR_DTYPE": "float32",
+    "RAG_VECTOR_INDEX": "exact",
+    "GROQ_API_KEY": "stub",
+})
+
+FILES = ["alpha.pdf", "beta.pdf", "gamma.pdf", "delta.pdf"]
+PAGES_PER_FILE = 5
+
+
+def _pdf_string(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[str], words_per_line: int = 12) -> None:
+    """Minimal uncompressed text PDF (one Helvetica line per Tj) that pypdf can extract."""
+    objs = [b"<< /Type /Catalog /Pages 2 0 R >>"]
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(pages)))
+    objs.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(pages)} >>".encode())
+    objs.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, text in enumerate(pages):
+        lines: List[str] = []
+        for para in text.split("\n"):
+            words = para.split()
+            lines += [" ".join(words[j:j + words_per_line]) for j in range(0, len(words), words_per_line)]
+        ops = "BT /F1 8 Tf 20 780 Td 10 TL " + " ".join(f"({_pdf_string(line)}) Tj T*" for line in lines) + " ET"
+        objs.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        data = ops.encode("latin-1")
+        objs.append(b"<< /Length %d >>\nstream\n" % len(data) + data + b"\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for k, obj in enumerate(objs, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % k + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objs) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objs) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_corpus(directory: str, files: List[str] = FILES, seed: int = 2) -> List[str]:
+    from src.bench.synthetic import make_pages
+
+    os.makedirs(directory, exist_ok=True)
+    pages = make_pages(len(files) * PAGES_PER_FILE, words=240, seed=seed)
+    paths = []
+    for i, name in enumerate(files):
+        path = os.path.join(directory, name)
+        write_pdf(path, pages[i * PAGES_PER_FILE:(i + 1) * PAGES_PER_FILE])
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture(scope="session")
+def pdf_paths(tmp_path_factory) -> List[str]:
+    return write_corpus(str(tmp_path_factory.mktemp("pdfs")))
+
+
+@pytest.fixture(scope="session")
+def live_store(pdf_paths):
+    """The published store under RAG_STORAGE_DIR, as retrieve() / retrieve_many() load it."""
+    from src.rag import retrieve_custom
+    from src.rag.ingest_pipeline import ingest_paths
+    from src.rag.store import HybridStore
+
+    ingest_paths(pdf_paths, HybridStore(embed_dim=384, storage_dir=STORAGE_ROOT))
+    return retrieve_custom.get_store()
+
+
+def pytest_sessionfinish(session, exitstatus):
+    shutil.rmtree(STORAGE_ROOT, ignore_errors=True)
@@ -0,0 +1,116 @@
+# tests/test_answer_cache.py
+import threading
+
+import numpy as np
+
+from src.rag.answer_cache import SemanticAnswerCache
+
+
+def _unit(seed: int, dim: int = 16) -> np.ndarray:
+    v = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _near(v: np.ndarray, eps: float) -> np.ndarray:
+    w = v + eps * _unit(999, v.shape[0])
+    return (w / np.linalg.norm(w)).astype(np.float32)
+
+
+def test_exact_and_semantic_hits():
+    c = SemanticAnswerCache(maxsize=8, threshold=0.95)
+    v = _unit(0)
+    c.put("What is X?", v, "chat", 8, "g1", {"answer": "a"})
+
+    hit = c.lookup("  What   is X? ", None, "chat", 8, "g1")
+    assert hit["answer"] == "a" and hit["cache_similarity"] == 1.0
+    hit = c.lookup("What's X?", _near(v, 0.1), "chat", 8, "g1")
+    assert hit["answer"] == "a" and 0.95 <= hit["cache_similarity"] < 1.0
+    assert c.lookup("Something else", _unit(1), "chat", 8, "g1") is None
+    assert (c.hits, c.misses) == (2, 1)
+
+
+def test_scopes_are_isolated_and_bounded():
+    c = SemanticAnswerCache(maxsize=2)
+    v = _unit(0)
+    c.put("q", v, "chat", 8, "g1", {"answer": "chat"})
+    assert c.lookup("q", v, "chat|files=a.pdf", 8, "g1") is None
+    assert c.lookup("q", v, "chat", 4, "g1") is None
+    assert c.stats()["scopes"] == 1  # lookups in unknown scopes allocate nothing
+
+    for i in range(50):  # client-controlled scopes churn through the two slots
+        c.put(f"q{i}", _unit(i), f"chat|files=f{i}.pdf", 8, "g1", {"answer": str(i)})
+    assert c.stats()["size"] == 2 and c.stats()["scopes"] == 2
+    assert c.lookup("q49", None, "chat|files=f49.pdf", 8, "g1")["answer"] == "49"
+    assert c.lookup("q", v, "chat", 8, "g1") is None
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.rag.answer_cache.time.time", lambda: now[0])
+    c = SemanticAnswerCache(maxsize=2, ttl_s=10)
+    c.put("a", None, "chat", 8, "g1", {"answer": "a"})
+    c.put("b", None, "chat", 8, "g1", {"answer": "b"})
+    now[0] += 1
+    assert c.lookup("a", None, "chat", 8, "g1") is not None  # b is now least recently used
+    c.put("c", None, "chat", 8, "g1", {"answer": "c"})
+    assert c.lookup("b", None, "chat", 8, "g1") is None
+    assert c.lookup("a", None, "chat", 8, "g1") is not None
+
+    now[0] += 11
+    assert c.lookup("a", None, "chat", 8, "g1") is None
+    c.put("d", None, "chat", 8, "g1", {"answer": "d"})  # reuses an expired slot
+    assert c.lookup("d", None, "chat", 8, "g1") is not None
+
+
+def test_generations():
+    c = SemanticAnswerCache(maxsize=4)
+    c.put("q", None, "chat", 8, "g1", {"answer": "old"})
+    assert c.lookup("q", None, "chat", 8, "g2") is None  # a new generation drops everything
+    assert c.stats()["generation"] == "g2" and c.stats()["size"] == 0
+
+    # a request pinned to g1 that finishes after the swap neither writes nor resets
+    c.put("q", None, "chat", 8, "g2", {"answer": "new"})
+    c.put("q", None, "chat", 8, "g1", {"answer": "stale"})
+    assert c.lookup("q", None, "chat", 8, "g1") is None
+    assert c.stats()["generation"] == "g2"
+    assert c.lookup("q", None, "chat", 8, "g2")["answer"] == "new"
+
+
+def test_disabled():
+    c = SemanticAnswerCache(maxsize=0)
+    c.put("q", None, "chat", 8, "g1", {"answer": "a"})
+    assert not c.enabled and c.lookup("q", None, "chat", 8, "g1") is None
+
+
+def test_concurrent_puts_and_lookups():
+    c = SemanticAnswerCache(maxsize=32)
+    vecs = [_unit(i) for i in range(100)]
+    errors = []
+    lookups = []
+
+    def worker(seed: int) -> None:
+        rng = np.random.default_rng(seed)
+        n = 0
+        try:
+            for _ in range(300):
+                i = int(rng.integers(100))
+                scope = f"chat|{i % 5}"
+                if rng.random() < 0.5:
+                    c.put(f"q{i}", vecs[i], scope, 8, "g1", {"answer": str(i)})
+                else:
+                    n += 1
+                    hit = c.lookup(f"q{i}", vecs[i], scope, 8, "g1")
+                    assert hit is None or hit["answer"] == str(i)
+            lookups.append(n)
+        except Exception as e:  # surfaced in the main thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(s,)) for s in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    stats = c.stats()
+    assert stats["size"] <= 32 and stats["scopes"] <= 5
+    assert stats["hits"] + stats["misses"] == sum(lookups) and stats["hits"] > 0
@@ -0,0 +1,41 @@
+# tests/test_bm25.py
+import numpy as np
+import pytest
+
+from src.bench.synthetic import make_text_queries, make_texts
+from src.rag.bm25_index import InvertedIndex
+from src.rag.store import simple_tokenize
+
+rank_bm25 = pytest.importorskip("rank_bm25")
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    texts = make_texts(400, words=60, vocab_size=2000)
+    texts += ["", "w1", "w1 w1 w1 w2"]  # empty doc, tiny docs, repeated terms
+    return [simple_tokenize(t) for t in texts]
+
+
+def test_scores_match_rank_bm25(corpus):
+    ref = rank_bm25.BM25Okapi(corpus)
+    index = InvertedIndex.build(corpus)
+    queries = [simple_tokenize(q) for q in make_text_queries([" ".join(d) for d in corpus[:400]], 30)]
+    queries += [["w1", "w1", "w2"], ["nope"], []]
+    for q in queries:
+        scores = np.zeros(len(corpus))
+        docs, s = index.score_tokens(q)
+        scores[docs] = s
+        np.testing.assert_allclose(scores, ref.get_scores(q), rtol=1e-5, atol=1e-6)
+
+
+def test_search_matches_rank_bm25_top_k(corpus, tmp_path):
+    ref = rank_bm25.BM25Okapi(corpus)
+    index = InvertedIndex.build(corpus)
+    index.save(str(tmp_path / "bm25.idx"))
+    loaded = InvertedIndex.load(str(tmp_path / "bm25.idx"))
+    q = corpus[7][:5]
+    expect = ref.get_scores(q)
+    for idx in (index, loaded):
+        hits = idx.search(q, top_k=10)
+        assert [d for d, _ in hits] == sorted(np.flatnonzero(expect > 0), key=lambda d: (-expect[d], d))[:10]
+        np.testing.assert_allclose([s for _, s in hits], np.sort(expect)[::-1][:10], rtol=1e-5)
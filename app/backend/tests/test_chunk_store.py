@@ -0,0 +1,51 @@
+# tests/test_chunk_store.py
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from src.rag.chunk_store import FILES, OFFSETS_FILE, TEXT_FILE, ChunkStore, StoredChunk
+from src.rag.store import HybridStore
+
+CHUNKS = [
+    StoredChunk(text="héllo wörld", metadata={"file_name": "a.pdf", "page_label": "1"}),
+    StoredChunk(text="", metadata={"file_name": "a.pdf"}),
+    StoredChunk(text="third chunk", metadata={"file_name": "b.pdf", "page_label": 2, "section": "Skills"}),
+]
+
+
+def test_round_trip(tmp_path):
+    assert ChunkStore.write(str(tmp_path), CHUNKS) == 3
+    cs = ChunkStore.load(str(tmp_path))
+    assert len(cs) == 3 and cs[-1].text == "third chunk"
+    assert [c.text for c in cs] == [c.text for c in CHUNKS]
+    assert [cs.metadata(i)["file_name"] for i in range(3)] == ["a.pdf", "a.pdf", "b.pdf"]
+    assert "page_label" not in cs.metadata(1)
+    with pytest.raises(IndexError):
+        cs[3]
+
+
+def test_load_rejects_text_from_another_write(tmp_path):
+    old, new = str(tmp_path / "old"), str(tmp_path / "new")
+    os.makedirs(old)
+    os.makedirs(new)
+    ChunkStore.write(old, CHUNKS)
+    ChunkStore.write(new, CHUNKS[:1])
+    # a reader between the per-file renames of a flat publish: new text, old offsets
+    shutil.copyfile(os.path.join(new, TEXT_FILE), os.path.join(old, TEXT_FILE))
+    with pytest.raises(RuntimeError, match=OFFSETS_FILE):
+        ChunkStore.load(old)
+
+
+def test_store_load_rejects_vectors_from_another_write(tmp_path):
+    old, new = str(tmp_path / "old"), str(tmp_path / "new")
+    for d, n in ((old, 3), (new, 2)):
+        st = HybridStore(embed_dim=4, storage_dir=d)
+        st.build(np.eye(4, dtype=np.float32)[:n], CHUNKS[:n])
+        st.save()
+    # chunk files published, vectors.npy not yet
+    for name in FILES:
+        shutil.copyfile(os.path.join(new, name), os.path.join(old, name))
+    with pytest.raises(RuntimeError, match="vectors.npy has 3 rows, expected 2"):
+        HybridStore(embed_dim=4, storage_dir=old).load()
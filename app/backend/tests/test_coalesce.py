@@ -0,0 +1,95 @@
+# tests/test_coalesce.py
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.rag.coalesce import QueryCoalescer
+
+
+class FakeEncoder:
+    """Deterministic rows per text; records every batch and the thread that ran it."""
+
+    def __init__(self, delay_s: float = 0.0, fail_on: str = ""):
+        self.delay_s = delay_s
+        self.fail_on = fail_on
+        self.batches = []
+        self.threads = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def row(text: str) -> np.ndarray:
+        return np.array([len(text), sum(map(ord, text)) % 9973], dtype=np.float32)
+
+    def __call__(self, texts):
+        with self._lock:
+            self.batches.append(list(texts))
+            self.threads.append(threading.current_thread().name)
+        time.sleep(self.delay_s)
+        if self.fail_on in texts:
+            raise RuntimeError("encoder failed")
+        return np.stack([self.row(t) for t in texts])
+
+
+def _run_concurrently(fn, args_list):
+    results, errors = [None] * len(args_list), [None] * len(args_list)
+    barrier = threading.Barrier(len(args_list))
+
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = fn(*args_list[i])
+        except Exception as e:
+            errors[i] = e
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(args_list))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def test_concurrent_calls_are_batched_and_get_their_own_rows():
+    enc = FakeEncoder(delay_s=0.01)
+    c = QueryCoalescer(enc, window_ms=20, max_batch=8)
+    calls = [[f"q{i % 20}"] if i % 3 else [f"q{i % 20}", f"r{i}"] for i in range(48)]
+    results, errors = _run_concurrently(c.encode, [(texts,) for texts in calls])
+
+    assert not any(errors)
+    for texts, out in zip(calls, results):
+        np.testing.assert_array_equal(out, np.stack([enc.row(t) for t in texts]))
+    assert len(enc.batches) < len(calls)
+    assert all(len(b) <= 8 and len(b) == len(set(b)) for b in enc.batches)  # capped and deduplicated
+    assert set(enc.threads) == {"query-coalescer"}
+    assert c.stats()["pending"] == 0
+
+
+def test_lone_query_skips_the_window():
+    c = QueryCoalescer(FakeEncoder(), window_ms=500, max_batch=8)
+    for _ in range(3):
+        t0 = time.perf_counter()
+        c.encode(["alone"])
+        assert time.perf_counter() - t0 < 0.25
+
+
+def test_errors_reach_every_caller_in_the_batch_and_the_next_pass_works():
+    enc = FakeEncoder(delay_s=0.01, fail_on="boom")
+    c = QueryCoalescer(enc, window_ms=50, max_batch=64)
+    c.encode(["warm"])
+    _, errors = _run_concurrently(c.encode, [(["boom"],)] + [([f"q{i}"],) for i in range(7)])
+    failed = [e for e in errors if e is not None]
+    assert failed and all(isinstance(e, RuntimeError) for e in failed)
+    boom_batch = next(b for b in enc.batches if "boom" in b)
+    assert len(failed) == len(boom_batch)
+    np.testing.assert_array_equal(c.encode(["after"]), enc.row("after")[None])
+
+
+@pytest.mark.parametrize("window_ms, texts", [(0, ["a", "b"]), (20, [f"t{i}" for i in range(4)])])
+def test_bypass_runs_on_the_calling_thread(window_ms, texts):
+    enc = FakeEncoder()
+    c = QueryCoalescer(enc, window_ms=window_ms, max_batch=4)
+    out = c.encode(texts)
+    np.testing.assert_array_equal(out, np.stack([enc.row(t) for t in texts]))
+    assert enc.threads == [threading.current_thread().name]
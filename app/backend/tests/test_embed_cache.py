@@ -0,0 +1,67 @@
+# tests/test_embed_cache.py
+import numpy as np
+
+from src.rag.embed_cache import EmbeddingDiskCache, text_key
+from src.rag.quantize import NPY_HEADER_BYTES
+
+DIM = 8
+
+
+def _vecs(n: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def test_text_key_normalizes_whitespace():
+    assert text_key("a  b\nc ") == text_key("a b c")
+    assert text_key("a b c") != text_key("A b c")
+
+
+def test_round_trip_across_saves(tmp_path):
+    keys = [text_key(f"chunk {i}") for i in range(50)]
+    V = _vecs(50, 0)
+    c = EmbeddingDiskCache(str(tmp_path), "hash:test", DIM)
+    c.put_many(keys[:30], V[:30])
+    found, out = c.get_many(keys[:40])  # pending rows hit before save()
+    assert found.tolist() == [True] * 30 + [False] * 10
+    np.testing.assert_array_equal(out[:30], V[:30])
+    assert not out[30:].any()
+    c.save()
+    c.put_many(keys[25:], V[25:])  # overlapping keys keep their first vector
+    c.save()
+
+    c = EmbeddingDiskCache(str(tmp_path), "hash:test", DIM)
+    assert len(c) == 50
+    found, out = c.get_many(keys[::-1] + [text_key("never seen")])
+    assert found[:50].all() and not found[50]
+    np.testing.assert_array_equal(out[:50], V[::-1])
+    assert (c.hits, c.misses) == (50, 1)
+
+
+def test_other_encoder_is_ignored(tmp_path):
+    c = EmbeddingDiskCache(str(tmp_path), "hash:test", DIM)
+    c.put_many([1, 2], _vecs(2, 1))
+    c.save()
+    assert len(EmbeddingDiskCache(str(tmp_path), "hash:test", DIM)) == 2
+    assert len(EmbeddingDiskCache(str(tmp_path), "hash:other", DIM)) == 0
+    assert len(EmbeddingDiskCache(str(tmp_path), "hash:test", DIM * 2)) == 0
+
+
+def test_rows_left_by_a_crashed_save_are_overwritten(tmp_path):
+    c = EmbeddingDiskCache(str(tmp_path), "hash:test", DIM)
+    V = _vecs(6, 2)
+    c.put_many([10, 11, 12], V[:3])
+    c.save()
+    # a save that wrote its rows but died before the header / keys were updated
+    with open(c.vectors_path, "ab") as f:
+        f.write(_vecs(4, 3).tobytes())
+
+    c = EmbeddingDiskCache(str(tmp_path), "hash:test", DIM)
+    c.put_many([13, 14, 15], V[3:])
+    c.save()
+    c = EmbeddingDiskCache(str(tmp_path), "hash:test", DIM)
+    found, out = c.get_many([10, 11, 12, 13, 14, 15])
+    assert found.all()
+    np.testing.assert_array_equal(out, V)
+    assert c.vectors.shape[0] == 6
+    with open(c.vectors_path, "rb") as f:
+        assert len(f.read()) == NPY_HEADER_BYTES + 6 * DIM * 4
@@ -0,0 +1,79 @@
+# tests/test_eval_metrics.py
+import json
+import math
+import os
+
+import pytest
+
+from conftest import BACKEND_DIR
+from src.eval.metrics import (
+    case_metrics,
+    mean_metrics,
+    ndcg_at_k,
+    parse_label,
+    percentiles,
+    recall_at_k,
+    reciprocal_rank,
+    relevance,
+)
+from src.eval.run_eval import _case_filter, load_cases
+
+HITS = [
+    {"file_name": "A.pdf", "page_label": "1", "chunk_id": 0},
+    {"file_name": "b.pdf", "page_label": "2", "chunk_id": 0},
+    {"file_name": "a.pdf", "page_label": "3", "chunk_id": 1},
+    {"file_name": "a.pdf", "page_label": "1", "chunk_id": 0},
+]
+
+
+def test_parse_label():
+    assert parse_label("CV.pdf") == ("cv.pdf", None, None)
+    assert parse_label(" cv.pdf : 3 ") == ("cv.pdf", "3", None)
+    assert parse_label("cv.pdf:3:0") == ("cv.pdf", "3", "0")
+    for bad in ("", ":3", "a:1:2:3"):
+        with pytest.raises(ValueError):
+            parse_label(bad)
+
+
+def test_each_label_counts_once():
+    assert relevance(HITS, [parse_label("a.pdf")]) == [1, 0, 0, 0]
+    assert relevance(HITS, [parse_label("a.pdf"), parse_label("a.pdf")]) == [1, 0, 1, 0]
+    assert relevance(HITS, [parse_label("a.pdf:1:0"), parse_label("a.pdf:1:0")]) == [1, 0, 0, 1]
+    assert relevance(HITS, [parse_label("b.pdf:2"), parse_label("a.pdf:3:0")]) == [0, 1, 0, 0]
+    assert relevance([], [parse_label("a.pdf")]) == []
+
+
+def test_rank_metrics():
+    rel = [0, 1, 0, 1]
+    assert reciprocal_rank(rel) == 0.5 and reciprocal_rank([0, 0]) == 0.0
+    assert recall_at_k(rel, 3, 2) == pytest.approx(1 / 3) and recall_at_k(rel, 0, 2) == 0.0
+    ideal = 1 + 1 / math.log2(3)
+    assert ndcg_at_k(rel, 2, 4) == pytest.approx((1 / math.log2(3) + 1 / math.log2(5)) / ideal)
+    assert ndcg_at_k([1, 1], 2, 2) == pytest.approx(1.0) and ndcg_at_k(rel, 0, 4) == 0.0
+
+    per_case = [case_metrics(rel, 2, [1, 4]), case_metrics([1, 0, 0, 0], 1, [1, 4])]
+    assert set(per_case[0]) == {"mrr", "recall@1", "ndcg@1", "recall@4", "ndcg@4"}
+    mean = mean_metrics(per_case)
+    assert mean["mrr"] == 0.75 and mean["recall@1"] == 0.5 and mean["recall@4"] == 1.0
+    assert mean_metrics([]) == {}
+
+
+def test_percentiles():
+    p = percentiles([float(i) for i in range(1, 101)])
+    assert p["count"] == 100 and p["p50_ms"] == 50.5 and p["mean_ms"] == 50.5
+    assert p["p95_ms"] <= p["p99_ms"] <= 100
+    assert percentiles([]) == {"count": 0}
+
+
+def test_shipped_cases_are_labeled():
+    cases = load_cases(os.path.join(BACKEND_DIR, "src", "eval", "qa.jsonl"))
+    assert cases and len({c["id"] for c in cases}) == len(cases)
+    for c in cases:
+        assert c["question"] and c.get("relevant"), c["id"]
+        for label in c["relevant"]:
+            parse_label(label)
+        _case_filter(c)  # filters parse (None when absent)
+    with open(os.path.join(BACKEND_DIR, "src", "eval", "qa.jsonl"), encoding="utf-8") as f:
+        rows = [line for line in f if line.strip() and not line.lstrip().startswith("#")]
+    assert len(rows) == len(cases)
+    assert all(json.loads(r) for r in rows)
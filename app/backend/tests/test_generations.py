@@ -0,0 +1,118 @@
+# tests/test_generations.py
+import os
+import threading
+
+import pytest
+
+from conftest import FILES, write_corpus
+from src.rag import generations
+from src.rag import retrieve_custom as rc
+from src.rag.ingest_pipeline import ingest_paths
+from src.rag.store import HybridStore
+
+
+def test_ids_sort_in_creation_order():
+    ids = [generations.new_generation_id() for _ in range(200)]
+    assert sorted(ids) == ids and len(set(ids)) == len(ids)
+
+
+def test_publish_resolve_and_prune(tmp_path):
+    root = str(tmp_path)
+    assert generations.resolve(root) == (root, None)  # flat store
+    ids = [generations.new_generation_id() for _ in range(4)]
+    for g in ids:
+        os.makedirs(generations.generation_dir(root, g))
+    generations.publish(root, ids[1])
+    assert generations.read_current(root) == ids[1]
+    assert generations.resolve(root) == (generations.generation_dir(root, ids[1]), ids[1])
+    assert not [f for f in os.listdir(root) if f.endswith(".tmp")]
+
+    # keeps the current generation plus the newest other one
+    assert generations.prune(root, keep=2) == [ids[0], ids[2]]
+    assert generations.list_generations(root) == [ids[1], ids[3]]
+    assert generations.prune(root, keep=1) == [ids[3]]
+    assert generations.list_generations(root) == [ids[1]]
+
+
+@pytest.fixture
+def swap_root(tmp_path, monkeypatch):
+    """retrieve_custom pointed at an empty storage root of its own."""
+    root = str(tmp_path / "storage")
+    monkeypatch.setattr(rc, "STORAGE_DIR", root)
+    monkeypatch.setattr(rc, "_store", None)
+    monkeypatch.setattr(rc, "_failed_generation", None)
+    rc.clear_query_cache()
+    return root
+
+
+def _ingest(paths, root):
+    ingest_paths(paths, HybridStore(embed_dim=384, storage_dir=root), use_generations=True)
+    return generations.read_current(root)
+
+
+def test_refresh_store_hot_swaps(tmp_path, swap_root):
+    first = write_corpus(str(tmp_path / "a"), FILES[:2], seed=21)
+    gen_a = _ingest(first, swap_root)
+    old = rc.get_store()
+    assert old.generation == gen_a and rc.refresh_store() is False
+
+    second = write_corpus(str(tmp_path / "b"), FILES[2:], seed=22)
+    gen_b = _ingest(second, swap_root)
+    assert gen_b > gen_a
+    swaps = rc.store_info()["swaps"]
+    assert rc.refresh_store() is True
+    assert rc.store_generation() == gen_b and rc.store_info()["swaps"] == swaps + 1
+    assert {c.metadata["file_name"] for c in rc.get_store().chunks} == {"gamma.pdf", "delta.pdf"}
+
+    # a request still holding the old store keeps working, even once its generation is pruned
+    _ingest(first, swap_root)
+    assert gen_a not in generations.list_generations(swap_root)
+    assert {h.metadata["file_name"] for h in rc.retrieve("w1 w2 w3", top_k=4, store=old)} <= {"alpha.pdf", "beta.pdf"}
+    assert old.search_vector(rc.embed_query("w1 w2"), top_k=3)
+
+
+def test_broken_generation_is_not_swapped_in(tmp_path, swap_root):
+    gen_a = _ingest(write_corpus(str(tmp_path / "a"), FILES[:2], seed=23), swap_root)
+    rc.get_store()
+    broken = generations.new_generation_id()
+    os.makedirs(generations.generation_dir(swap_root, broken))
+    generations.publish(swap_root, broken)
+
+    assert rc.refresh_store() is False
+    assert rc.store_generation() == gen_a
+    assert rc.refresh_store() is False  # remembered as failed, not reloaded every poll
+    assert rc._failed_generation == broken
+
+
+def test_queries_run_through_swaps(tmp_path, swap_root):
+    corpora = [write_corpus(str(tmp_path / str(i)), FILES[i % 2 * 2:i % 2 * 2 + 2], seed=30 + i) for i in range(4)]
+    _ingest(corpora[0], swap_root)
+    rc.get_store()
+    stop = threading.Event()
+    errors, done = [], [0]
+
+    def query() -> None:
+        while not stop.is_set():
+            try:
+                st = rc.get_store()
+                hits = rc.retrieve("w1 w4 w9", top_k=5, store=st)
+                assert hits and all(h.text == st.chunks[h.doc_id].text for h in hits)
+                rc.retrieve_many(["w2 w3", "w5"], top_k=3)
+                done[0] += 1
+            except Exception as e:  # surfaced in the main thread
+                errors.append(e)
+                return
+
+    threads = [threading.Thread(target=query) for _ in range(4)]
+    for t in threads:
+        t.start()
+    try:
+        for paths in corpora[1:]:
+            gen = _ingest(paths, swap_root)
+            assert rc.refresh_store() is True and rc.store_generation() == gen
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    assert not errors, errors[0]
+    assert done[0] > 0
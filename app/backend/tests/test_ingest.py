@@ -0,0 +1,53 @@
+# tests/test_ingest.py
+import numpy as np
+
+from conftest import FILES, write_corpus, write_pdf
+from src.bench.synthetic import make_pages
+from src.rag import generations
+from src.rag.ingest_pipeline import ingest_paths
+from src.rag.store import HybridStore
+
+
+def _ingest(paths, root, incremental=True):
+    stats = ingest_paths(paths, HybridStore(embed_dim=384, storage_dir=root), incremental=incremental)
+    st = HybridStore(embed_dim=384, storage_dir=generations.resolve(root)[0])
+    assert st.load()
+    return st, stats
+
+
+def _rows(st):
+    return sorted(
+        (c.metadata["file_name"], str(c.metadata.get("page_label")), c.metadata.get("chunk_id"), c.text, i)
+        for i, c in enumerate(st.chunks)
+    )
+
+
+def test_incremental_matches_full_rebuild(tmp_path):
+    pdfs = str(tmp_path / "pdfs")
+    paths = write_corpus(pdfs, FILES[:3])
+    _ingest(paths, str(tmp_path / "inc"))
+
+    # modify one file, drop one, add one
+    write_pdf(paths[1], make_pages(4, words=240, seed=11))
+    paths = [paths[0], paths[1]] + write_corpus(pdfs, ["epsilon.pdf"], seed=12)
+    inc, stats = _ingest(paths, str(tmp_path / "inc"))
+    full, _ = _ingest(paths, str(tmp_path / "full"), incremental=False)
+
+    assert stats["files_reused"] == 1 and stats["files_embedded"] == 2 and stats["files_dropped"] == 1
+    assert stats["chunks_reused"] > 0
+    assert {c.metadata["file_name"] for c in inc.chunks} == {"alpha.pdf", "beta.pdf", "epsilon.pdf"}
+
+    a, b = _rows(inc), _rows(full)
+    assert [r[:4] for r in a] == [r[:4] for r in b]
+    assert [inc.chunks[r[4]].metadata for r in a] == [full.chunks[r[4]].metadata for r in b]
+    np.testing.assert_allclose(
+        np.asarray(inc.vectors)[[r[4] for r in a]], np.asarray(full.vectors)[[r[4] for r in b]], atol=1e-6
+    )
+
+    # BM25 is rebuilt over the same texts, so rankings map row for row
+    to_full = {ra[4]: rb[4] for ra, rb in zip(a, b)}
+    for q in ["w1 w2 w3", full.chunks[5].text[:80], "nothing here zzz"]:
+        got = [(to_full[i], s) for i, s in inc.search_bm25(q, top_k=10)]
+        ref = full.search_bm25(q, top_k=10)
+        assert [i for i, _ in got] == [i for i, _ in ref]
+        np.testing.assert_allclose([s for _, s in got], [s for _, s in ref], rtol=1e-9)
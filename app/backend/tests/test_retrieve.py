@@ -0,0 +1,64 @@
+# tests/test_retrieve.py
+import numpy as np
+import pytest
+
+from src.rag import retrieve_custom as rc
+from src.rag.filters import MetadataFilter
+
+QUESTIONS = [
+    "Summarize the main experience described in the documents.",
+    "w1 w2 w3",
+    "w17 w42 w230 w5",
+    "zzz nothing matches this",
+]
+
+FILTERS = [
+    MetadataFilter.parse(files=["beta.pdf"]),
+    MetadataFilter.parse(files=["ALPHA.PDF", "/elsewhere/delta.pdf"]),
+    MetadataFilter.parse(pages=["2-3"]),
+    MetadataFilter.parse(files=["[ab]*.pdf"], pages=[1, 5]),
+    MetadataFilter.parse(files=["missing.pdf"]),
+]
+
+
+def _ids(hits):
+    return [h.doc_id for h in hits]
+
+
+def _post_filtered(st, question, top_k, flt):
+    """Unfiltered exhaustive rankings, post-filtered, then the usual fusion / selection."""
+    n = len(st.chunks)
+    mask = np.array([flt.matches(c.metadata) for c in st.chunks])
+    cand_k = max(top_k * 4, 12)
+    b = [(i, s) for i, s in st.search_bm25(question, top_k=n) if mask[i]][:cand_k]
+    v = [(i, s) for i, s in st.search_vector(rc.embed_query(question), top_k=n, exact=True) if mask[i]][:cand_k]
+    bi, _ = rc._ranked_arrays(b)
+    vi, vs = rc._ranked_arrays(v)
+    ids, sc = rc._rrf_fuse_arrays(vi, bi, k=60)
+    return rc._select_hits(st, ids, sc, vi, vs, bi, top_k)
+
+
+@pytest.mark.parametrize("top_k", [3, 8])
+@pytest.mark.parametrize("flt", [None] + FILTERS)
+def test_retrieve_many_matches_retrieve(live_store, top_k, flt):
+    many = rc.retrieve_many(QUESTIONS, top_k=top_k, filters=flt)
+    one = [rc.retrieve(q, top_k=top_k, filters=flt) for q in QUESTIONS]
+    assert [_ids(h) for h in many] == [_ids(h) for h in one]
+    for a, b in zip(many, one):
+        np.testing.assert_allclose([h.score for h in a], [h.score for h in b], rtol=1e-9)
+
+
+@pytest.mark.parametrize("flt", FILTERS)
+@pytest.mark.parametrize("top_k", [3, 8])
+def test_filtered_retrieve_matches_post_filter(live_store, flt, top_k):
+    expect_rows = np.flatnonzero([flt.matches(c.metadata) for c in live_store.chunks])
+    assert np.array_equal(live_store.filter_rows(flt), expect_rows)
+    for q in QUESTIONS:
+        got = rc.retrieve(q, top_k=top_k, filters=flt)
+        ref = _post_filtered(live_store, q, top_k, flt)
+        assert _ids(got) == _ids(ref), q
+        assert all(flt.matches(h.metadata) for h in got)
+        for a, b in zip(got, ref):
+            assert a.channel == b.channel
+            assert a.score == pytest.approx(b.score, abs=1e-12)
+            assert a.vec_sim == pytest.approx(b.vec_sim, abs=1e-5)
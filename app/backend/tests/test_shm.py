@@ -0,0 +1,83 @@
+# tests/test_shm.py
+import os
+
+from conftest import FILES, write_corpus
+from src.rag import generations, shm
+from src.rag import retrieve_custom as rc
+from src.rag.ingest_pipeline import ingest_paths
+from src.rag.store import HybridStore
+
+
+def _generation(root: str, payload: str):
+    gen = generations.new_generation_id()
+    d = generations.generation_dir(root, gen)
+    os.makedirs(d)
+    for name in ("vectors.npy", "bm25.idx", "manifest.json", "chunks.bin.tmp"):
+        with open(os.path.join(d, name), "w") as f:
+            f.write(f"{name} {payload}")
+    return d, gen
+
+
+def _stage(store_dir: str, shm_root: str, gen: str) -> str:
+    with shm.staged(store_dir, shm_root, gen) as dest:
+        return dest
+
+
+def test_stages_store_files_once(tmp_path):
+    shm_root = str(tmp_path / "shm")
+    d, gen = _generation(str(tmp_path / "storage"), "g1")
+    dest = _stage(d, shm_root, gen)
+    assert os.path.basename(dest).startswith(shm.STAGE_PREFIX) and dest.endswith(gen)
+    assert sorted(os.listdir(dest)) == ["bm25.idx", "vectors.npy"]  # no manifest, no .tmp
+    with open(os.path.join(dest, "vectors.npy")) as f:
+        assert f.read() == "vectors.npy g1"
+    mtime = os.stat(dest).st_mtime_ns
+    assert _stage(d, shm_root, gen) == dest and os.stat(dest).st_mtime_ns == mtime
+
+
+def test_prunes_only_its_own_older_copies(tmp_path):
+    shm_root = str(tmp_path / "shm")
+    os.makedirs(os.path.join(shm_root, "other_app_dir"))
+    with open(os.path.join(shm_root, "other_file"), "w") as f:
+        f.write("x")
+    d_other, g_other = _generation(str(tmp_path / "other"), "o1")
+    other_deployment = _stage(d_other, shm_root, g_other)
+
+    root = str(tmp_path / "storage")
+    d1, g1 = _generation(root, "g1")
+    first = _stage(d1, shm_root, g1)
+    d2, g2 = _generation(root, "g2")
+    second = _stage(d2, shm_root, g2)
+
+    assert not os.path.exists(first)
+    assert os.path.isdir(second) and os.path.isdir(other_deployment)
+    assert os.path.isdir(os.path.join(shm_root, "other_app_dir"))
+    assert os.path.isfile(os.path.join(shm_root, "other_file"))
+
+
+def test_copy_being_loaded_is_not_pruned(tmp_path):
+    shm_root = str(tmp_path / "shm")
+    root = str(tmp_path / "storage")
+    d1, g1 = _generation(root, "g1")
+    d2, g2 = _generation(root, "g2")
+    d3, g3 = _generation(root, "g3")
+
+    # worker A staged g1 and has not mapped it yet; worker B stages g2 meanwhile
+    with shm.staged(d1, shm_root, g1) as first:
+        second = _stage(d2, shm_root, g2)
+        assert os.path.isfile(os.path.join(first, "vectors.npy"))
+    assert os.path.isdir(first) and os.path.isdir(second)
+
+    third = _stage(d3, shm_root, g3)
+    assert not os.path.exists(first) and not os.path.exists(second) and os.path.isdir(third)
+
+
+def test_load_store_through_shm(tmp_path, monkeypatch):
+    root, shm_root = str(tmp_path / "storage"), str(tmp_path / "shm")
+    ingest_paths(write_corpus(str(tmp_path / "pdfs"), FILES[:2], seed=41), HybridStore(embed_dim=384, storage_dir=root))
+    monkeypatch.setattr(rc, "RAG_SHM_DIR", shm_root)
+    store_dir, gen = generations.resolve(root)
+    st = rc._load_store(store_dir, gen)
+    assert st.storage_dir.startswith(shm_root) and st.mmap and st.generation == gen
+    assert st.search_bm25("w1 w2", top_k=3)
+    assert [d for d in os.listdir(shm_root) if not d.startswith(".")] == [os.path.basename(st.storage_dir)]
@@ -0,0 +1,40 @@
+# tests/test_smoke.py
+import asyncio
+
+import httpx
+
+from src.rag import warmup
+
+
+def _get(path: str) -> httpx.Response:
+    from src.main import app
+
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            return await c.get(path)
+    return asyncio.run(go())
+
+
+def test_health():
+    r = _get("/health")
+    assert r.status_code == 200
+    assert r.json() == {"status": "ok", "vector_enabled": True}
+
+
+def test_warm_up_then_ready(live_store):
+    state = warmup.warm_up()
+    assert state["status"] == "ready", state
+    assert {"model_load", "dummy_encode", "store_load", "dummy_retrieve", "total"} <= set(state["timings_ms"])
+    assert warmup.is_ready()
+
+    r = _get("/ready")
+    assert r.status_code == 200
+    info = r.json()
+    assert info["ready"] and info["generation"] == live_store.generation and info["chunks"] == len(live_store.chunks)
+
+
+def test_metrics_endpoint(live_store):
+    _get("/health")
+    r = _get("/metrics")
+    assert r.status_code == 200 and r.headers["content-type"].startswith("text/plain")
+    assert "rag_llm_errors_total" in r.text
@@ -0,0 +1,67 @@
+# tests/test_store_writer.py
+import os
+
+import numpy as np
+import pytest
+
+from src.bench.synthetic import make_texts, make_vectors
+from src.rag.store import HybridStore, StoredChunk
+
+DIM = 32
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    X = make_vectors(600, dim=DIM, seed=4)
+    chunks = [StoredChunk(text=t, metadata={"file_name": f"f{i % 7}.pdf", "page_label": str(i % 5 + 1)})
+              for i, t in enumerate(make_texts(600, words=20, seed=5))]
+    return X, chunks
+
+
+@pytest.mark.parametrize("kwargs", [{}, {"vector_dtype": "int8", "vector_index": "ivf", "ivf_nlist": 8}])
+def test_writer_matches_build(tmp_path, corpus, kwargs):
+    X, chunks = corpus
+    built = HybridStore(embed_dim=DIM, storage_dir=str(tmp_path / "built"), **kwargs)
+    built.build(X, chunks)
+    built.save()
+
+    st = HybridStore(embed_dim=DIM, storage_dir=str(tmp_path / "streamed"), **kwargs)
+    w = st.writer()
+    for s in range(0, len(chunks), 128):
+        w.add(chunks[s:s + 128], X[s:s + 128])
+    w.finish()
+    assert not [f for f in os.listdir(st.storage_dir) if f.endswith(".tmp")]
+
+    a = HybridStore(embed_dim=DIM, storage_dir=built.storage_dir, **kwargs)
+    b = HybridStore(embed_dim=DIM, storage_dir=st.storage_dir, **kwargs)
+    assert a.load() and b.load()
+    assert [c.text for c in a.chunks] == [c.text for c in b.chunks]
+    assert [c.metadata for c in a.chunks] == [c.metadata for c in b.chunks]
+    np.testing.assert_allclose(np.asarray(a.vectors), np.asarray(b.vectors), atol=1e-6)
+    for q in ["w1 w2", chunks[3].text]:
+        assert a.search_bm25(q, top_k=10) == b.search_bm25(q, top_k=10)
+    assert [i for i, _ in a.search_vector(X[3], top_k=5, exact=True)] == [i for i, _ in b.search_vector(X[3], top_k=5, exact=True)]
+
+
+def test_abort_keeps_the_previous_store(tmp_path, corpus):
+    X, chunks = corpus
+    st = HybridStore(embed_dim=DIM, storage_dir=str(tmp_path), vector_dtype="int8")
+    w = st.writer()
+    w.add(chunks[:100], X[:100])
+    w.finish()
+
+    w = st.writer()
+    w.add(chunks[100:], X[100:])
+    w.abort()
+    assert not [f for f in os.listdir(st.storage_dir) if f.endswith(".tmp")]
+    assert st.load() and len(st.chunks) == 100
+
+
+def test_empty_and_mismatched_batches(tmp_path, corpus):
+    X, chunks = corpus
+    w = HybridStore(embed_dim=DIM, storage_dir=str(tmp_path)).writer()
+    with pytest.raises(ValueError):
+        w.add(chunks[:3], X[:2])
+    with pytest.raises(ValueError):
+        w.finish()
+    assert not [f for f in os.listdir(str(tmp_path)) if f.endswith(".tmp")]
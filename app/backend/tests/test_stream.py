@@ -0,0 +1,103 @@
+# tests/test_stream.py
+import asyncio
+import json
+import random
+
+import httpx
+import pytest
+
+from scripts import groq_stub
+from src.rag import llm_groq
+from src.rag.rag import SOURCE_ID_RE, answer_cache_stats
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    """Routes the LLM client to scripts/groq_stub.py in-process, with no latency."""
+    monkeypatch.setattr(groq_stub, "CFG", groq_stub.Settings())
+    groq_stub.CFG.latency = groq_stub.Latency("fixed:0")
+    groq_stub.CFG.sentences = 4
+    groq_stub.CFG.chunk_chars = 5
+    groq_stub.CFG.chunk_random = True
+    groq_stub.CFG.rng = random.Random(3)
+    monkeypatch.setattr(
+        llm_groq, "_get_async_client",
+        lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=groq_stub.app), timeout=10),
+    )
+    return groq_stub.CFG
+
+
+def _sse(body: str):
+    events = []
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def _chat_stream(question: str, no_cache: bool = True):
+    from src.main import app
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        r = await client.post("/chat/stream", json={"question": question, "no_cache": no_cache})
+        assert r.status_code == 200
+        return _sse(r.text)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_sse_citation_events(live_store, stub, seed):
+    stub.rng = random.Random(seed)
+    events = asyncio.run(_chat_stream("What experience is described in the documents?"))
+    kinds = [e for e, _ in events]
+    assert kinds[0] == "sources" and kinds[-1] == "done"
+    assert set(kinds[1:-1]) <= {"token", "citation"}
+
+    sources = {s["id"]: s for s in events[0][1]["sources"]}
+    done = events[-1][1]
+    tokens = [d["text"] for e, d in events if e == "token"]
+    assert "".join(tokens).strip() == done["answer"]
+    assert not done["answer"].startswith(llm_groq.LLM_ERROR_PREFIXES)
+
+    # every marker arrives whole, and its citation event follows the token that completes it
+    markers = []
+    for e, d in events:
+        if e == "token":
+            assert d["text"].count("[[") == d["text"].count("]]")
+            markers += [sorted({int(p) for p in m.split(",") if p.strip()}) for m in SOURCE_ID_RE.findall(d["text"])]
+    cited = [d for e, d in events if e == "citation"]
+    assert len(markers) == 4
+    assert [c["ids"] for c in cited] == markers
+    for c in cited:
+        assert all(sid in sources for sid in c["ids"])
+        assert c["sources"] == [sources[sid] for sid in c["ids"]]
+
+    assert sorted(s["id"] for s in done["sources"]) == sorted({i for ids in markers for i in ids})
+
+
+def _truncated(stream):
+    async def gen(*args):
+        async for chunk in stream(*args):
+            if "[DONE]" not in chunk:
+                yield chunk
+    return gen
+
+
+@pytest.mark.parametrize("failure", ["truncated", "http_500"])
+def test_failed_stream_is_reported_and_not_cached(live_store, stub, monkeypatch, failure):
+    if failure == "truncated":
+        monkeypatch.setattr(groq_stub, "_stream", _truncated(groq_stub._stream))
+    else:
+        stub.error_rate = 1.0
+    question = f"Which tools are mentioned ({failure})?"
+    size = answer_cache_stats()["size"]
+
+    for _ in range(2):
+        events = asyncio.run(_chat_stream(question, no_cache=False))
+        done = events[-1][1]
+        assert not done.get("cached")
+        assert any(p in done["answer"] for p in llm_groq.LLM_ERROR_PREFIXES)
+        assert "".join(d["text"] for e, d in events if e == "token").strip() == done["answer"]
+    if failure == "truncated":
+        assert "[[cite:" in done["answer"]  # the partial answer is kept ahead of the error
+    assert answer_cache_stats()["size"] == size
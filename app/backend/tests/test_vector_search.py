@@ -0,0 +1,50 @@
+# tests/test_vector_search.py
+import numpy as np
+import pytest
+
+from src.bench.synthetic import make_queries, make_texts, make_vectors
+from src.rag.store import HybridStore, StoredChunk
+
+N, DIM, K = 4000, 64, 10
+
+
+@pytest.fixture(scope="module")
+def data():
+    X = make_vectors(N, dim=DIM, seed=0)
+    Q = make_queries(X, 100, seed=1)
+    chunks = [StoredChunk(text=t, metadata={"file_name": f"f{i % 20}.pdf", "page_label": str(i % 9 + 1)})
+              for i, t in enumerate(make_texts(N, words=8))]
+    return X, Q, chunks
+
+
+def _store(tmp_path, chunks, X, **kwargs) -> HybridStore:
+    """Built, saved and loaded back memory-mapped, the way the API reads a store."""
+    built = HybridStore(embed_dim=DIM, storage_dir=str(tmp_path), **kwargs)
+    built.build(X, chunks)
+    built.save()
+    st = HybridStore(embed_dim=DIM, storage_dir=str(tmp_path), mmap=True, **kwargs)
+    assert st.load()
+    return st
+
+
+def _recall(st: HybridStore, Q: np.ndarray, truth) -> float:
+    found = [set(i for i, _ in st.search_vector(q, top_k=K)) for q in Q]
+    return float(np.mean([len(f & t) / K for f, t in zip(found, truth)]))
+
+
+@pytest.mark.parametrize("kwargs, min_recall", [
+    ({"vector_dtype": "float16"}, 0.99),
+    ({"vector_dtype": "int8"}, 0.97),
+    ({"vector_index": "ivf", "ivf_nlist": 64, "nprobe": 16}, 0.90),
+    ({"vector_dtype": "int8", "vector_index": "ivf", "ivf_nlist": 64, "nprobe": 16}, 0.88),
+])
+def test_recall_against_exact(tmp_path, data, kwargs, min_recall):
+    X, Q, chunks = data
+    exact = _store(tmp_path / "exact", chunks, X)
+    truth = [set(i for i, _ in exact.search_vector(q, top_k=K, exact=True)) for q in Q]
+    assert _recall(exact, Q, truth) == 1.0
+
+    st = _store(tmp_path / "approx", chunks, X, **kwargs)
+    assert _recall(st, Q, truth) >= min_recall
+    # exact=True bypasses IVF; scores are always exact float32 cosines
+    assert [i for i, _ in st.search_vector(Q[0], top_k=K, exact=True)] == [i for i, _ in exact.search_vector(Q[0], top_k=K)]